@@ -0,0 +1,33 @@
+from fastapi import Response, status
+
+NOT_MODIFIED_RESPONSE = {status.HTTP_304_NOT_MODIFIED: {'description': 'The graph did not change since the '
+																	   'version given in If-None-Match'}}
+
+
+def graph_etag(version: int) -> str:
+	"""
+	Returns the entity tag of a representation of the graph at the given version. The tag is weak since the same
+	version may be serialized differently, e.g. by a bounded traversal.
+	"""
+
+	return f'W/"{version}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+	"""
+	Compares the tags of an ``If-None-Match`` header to an entity tag using the weak comparison of RFC 9110.
+	"""
+
+	if if_none_match is None:
+		return False
+
+	if if_none_match.strip() == '*':
+		return True
+
+	opaque_tag = etag.removeprefix('W/')
+
+	return any(tag.strip().removeprefix('W/') == opaque_tag for tag in if_none_match.split(','))
+
+
+def not_modified(etag: str) -> Response:
+	return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
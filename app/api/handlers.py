@@ -14,3 +14,15 @@ def edge_not_found_handler(request: Request,
 						   exc: exceptions.EdgeNotFoundError) -> JSONResponse:
 	return JSONResponse(status_code=status.HTTP_404_NOT_FOUND,
 						content={'detail': str(exc)})
+
+
+def invalid_snapshot_handler(request: Request,
+							 exc: exceptions.InvalidSnapshotError) -> JSONResponse:
+	return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST,
+						content={'detail': str(exc)})
+
+
+def concurrent_modification_handler(request: Request,
+									exc: exceptions.ConcurrentModificationError) -> JSONResponse:
+	return JSONResponse(status_code=status.HTTP_409_CONFLICT,
+						content={'detail': str(exc)})
@@ -0,0 +1,54 @@
+from time import perf_counter
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.instrumentation import request_metrics, server_timing, track_request
+
+
+class InstrumentationMiddleware:
+	"""
+	Collects the database and serialization work of every HTTP request, adds it to the request metrics by route
+	template and reports it in a ``Server-Timing`` header. Timings are taken when the response starts, so the body of
+	a streaming response is not included.
+	"""
+
+	def __init__(self, app: ASGIApp):
+		self.app = app
+
+	async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+		if scope['type'] != 'http':
+			await self.app(scope, receive, send)
+			return
+
+		start = perf_counter()
+		recorded = False
+
+		with track_request() as stats:
+			def record(status: int) -> float:
+				nonlocal recorded
+				recorded = True
+
+				seconds = perf_counter() - start
+				# The router stores the matched route in the scope, its path is the template without the parameters.
+				route = getattr(scope.get('route'), 'path', 'unmatched')
+				request_metrics.record_request(scope['method'], route, status, seconds, stats)
+
+				return seconds
+
+			async def send_instrumented(message: Message) -> None:
+				if message['type'] == 'http.response.start':
+					seconds = record(message['status'])
+
+					if settings.server_timing_enabled:
+						MutableHeaders(scope=message).append('Server-Timing', server_timing(stats, seconds))
+
+				await send(message)
+
+			try:
+				await self.app(scope, receive, send_instrumented)
+			finally:
+				# Unhandled exceptions are turned into a response by the outermost middleware.
+				if not recorded:
+					record(500)
@@ -0,0 +1,24 @@
+from typing_extensions import Annotated
+
+from fastapi import Depends, Path, Request
+
+from app.core.config import settings
+
+NAMESPACE_PATTERN = r'^[A-Za-z0-9_-]{1,64}$'
+
+
+def validate_namespace(namespace: Annotated[str, Path(pattern=NAMESPACE_PATTERN,
+													  description='Namespace of the graph')]) -> None:
+	pass
+
+
+def get_namespace(request: Request) -> str:
+	"""
+	Returns the namespace of the request, taken from the ``/graphs/{namespace}`` prefix of its path. Routes without
+	the prefix address the graph of the default namespace.
+	"""
+
+	return request.path_params.get('namespace', settings.default_namespace)
+
+
+Namespace = Annotated[str, Depends(get_namespace)]
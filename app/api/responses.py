@@ -0,0 +1,35 @@
+from typing_extensions import Any
+
+from fastapi import Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.core.config import settings
+from app.core.instrumentation import track_serialization
+
+
+class TimedJSONResponse(JSONResponse):
+	"""
+	``JSONResponse`` adding the time spent rendering its body to the serialization time of the request.
+	"""
+
+	def render(self, content: Any) -> bytes:
+		with track_serialization():
+			return super().render(content)
+
+
+def fast_json(content: Any, response: Response | None = None) -> Any:
+	"""
+	Returns content already shaped like the response model of the route as an ``ORJSONResponse``. Returning a
+	response skips the validation and serialization of the ``response_model``, which then only documents the schema.
+	If fast JSON responses are disabled, the content is returned as is and validated against the response model.
+	:param content: Plain dictionaries and lists matching the response model
+	:param response: Response of the route whose headers are carried over
+	:return: Response or content to return from the route
+	"""
+
+	if not settings.fast_json_responses:
+		return content
+
+	# The body is rendered when the response is constructed.
+	with track_serialization():
+		return ORJSONResponse(content, headers=dict(response.headers) if response is not None else None)
@@ -1,8 +1,19 @@
-from fastapi import APIRouter
-from app.api.routers import graph, node, edge
+from fastapi import APIRouter, Depends
+from app.api.namespace import validate_namespace
+from app.api.routers import graph, node, edge, metrics
 
 api_router = APIRouter()
 
+# The graph of the default namespace
 api_router.include_router(graph.router, prefix='/graph', tags=['Graph'])
 api_router.include_router(node.router, prefix='/nodes', tags=['Nodes'])
 api_router.include_router(edge.router, prefix='/edges', tags=['Edges'])
+
+# The graphs of all namespaces
+namespace_router = APIRouter(prefix='/graphs/{namespace}', dependencies=[Depends(validate_namespace)])
+namespace_router.include_router(graph.router, prefix='/graph', tags=['Graph'])
+namespace_router.include_router(node.router, prefix='/nodes', tags=['Nodes'])
+namespace_router.include_router(edge.router, prefix='/edges', tags=['Edges'])
+api_router.include_router(namespace_router)
+
+api_router.include_router(metrics.router, prefix='/metrics', tags=['Metrics'])
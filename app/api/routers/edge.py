@@ -1,19 +1,35 @@
-from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
+from typing_extensions import Annotated
 
+from fastapi import APIRouter, Depends, Query, status
+
+from app.api.namespace import Namespace
+from app.api.responses import fast_json
 from app.services import edge_service
-from app.core.database import get_db
-from app.schemas.edge import EdgeResponse, EdgeCreate, EdgeDeleteRequest, EdgeSwapDirectionRequest
+from app.core.config import settings
+from app.core.database import DbSession, get_db, run_db
+from app.core.write_coalescer import run_write
+from app.schemas.edge import EdgePage, EdgeResponse, EdgeCreate, EdgeDeleteRequest, EdgeSwapDirectionRequest
+from app.schemas.batch import Batch
 
 router = APIRouter()
 
 
+@router.get('',
+			response_model=EdgePage,
+			summary='List edges ordered by ID, one page at a time')
+async def list_edges(namespace: Namespace,
+					 after: Annotated[int, Query(ge=0, description='ID of the last edge of the previous page')] = 0,
+					 limit: Annotated[int, Query(ge=1, le=settings.max_page_size)] = settings.default_page_size,
+					 db: DbSession = Depends(get_db)):
+	return fast_json(await run_db(db, edge_service.list_edges, namespace, after, limit))
+
+
 @router.get('/{edge_id}',
 			response_model=list[EdgeResponse],
 			responses={status.HTTP_404_NOT_FOUND: {'description': 'Edge Not Found Error'}},
 			summary='Get edge using its ID')
-def get_edges(edge_id: int, db: Session = Depends(get_db)):
-	return edge_service.get_edges(db, [edge_id])
+async def get_edges(edge_id: int, namespace: Namespace, db: DbSession = Depends(get_db)):
+	return await run_db(db, edge_service.get_edges, namespace, [edge_id])
 
 
 @router.post('',
@@ -21,21 +37,48 @@ def get_edges(edge_id: int, db: Session = Depends(get_db)):
 			 status_code=status.HTTP_201_CREATED,
 			 responses={status.HTTP_404_NOT_FOUND: {'description': 'Node Not Found Error'}},
 			 summary='Create a new edge between node(s)')
-def create_edge(edge: EdgeCreate, db: Session = Depends(get_db)):
-	return edge_service.create_edges(db, [edge])
+async def create_edge(edge: EdgeCreate, namespace: Namespace, db: DbSession = Depends(get_db)):
+	return await run_write(db, edge_service.create_edges, namespace, [edge])
+
+
+@router.post('/bulk',
+			 response_model=list[EdgeResponse],
+			 status_code=status.HTTP_201_CREATED,
+			 responses={status.HTTP_404_NOT_FOUND: {'description': 'Node Not Found Error'}},
+			 summary='Create multiple edges in one transaction')
+async def create_edges(edges: Batch[EdgeCreate], namespace: Namespace, db: DbSession = Depends(get_db)):
+	return await run_db(db, edge_service.create_edges, namespace, edges)
 
 
 @router.put('',
 			response_model=list[EdgeResponse],
 			responses={status.HTTP_404_NOT_FOUND: {'description': 'Edge Not Found Error'}},
 			summary='Swap the direction of an edge')
-def swap_edge_direction(edge: EdgeSwapDirectionRequest, db: Session = Depends(get_db)):
-	return edge_service.swap_edge_directions(db, [edge])
+async def swap_edge_direction(edge: EdgeSwapDirectionRequest, namespace: Namespace, db: DbSession = Depends(get_db)):
+	return await run_db(db, edge_service.swap_edge_directions, namespace, [edge])
+
+
+@router.put('/bulk',
+			response_model=list[EdgeResponse],
+			responses={status.HTTP_404_NOT_FOUND: {'description': 'Edge Not Found Error'}},
+			summary='Swap the direction of multiple edges in one transaction')
+async def swap_edge_directions(edges: Batch[EdgeSwapDirectionRequest],
+							   namespace: Namespace,
+							   db: DbSession = Depends(get_db)):
+	return await run_db(db, edge_service.swap_edge_directions, namespace, edges)
 
 
 @router.delete('',
 			   status_code=status.HTTP_204_NO_CONTENT,
 			   responses={status.HTTP_404_NOT_FOUND: {'description': 'Edge Not Found Error'}},
 			   summary='Delete an edge')
-def delete_edge(edge: EdgeDeleteRequest, db: Session = Depends(get_db)):
-	edge_service.delete_edges(db, [edge])
+async def delete_edge(edge: EdgeDeleteRequest, namespace: Namespace, db: DbSession = Depends(get_db)):
+	await run_write(db, edge_service.delete_edges, namespace, [edge])
+
+
+@router.delete('/bulk',
+			   status_code=status.HTTP_204_NO_CONTENT,
+			   responses={status.HTTP_404_NOT_FOUND: {'description': 'Edge Not Found Error'}},
+			   summary='Delete multiple edges in one transaction')
+async def delete_edges(edges: Batch[EdgeDeleteRequest], namespace: Namespace, db: DbSession = Depends(get_db)):
+	await run_db(db, edge_service.delete_edges, namespace, edges)
@@ -1,37 +1,110 @@
-from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
+from typing_extensions import Annotated
 
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from app.api.conditional import NOT_MODIFIED_RESPONSE, etag_matches, graph_etag, not_modified
+from app.api.namespace import Namespace
+from app.api.responses import fast_json
 from app.services import graph_service
-from app.core.database import get_db
-from app.schemas.graph import GraphResponse
+from app.core.config import settings
+from app.core.database import DbSession, get_db, open_db, run_db, stream_db
+from app.schemas.graph import (GeneratedGraphResponse, GraphResponse, GraphStreamFormat, GraphTopology,
+							   SnapshotImportResponse)
 
 router = APIRouter()
 
+STREAM_MEDIA_TYPES = {GraphStreamFormat.JSON: 'application/json',
+					  GraphStreamFormat.NDJSON: 'application/x-ndjson'}
+SNAPSHOT_MEDIA_TYPE = 'application/octet-stream'
+
+
+async def purge_retired_graphs():
+	# Runs after the response is sent, with its own session since the session of the request is closed by then.
+	async with open_db() as db:
+		await run_db(db, graph_service.purge_retired_graphs)
+
+
 @router.get('',
 			response_model=GraphResponse,
+			responses={status.HTTP_200_OK: {'content': {'application/x-ndjson': {}}}, **NOT_MODIFIED_RESPONSE},
 			summary='Get the current graph')
-def get_graph(db: Session = Depends(get_db)):
-	return graph_service.get_graph(db)
+async def get_graph(response: Response,
+					namespace: Namespace,
+					stream: GraphStreamFormat | None = None,
+					if_none_match: Annotated[str | None, Header()] = None,
+					db: DbSession = Depends(get_db)):
+	if stream is not None:
+		# The body is read by a session of its own, which also reads the version, so the tag matches the body.
+		chunks = stream_db(graph_service.stream_versioned_graph, namespace, stream)
+		etag = graph_etag(await anext(chunks))
+
+		if etag_matches(if_none_match, etag):
+			await chunks.aclose()
+			return not_modified(etag)
+
+		return StreamingResponse(chunks, media_type=STREAM_MEDIA_TYPES[stream], headers={'ETag': etag})
+
+	etag = graph_etag(await run_db(db, graph_service.get_graph_version, namespace))
+
+	if etag_matches(if_none_match, etag):
+		return not_modified(etag)
+
+	response.headers['ETag'] = etag
+	return fast_json(await run_db(db, graph_service.get_graph, namespace), response)
+
+
+@router.get('/snapshot',
+			response_class=Response,
+			responses={status.HTTP_200_OK: {'content': {SNAPSHOT_MEDIA_TYPE: {}}}},
+			summary='Export the graph as a binary snapshot')
+async def export_snapshot(namespace: Namespace, compress: bool = False, db: DbSession = Depends(get_db)):
+	return Response(await run_db(db, graph_service.export_snapshot, namespace, compress),
+					media_type=SNAPSHOT_MEDIA_TYPE)
+
+
+@router.post('/snapshot',
+			 response_model=SnapshotImportResponse,
+			 status_code=status.HTTP_201_CREATED,
+			 openapi_extra={'requestBody': {'required': True,
+											'content': {SNAPSHOT_MEDIA_TYPE: {'schema': {'type': 'string',
+																						  'format': 'binary'}}}}},
+			 summary='Replace the graph with a binary snapshot')
+async def import_snapshot(request: Request,
+						  namespace: Namespace,
+						  background_tasks: BackgroundTasks,
+						  db: DbSession = Depends(get_db)):
+	background_tasks.add_task(purge_retired_graphs)
+	return await run_db(db, graph_service.import_snapshot, namespace, await request.body())
 
 
 @router.post('/seed',
 			 response_model=GraphResponse,
 			 status_code=status.HTTP_201_CREATED,
 			 summary='Deterministically seed the graph')
-def seed_graph(db: Session = Depends(get_db)):
-	return graph_service.seed_graph(db)
+async def seed_graph(namespace: Namespace, background_tasks: BackgroundTasks, db: DbSession = Depends(get_db)):
+	background_tasks.add_task(purge_retired_graphs)
+	return await run_db(db, graph_service.seed_graph, namespace)
 
 
 @router.post('/seed_random',
-			 response_model=GraphResponse,
+			 response_model=GeneratedGraphResponse,
 			 status_code=status.HTTP_201_CREATED,
-			 summary='Randomly seed the graph')
-def seed_graph(db: Session = Depends(get_db)):
-	return graph_service.seed_graph_random(db)
+			 summary='Seed the graph with a generated graph')
+async def seed_graph_random(namespace: Namespace,
+							background_tasks: BackgroundTasks,
+							nodes: Annotated[int, Query(ge=2, le=settings.max_generated_nodes)] = 20,
+							edges: Annotated[int, Query(ge=0, le=settings.max_generated_edges)] = 30,
+							topology: GraphTopology = GraphTopology.ERDOS_RENYI,
+							seed: int | None = None,
+							db: DbSession = Depends(get_db)):
+	background_tasks.add_task(purge_retired_graphs)
+	return await run_db(db, graph_service.seed_graph_random, namespace, nodes, edges, topology, seed)
 
 
 @router.delete('/clear',
 			   status_code=status.HTTP_204_NO_CONTENT,
 			   summary='Clear the nodes and edges')
-def clear_graph(db: Session = Depends(get_db)):
-	graph_service.clear_graph(db)
+async def clear_graph(namespace: Namespace, background_tasks: BackgroundTasks, db: DbSession = Depends(get_db)):
+	background_tasks.add_task(purge_retired_graphs)
+	await run_db(db, graph_service.clear_graph, namespace)
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get('',
+			response_class=PlainTextResponse,
+			summary='Get service metrics in the Prometheus text format')
+async def get_metrics():
+	return render_metrics()
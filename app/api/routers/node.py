@@ -1,40 +1,178 @@
-from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
+from typing_extensions import Annotated
 
-from app.services import node_service
-from app.core.database import get_db
-from app.schemas.node import NodeResponse, NodeCreate, NodeDeleteRequest
+from fastapi import APIRouter, Depends, Header, Query, Response, status
+
+from app.api.conditional import NOT_MODIFIED_RESPONSE, etag_matches, graph_etag, not_modified
+from app.api.namespace import Namespace
+from app.api.responses import fast_json
+from app.services import graph_service, node_service
+from app.core.config import settings
+from app.core.database import DbSession, get_db, run_db
+from app.core.write_coalescer import run_write
+from app.schemas.node import (NodePage, NodeResponse, NodeCreate, NodeDeleteRequest, PathResponse,
+							  ReachabilityBatchRequest, ReachableNodeResponse)
+from app.schemas.batch import Batch
 
 router = APIRouter()
 
+TRUNCATED_HEADER = 'X-Result-Truncated'
+
+
+@router.get('',
+			response_model=NodePage,
+			summary='List nodes ordered by ID, one page at a time')
+async def list_nodes(namespace: Namespace,
+					 after: Annotated[int, Query(ge=0, description='ID of the last node of the previous page')] = 0,
+					 limit: Annotated[int, Query(ge=1, le=settings.max_page_size)] = settings.default_page_size,
+					 db: DbSession = Depends(get_db)):
+	return fast_json(await run_db(db, node_service.list_nodes, namespace, after, limit))
+
 
 @router.get('/{node_id}',
 			response_model=list[NodeResponse],
 			responses={status.HTTP_404_NOT_FOUND: {'description': 'Node not found Error'}},
 			summary='Get node using its ID')
-def get_nodes(node_id: int, db: Session = Depends(get_db)):
-	return node_service.get_nodes(db, [node_id])
+async def get_nodes(node_id: int, namespace: Namespace, db: DbSession = Depends(get_db)):
+	return await run_db(db, node_service.get_nodes, namespace, [node_id])
+
+
+TRAVERSAL_RESPONSES = {status.HTTP_200_OK: {'headers': {TRUNCATED_HEADER: {
+							'description': 'Whether reachable nodes were left out due to the bounds',
+							'schema': {'type': 'boolean'}}}},
+					   status.HTTP_404_NOT_FOUND: {'description': 'Node Not Found Error'},
+					   **NOT_MODIFIED_RESPONSE}
+
+MaxDepth = Annotated[int | None, Query(ge=0, description='Maximum number of hops')]
+Limit = Annotated[int | None, Query(ge=1, description='Maximum number of nodes')]
+Timeout = Annotated[float | None, Query(gt=0, description='Time budget in seconds')]
+IncludeDepth = Annotated[bool, Query(description='Include the hop distance of each node')]
+
+
+async def _traverse(db: DbSession,
+					response: Response,
+					namespace: str,
+					node_id: int,
+					max_depth: int | None,
+					limit: int | None,
+					timeout: float | None,
+					include_depth: bool,
+					if_none_match: str | None,
+					reverse: bool):
+	# Results cut off by the time budget differ between calls, they are not tagged.
+	if timeout is None:
+		etag = graph_etag(await run_db(db, graph_service.get_graph_version, namespace))
+
+		if etag_matches(if_none_match, etag):
+			return not_modified(etag)
+
+		response.headers['ETag'] = etag
+
+	if max_depth is None and limit is None and timeout is None and not include_depth:
+		response.headers[TRUNCATED_HEADER] = 'false'
+		traverse = node_service.get_ancestor_nodes if reverse else node_service.get_reachable_nodes
+		return fast_json(await run_db(db, traverse, namespace, node_id), response)
+
+	reachable = await run_db(db, node_service.get_reachable_nodes_bounded, namespace, node_id,
+							 max_depth, limit, timeout, include_depth, reverse)
+
+	response.headers[TRUNCATED_HEADER] = 'true' if reachable.truncated else 'false'
+	return fast_json(reachable.nodes, response)
 
 
 @router.get('/{node_id}/connected',
-			response_model=list[NodeResponse],
-			responses={status.HTTP_404_NOT_FOUND: {'description': 'Node Not Found Error'}},
+			response_model=list[ReachableNodeResponse],
+			response_model_exclude_none=True,
+			responses=TRAVERSAL_RESPONSES,
 			summary='Get all reachable nodes from a node')
-def get_connected(node_id: int, db: Session = Depends(get_db)):
-	return node_service.get_reachable_nodes(db, node_id)
+async def get_connected(response: Response,
+						node_id: int,
+						namespace: Namespace,
+						max_depth: MaxDepth = None,
+						limit: Limit = None,
+						timeout: Timeout = None,
+						include_depth: IncludeDepth = False,
+						if_none_match: Annotated[str | None, Header()] = None,
+						db: DbSession = Depends(get_db)):
+	return await _traverse(db, response, namespace, node_id, max_depth, limit, timeout, include_depth,
+						   if_none_match, reverse=False)
+
+
+@router.get('/{node_id}/ancestors',
+			response_model=list[ReachableNodeResponse],
+			response_model_exclude_none=True,
+			responses=TRAVERSAL_RESPONSES,
+			summary='Get all nodes a node is reachable from')
+async def get_ancestors(response: Response,
+						node_id: int,
+						namespace: Namespace,
+						max_depth: MaxDepth = None,
+						limit: Limit = None,
+						timeout: Timeout = None,
+						include_depth: IncludeDepth = False,
+						if_none_match: Annotated[str | None, Header()] = None,
+						db: DbSession = Depends(get_db)):
+	return await _traverse(db, response, namespace, node_id, max_depth, limit, timeout, include_depth,
+						   if_none_match, reverse=True)
+
+
+@router.get('/{source_node_id}/path/{target_node_id}',
+			response_model=PathResponse,
+			responses={status.HTTP_404_NOT_FOUND: {'description': 'Node Not Found Error'}},
+			summary='Get a shortest path between two nodes')
+async def get_path(source_node_id: int,
+				   target_node_id: int,
+				   namespace: Namespace,
+				   db: DbSession = Depends(get_db)):
+	return await run_db(db, node_service.get_path, namespace, source_node_id, target_node_id)
+
+
+@router.post('/connected',
+			 response_model=dict[int, list[NodeResponse]],
+			 responses={status.HTTP_404_NOT_FOUND: {'description': 'Node Not Found Error'}},
+			 summary='Get all reachable nodes from each of multiple nodes')
+async def get_connected_batch(request: ReachabilityBatchRequest,
+							  namespace: Namespace,
+							  db: DbSession = Depends(get_db)):
+	return fast_json(await run_db(db, node_service.get_reachable_nodes_batch, namespace, request.node_ids))
+
+
+@router.post('/ancestors',
+			 response_model=dict[int, list[NodeResponse]],
+			 responses={status.HTTP_404_NOT_FOUND: {'description': 'Node Not Found Error'}},
+			 summary='Get all nodes each of multiple nodes is reachable from')
+async def get_ancestors_batch(request: ReachabilityBatchRequest,
+							  namespace: Namespace,
+							  db: DbSession = Depends(get_db)):
+	return fast_json(await run_db(db, node_service.get_ancestor_nodes_batch, namespace, request.node_ids))
 
 
 @router.post('',
 			 response_model=list[NodeResponse],
 			 status_code=status.HTTP_201_CREATED,
 			 summary='Create a new node')
-def create_node(node: NodeCreate, db: Session = Depends(get_db)):
-	return node_service.create_nodes(db, [node])
+async def create_node(node: NodeCreate, namespace: Namespace, db: DbSession = Depends(get_db)):
+	return await run_write(db, node_service.create_nodes, namespace, [node])
+
+
+@router.post('/bulk',
+			 response_model=list[NodeResponse],
+			 status_code=status.HTTP_201_CREATED,
+			 summary='Create multiple nodes in one transaction')
+async def create_nodes(nodes: Batch[NodeCreate], namespace: Namespace, db: DbSession = Depends(get_db)):
+	return await run_db(db, node_service.create_nodes, namespace, nodes)
 
 
 @router.delete('',
 			   status_code=status.HTTP_204_NO_CONTENT,
 			   responses={status.HTTP_404_NOT_FOUND: {'description': 'Node Not Found Error'}},
 			   summary='Delete a node')
-def delete_node(node: NodeDeleteRequest, db: Session = Depends(get_db)):
-	node_service.delete_nodes(db, [node])
+async def delete_node(node: NodeDeleteRequest, namespace: Namespace, db: DbSession = Depends(get_db)):
+	await run_db(db, node_service.delete_nodes, namespace, [node])
+
+
+@router.delete('/bulk',
+			   status_code=status.HTTP_204_NO_CONTENT,
+			   responses={status.HTTP_404_NOT_FOUND: {'description': 'Node Not Found Error'}},
+			   summary='Delete multiple nodes in one transaction')
+async def delete_nodes(nodes: Batch[NodeDeleteRequest], namespace: Namespace, db: DbSession = Depends(get_db)):
+	await run_db(db, node_service.delete_nodes, namespace, nodes)
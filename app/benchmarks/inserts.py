@@ -0,0 +1,106 @@
+"""
+Compares the throughput of creating nodes and edges with per-row refreshes (the previous repository implementation)
+against the set-based inserts of ``node_repo.create_nodes`` and ``edge_repo.create_edges``.
+
+Usage: ``python -m app.benchmarks.inserts [--database-url URL] [--rows N]``
+
+Without a database URL, an in-memory SQLite database is used as a local stand-in for MySQL.
+"""
+
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+
+from typing_extensions import Callable, Sequence
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.models.base import Base
+from app.models.edge import Edge
+from app.models.node import Node
+from app.repositories import node_repo, edge_repo, graph_repo
+
+# Namespace of the benchmarked graph, so a benchmark against a shared database leaves the other graphs alone.
+NAMESPACE = 'benchmark'
+
+
+def legacy_create_nodes(db: Session, graph_id: int, count: int) -> Sequence[Node]:
+	db_nodes = [Node(graph_id=graph_id) for _ in range(count)]
+
+	db.add_all(db_nodes)
+	db.commit()
+
+	for node in db_nodes:
+		db.refresh(node)
+
+	return db_nodes
+
+
+def legacy_create_edges(db: Session, graph_id: int, edges: list[tuple[int, int]]) -> Sequence[Edge]:
+	db_edges = [Edge(graph_id=graph_id, from_node_id=from_id, to_node_id=to_id) for from_id, to_id in edges]
+
+	db.add_all(db_edges)
+	db.commit()
+
+	for edge in db_edges:
+		db.refresh(edge)
+
+	return db_edges
+
+
+def measure(session_factory: sessionmaker, rows: int,
+			create_nodes: Callable[[Session, int, int], Sequence[Node]],
+			create_edges: Callable[[Session, int, list[tuple[int, int]]], Sequence[Edge]]) -> tuple[float, float]:
+	"""
+	Creates `rows` nodes and then `rows` random edges between them on an empty graph of the benchmark namespace.
+	:return: Node and edge throughput in rows per second
+	"""
+
+	with session_factory() as db:
+		graph_repo.purge_graph(db, graph_repo.clear_graph(db, NAMESPACE), settings.purge_chunk_size)
+		graph_id = graph_repo.lock_graph(db, NAMESPACE)
+		db.commit()
+
+		start = perf_counter()
+		node_ids = [node.id for node in create_nodes(db, graph_id, rows)]
+		node_seconds = perf_counter() - start
+
+		random = Random(0)
+		edges = [(random.choice(node_ids), random.choice(node_ids)) for _ in range(rows)]
+
+		start = perf_counter()
+		create_edges(db, graph_id, edges)
+		edge_seconds = perf_counter() - start
+
+	return rows / node_seconds, rows / edge_seconds
+
+
+def main():
+	parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument('--database-url', default='sqlite://', help='SQLAlchemy URL of the database to benchmark')
+	parser.add_argument('--rows', type=int, default=10_000, help='Number of nodes and edges to create')
+	args = parser.parse_args()
+
+	if args.database_url == 'sqlite://':
+		engine = create_engine(args.database_url, poolclass=StaticPool)
+	else:
+		engine = create_engine(args.database_url)
+
+	Base.metadata.create_all(engine)
+	session_factory = sessionmaker(bind=engine, autoflush=False)
+
+	results = {
+		'per-row refresh': measure(session_factory, args.rows, legacy_create_nodes, legacy_create_edges),
+		'set-based insert': measure(session_factory, args.rows, node_repo.create_nodes, edge_repo.create_edges),
+	}
+
+	print(f'{"implementation":<20}{"nodes/s":>14}{"edges/s":>14}')
+	for name, (nodes_per_second, edges_per_second) in results.items():
+		print(f'{name:<20}{nodes_per_second:>14,.0f}{edges_per_second:>14,.0f}')
+
+
+if __name__ == '__main__':
+	main()
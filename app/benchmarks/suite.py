@@ -0,0 +1,293 @@
+"""
+Measures the latency and throughput of the operations behind the API endpoints on generated graphs of increasing size
+and different topologies: reachability on every traversal engine, bulk edge creation, direction swaps, deletion and
+full graph export.
+
+Usage: ``python -m app.benchmarks.suite [--database-url URL] [--sizes N [N ...]] [--topologies T [T ...]]
+[--repeat N] [--output PATH] [--baseline PATH] [--tolerance RATIO]``
+
+Without a database URL, an in-memory SQLite database is used as a local stand-in for MySQL. The services are called
+directly, like the routes do, so the results leave out the HTTP overhead of the server. Results can be written as a
+JSON baseline and compared against an earlier one, the command then exits with status 1 if any latency percentile
+regressed by more than the tolerance.
+"""
+
+import json
+import platform
+import sys
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from random import Random
+from time import perf_counter
+
+import orjson
+from typing_extensions import Callable, Iterator
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.core.graph_index import graph_indexes
+from app.models.base import Base
+from app.repositories import edge_repo, graph_repo, node_repo
+from app.schemas.edge import EdgeCreate, EdgeDeleteRequest, EdgeSwapDirectionRequest
+from app.schemas.graph import GraphStreamFormat, GraphTopology
+from app.scripts.generate_graph import generate_graph
+from app.services import edge_service, graph_service, node_service
+
+# Namespace of the generated graphs, so a benchmark against a shared database leaves the other graphs alone.
+NAMESPACE = 'benchmark'
+# Number of edges per node of the generated graphs.
+AVERAGE_DEGREE = 4
+# Number of edges created, swapped or deleted by a single bulk operation.
+BULK_BATCH_SIZE = 1000
+# Hops of the bounded reachability queries.
+BOUNDED_MAX_DEPTH = 2
+# Latency percentiles compared against a baseline.
+COMPARED_PERCENTILES = ('p50_ms', 'p95_ms')
+
+# An operation processes a number of items, e.g. reachable nodes or created edges, and returns that number.
+Operation = Callable[[Session], int]
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+	"""
+	Returns the nearest-rank percentile of the samples.
+	:param samples: Samples in ascending order
+	:param fraction: Percentile as a fraction between 0 and 1
+	"""
+
+	return samples[max(0, min(len(samples) - 1, round(fraction * len(samples)) - 1))]
+
+
+def summarize(seconds: list[float], items: int) -> dict:
+	"""
+	Summarizes the durations of the runs of an operation.
+	:param seconds: Duration of every run
+	:param items: Total number of items processed by all runs
+	:return: Throughput in items per second and latency percentiles in milliseconds
+	"""
+
+	samples = sorted(seconds)
+
+	return {'runs': len(samples),
+			'items_per_second': round(items / sum(samples), 1) if sum(samples) else None,
+			'p50_ms': round(percentile(samples, 0.50) * 1000, 3),
+			'p95_ms': round(percentile(samples, 0.95) * 1000, 3),
+			'p99_ms': round(percentile(samples, 0.99) * 1000, 3)}
+
+
+def measure(db: Session, operation: Operation, repeat: int) -> dict:
+	seconds, items = [], 0
+
+	for _ in range(repeat):
+		start = perf_counter()
+		items += operation(db)
+		seconds.append(perf_counter() - start)
+
+	return summarize(seconds, items)
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+	"""
+	Compares the latency percentiles of the results against a baseline. Benchmarks missing from either side are not
+	compared, nor are percentiles rounded to 0 in the baseline, which leave no increase to relate to.
+	:param results: Results keyed by benchmark name
+	:param baseline: Baseline results keyed by benchmark name
+	:param tolerance: Allowed relative increase of a percentile, e.g. 0.25 for 25 %
+	:return: Description of every regression
+	"""
+
+	regressions = []
+
+	for name in results.keys() & baseline.keys():
+		for metric in COMPARED_PERCENTILES:
+			current, previous = results[name][metric], baseline[name][metric]
+
+			if previous and current > previous * (1 + tolerance):
+				regressions.append(f'{name}: {metric} {previous:.3f} -> {current:.3f} (+{current / previous - 1:.0%})')
+
+	return sorted(regressions)
+
+
+def _operations(db: Session, random: Random) -> Iterator[tuple[str, Operation]]:
+	"""
+	Yields the benchmarked operations on the current graph by name. The graph index setting is switched between the
+	yields, so every reachability operation runs on the engine in its name. The write operations leave the graph as
+	they found it: every created batch is deleted again and every edge is swapped back.
+	"""
+
+	graph_id = graph_repo.get_graph_id(db, NAMESPACE)
+	node_ids = list(node_repo.get_all_node_ids(db, graph_id))
+	edge_ids = [edge[0] for edge in edge_repo.get_all_edge_rows(db, graph_id)]
+	batch_size = min(BULK_BATCH_SIZE, len(edge_ids))
+
+	def load_index(db: Session) -> int:
+		graph_indexes.invalidate()
+		graph_indexes.get(graph_id).ensure_loaded(db)
+		return len(node_ids)
+
+	for engine, index_enabled in (('database', False), ('index', True)):
+		settings.graph_index_enabled = index_enabled
+		graph_indexes.invalidate()
+
+		if index_enabled:
+			yield 'index_load', load_index
+
+		yield (f'reachability[{engine}]',
+			   lambda db: len(node_service.get_reachable_nodes(db, NAMESPACE, random.choice(node_ids))))
+		yield (f'reachability_bounded[{engine}]',
+			   lambda db: len(node_service.get_reachable_nodes_bounded(db, NAMESPACE, random.choice(node_ids),
+																	   max_depth=BOUNDED_MAX_DEPTH).nodes))
+
+	settings.graph_index_enabled = False
+	graph_indexes.invalidate()
+	created_batches: list[list[int]] = []
+
+	def create(db: Session) -> int:
+		edges = [EdgeCreate(from_node_id=random.choice(node_ids), to_node_id=random.choice(node_ids))
+				 for _ in range(BULK_BATCH_SIZE)]
+		created_batches.append([edge.id for edge in edge_service.create_edges(db, NAMESPACE, edges)])
+		return len(edges)
+
+	def delete(db: Session) -> int:
+		batch = created_batches.pop()
+		edge_service.delete_edges(db, NAMESPACE, [EdgeDeleteRequest(edge_id=edge_id) for edge_id in batch])
+		return len(batch)
+
+	def swap(db: Session) -> int:
+		batch = [EdgeSwapDirectionRequest(edge_id=edge_id) for edge_id in random.sample(edge_ids, batch_size)]
+		edge_service.swap_edge_directions(db, NAMESPACE, batch)
+		edge_service.swap_edge_directions(db, NAMESPACE, batch)
+		return 2 * len(batch)
+
+	def export_json(db: Session) -> int:
+		graph = graph_service.get_graph(db, NAMESPACE)
+		orjson.dumps(graph)
+		return len(graph['nodes']) + len(graph['edges'])
+
+	def export_ndjson(db: Session) -> int:
+		for _ in graph_service.stream_graph(db, NAMESPACE, GraphStreamFormat.NDJSON):
+			pass
+		return len(node_ids) + len(edge_ids)
+
+	def export_snapshot(db: Session) -> int:
+		graph_service.export_snapshot(db, NAMESPACE)
+		return len(node_ids) + len(edge_ids)
+
+	yield 'bulk_create', create
+	yield 'bulk_delete', delete
+	if batch_size:
+		yield 'bulk_swap', swap
+	yield 'export_json', export_json
+	yield 'export_ndjson', export_ndjson
+	yield 'export_snapshot', export_snapshot
+
+
+def run_suite(session_factory: sessionmaker,
+			  sizes: list[int],
+			  topologies: list[GraphTopology],
+			  repeat: int,
+			  seed: int = 0) -> dict:
+	"""
+	Runs every operation `repeat` times on a generated graph of every size and topology. The graph index and the
+	reachability cache settings are restored afterwards.
+	:param session_factory: Factory of sessions of the benchmarked database
+	:param sizes: Number of edges of the generated graphs, the graphs have ``AVERAGE_DEGREE`` edges per node
+	:param topologies: Topologies of the generated graphs
+	:param repeat: Number of runs of every operation
+	:param seed: Seed of the generated graphs and of the operation arguments
+	:return: Results keyed by ``<topology>/<size>/<operation>``
+	"""
+
+	results = {}
+	index_enabled, cache_enabled = settings.graph_index_enabled, settings.reachability_cache_enabled
+	settings.reachability_cache_enabled = False
+
+	try:
+		with session_factory() as db:
+			for topology in topologies:
+				for size in sizes:
+					generate_graph(db, NAMESPACE, max(2, size // AVERAGE_DEGREE), size, topology, seed)
+					graph_service.purge_retired_graphs(db)
+					random = Random(seed)
+
+					for name, operation in _operations(db, random):
+						key = f'{topology.value}/{size}/{name}'
+
+						results[key] = measure(db, operation, repeat)
+
+						print(f'{key:<50}{results[key]["p50_ms"]:>12,.3f} ms p50'
+							  f'{results[key]["p95_ms"]:>12,.3f} ms p95', file=sys.stderr)
+	finally:
+		settings.graph_index_enabled, settings.reachability_cache_enabled = index_enabled, cache_enabled
+		graph_indexes.invalidate()
+
+	return results
+
+
+def create_benchmark_engine(database_url: str):
+	if not database_url.startswith('sqlite'):
+		return create_engine(database_url)
+
+	engine = create_engine(database_url, poolclass=StaticPool)
+
+	# SQLite only enforces the foreign keys, and so the cascading deletes of the schema, when asked to.
+	@event.listens_for(engine, 'connect')
+	def enable_foreign_keys(connection, record):
+		connection.execute('PRAGMA foreign_keys=ON')
+
+	return engine
+
+
+def main():
+	parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument('--database-url', default='sqlite://', help='SQLAlchemy URL of the database to benchmark')
+	parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+						help='Number of edges of the generated graphs')
+	parser.add_argument('--topologies', nargs='+', choices=[topology.value for topology in GraphTopology],
+						default=[GraphTopology.ERDOS_RENYI.value, GraphTopology.POWER_LAW.value,
+								 GraphTopology.CHAIN.value], help='Topologies of the generated graphs')
+	parser.add_argument('--repeat', type=int, default=20, help='Number of runs of every operation')
+	parser.add_argument('--seed', type=int, default=0, help='Seed of the generated graphs')
+	parser.add_argument('--output', help='Path to write the results to as a JSON baseline')
+	parser.add_argument('--baseline', help='Path of a JSON baseline to compare the results against')
+	parser.add_argument('--tolerance', type=float, default=0.25,
+						help='Allowed relative increase of a latency percentile over the baseline')
+	args = parser.parse_args()
+
+	engine = create_benchmark_engine(args.database_url)
+	Base.metadata.create_all(engine)
+	session_factory = sessionmaker(bind=engine, autoflush=False)
+
+	results = run_suite(session_factory, args.sizes, [GraphTopology(topology) for topology in args.topologies],
+						args.repeat, args.seed)
+
+	print(f'{"benchmark":<50}{"items/s":>14}{"p50 ms":>12}{"p95 ms":>12}{"p99 ms":>12}')
+	for name, result in results.items():
+		print(f'{name:<50}{result["items_per_second"] or 0:>14,.0f}'
+			  f'{result["p50_ms"]:>12,.3f}{result["p95_ms"]:>12,.3f}{result["p99_ms"]:>12,.3f}')
+
+	if args.output:
+		with open(args.output, 'w') as file:
+			json.dump({'environment': {'database': engine.dialect.name,
+									   'python': platform.python_version(),
+									   'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+									   'repeat': args.repeat,
+									   'seed': args.seed},
+					   'results': results}, file, indent=2)
+
+	if args.baseline:
+		with open(args.baseline) as file:
+			regressions = compare(results, json.load(file)['results'], args.tolerance)
+
+		for regression in regressions:
+			print(f'REGRESSION {regression}')
+
+		if regressions:
+			sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
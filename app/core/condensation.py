@@ -0,0 +1,273 @@
+from collections import deque
+
+from typing_extensions import Callable, Iterable
+
+Neighbours = Callable[[int], Iterable[int]]
+
+
+def strongly_connected_components(node_ids: Iterable[int], successors: Neighbours) -> list[list[int]]:
+	"""
+	Returns the strongly connected components of the graph spanned by the given nodes using an iterative version of
+	Tarjan's algorithm. Components are returned in reverse topological order.
+	:param node_ids: IDs of the nodes of the graph
+	:param successors: Returns the IDs of the successors of a node, only successors among `node_ids` are followed
+	:return: List of components, each a list of node IDs
+	"""
+
+	node_ids = list(node_ids)
+	in_graph = set(node_ids)
+	index: dict[int, int] = {}
+	low: dict[int, int] = {}
+	stack: list[int] = []
+	on_stack: set[int] = set()
+	components: list[list[int]] = []
+
+	for root in node_ids:
+		if root in index:
+			continue
+
+		index[root] = low[root] = len(index)
+		stack.append(root)
+		on_stack.add(root)
+		work = [(root, iter(successors(root)))]
+
+		while work:
+			node_id, neighbours = work[-1]
+
+			for neighbour in neighbours:
+				if neighbour not in in_graph:
+					continue
+
+				if neighbour not in index:
+					index[neighbour] = low[neighbour] = len(index)
+					stack.append(neighbour)
+					on_stack.add(neighbour)
+					work.append((neighbour, iter(successors(neighbour))))
+					break
+
+				if neighbour in on_stack:
+					low[node_id] = min(low[node_id], index[neighbour])
+			else:
+				work.pop()
+
+				if work:
+					parent = work[-1][0]
+					low[parent] = min(low[parent], low[node_id])
+
+				if low[node_id] == index[node_id]:
+					component = []
+
+					while True:
+						member = stack.pop()
+						on_stack.discard(member)
+						component.append(member)
+
+						if member == node_id:
+							break
+
+					components.append(component)
+
+	return components
+
+
+class Condensation:
+	"""
+	Condensation of the graph into its strongly connected components (SCCs) and the DAG between them.
+
+	Every edge between two components is counted in the DAG, so edge inserts and deletes are applied incrementally:
+	an insert closing a cycle merges the components on it, a delete inside a component only recomputes that
+	component. Reachability is a traversal of the DAG followed by an expansion of the members of each component.
+	"""
+
+	def __init__(self, successors: Neighbours, predecessors: Neighbours):
+		"""
+		:param successors: Returns the current successor IDs of a node
+		:param predecessors: Returns the current predecessor IDs of a node
+		"""
+
+		self._node_successors = successors
+		self._node_predecessors = predecessors
+		self.build([])
+
+	def build(self, node_ids: Iterable[int]) -> None:
+		"""
+		Rebuilds the condensation from scratch.
+		"""
+
+		self._next_id = 0
+		self._component: dict[int, int] = {}
+		self._members: dict[int, set[int]] = {}
+		# Component ID -> {neighbour component ID: number of edges}
+		self._successors: dict[int, dict[int, int]] = {}
+		self._predecessors: dict[int, dict[int, int]] = {}
+
+		node_ids = list(node_ids)
+
+		for component in strongly_connected_components(node_ids, self._node_successors):
+			self._add_component(component)
+
+		for node_id in node_ids:
+			for neighbour in self._node_successors(node_id):
+				self._count_edge(self._component[node_id], self._component[neighbour], 1)
+
+	@property
+	def component_count(self) -> int:
+		return len(self._members)
+
+	def component_of(self, node_id: int) -> int:
+		return self._component[node_id]
+
+	def members(self, component_id: int) -> set[int]:
+		return self._members[component_id]
+
+	def _add_component(self, node_ids: Iterable[int]) -> int:
+		component_id = self._next_id
+		self._next_id += 1
+
+		self._members[component_id] = set(node_ids)
+		self._successors[component_id] = {}
+		self._predecessors[component_id] = {}
+
+		for node_id in self._members[component_id]:
+			self._component[node_id] = component_id
+
+		return component_id
+
+	def _remove_component(self, component_id: int) -> None:
+		for successor in self._successors.pop(component_id):
+			del self._predecessors[successor][component_id]
+		for predecessor in self._predecessors.pop(component_id):
+			del self._successors[predecessor][component_id]
+
+		del self._members[component_id]
+
+	def _count_edge(self, from_id: int, to_id: int, count: int) -> None:
+		if from_id == to_id:
+			return
+
+		remaining = self._successors[from_id].get(to_id, 0) + count
+
+		if remaining:
+			self._successors[from_id][to_id] = remaining
+			self._predecessors[to_id][from_id] = remaining
+		else:
+			del self._successors[from_id][to_id]
+			del self._predecessors[to_id][from_id]
+
+	def _search(self, start_id: int, adjacency: dict[int, dict[int, int]]) -> set[int]:
+		found = {start_id}
+		queue = deque(found)
+
+		while queue:
+			for neighbour in adjacency[queue.popleft()]:
+				if neighbour not in found:
+					found.add(neighbour)
+					queue.append(neighbour)
+
+		return found
+
+	def add_node(self, node_id: int) -> None:
+		self._add_component([node_id])
+
+	def remove_node(self, node_id: int) -> None:
+		"""
+		Removes a node whose edges were already removed, it is the only member of its component.
+		"""
+
+		self._remove_component(self._component.pop(node_id))
+
+	def add_edge(self, from_node_id: int, to_node_id: int) -> None:
+		from_id, to_id = self._component[from_node_id], self._component[to_node_id]
+
+		if from_id == to_id:
+			return
+
+		reachable = self._search(to_id, self._successors)
+
+		if from_id not in reachable:
+			self._count_edge(from_id, to_id, 1)
+			return
+
+		# The edge closes a cycle, every component on a path back to the source component joins one SCC.
+		cycle = reachable & self._search(from_id, self._predecessors)
+		self._merge(cycle)
+
+	def _merge(self, component_ids: set[int]) -> None:
+		edges: dict[tuple[int, int], int] = {}
+
+		for component_id in component_ids:
+			for successor, count in self._successors[component_id].items():
+				edges[component_id, successor] = count
+			for predecessor, count in self._predecessors[component_id].items():
+				edges[predecessor, component_id] = count
+
+		members = set().union(*(self._members[component_id] for component_id in component_ids))
+
+		for component_id in component_ids:
+			self._remove_component(component_id)
+
+		merged_id = self._add_component(members)
+
+		for (from_id, to_id), count in edges.items():
+			self._count_edge(merged_id if from_id in component_ids else from_id,
+							 merged_id if to_id in component_ids else to_id,
+							 count)
+
+	def remove_edge(self, from_node_id: int, to_node_id: int) -> None:
+		"""
+		Removes an edge that was already removed from the graph.
+		"""
+
+		from_id, to_id = self._component[from_node_id], self._component[to_node_id]
+
+		if from_id != to_id:
+			self._count_edge(from_id, to_id, -1)
+			return
+
+		members = self._members[from_id]
+
+		if from_node_id == to_node_id or len(members) == 1:
+			return
+
+		# The component may fall apart, only its members are recomputed.
+		components = strongly_connected_components(members, self._node_successors)
+
+		if len(components) == 1:
+			return
+
+		self._remove_component(from_id)
+
+		for component in components:
+			self._add_component(component)
+
+		for node_id in members:
+			for neighbour in self._node_successors(node_id):
+				self._count_edge(self._component[node_id], self._component[neighbour], 1)
+			for neighbour in self._node_predecessors(node_id):
+				if neighbour not in members:
+					self._count_edge(self._component[neighbour], self._component[node_id], 1)
+
+	def reachable(self, start_node_id: int) -> list[int]:
+		"""
+		Returns the IDs of all nodes reachable from the start node, starting with the start node. Nodes are grouped by
+		component in breadth-first order of the component DAG, members of a component in ascending ID order.
+		"""
+
+		start_id = self._component[start_node_id]
+		order = [start_id]
+		visited = {start_id}
+		queue = deque(order)
+
+		while queue:
+			for successor in self._successors[queue.popleft()]:
+				if successor not in visited:
+					visited.add(successor)
+					order.append(successor)
+					queue.append(successor)
+
+		node_ids = [start_node_id]
+
+		for component_id in order:
+			node_ids.extend(sorted(node_id for node_id in self._members[component_id] if node_id != start_node_id))
+
+		return node_ids
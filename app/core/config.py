@@ -14,6 +14,57 @@ class Settings(BaseSettings):
 	db_user: str = 'root'
 	db_password: str = '1234'
 	db_name: str = 'graph_db'
+	async_mode: bool = False
+	schema_setup_enabled: bool = True
+
+	# Connection pool
+	db_pool_size: int = 5
+	db_max_overflow: int = 10
+	db_pool_recycle: int = -1
+	db_pool_pre_ping: bool = False
+	db_pool_timeout: float = 30.0
+
+	# Graph namespaces
+	default_namespace: str = 'default'
+	purge_chunk_size: int = 10_000
+
+	# Bulk operations
+	max_batch_size: int = 10_000
+
+	# Pagination
+	default_page_size: int = 100
+	max_page_size: int = 1000
+
+	# Graph export
+	export_page_size: int = 10_000
+
+	# Graph generation
+	max_generated_nodes: int = 10_000_000
+	max_generated_edges: int = 10_000_000
+
+	# Serialization
+	fast_json_responses: bool = True
+
+	# Graph index
+	graph_index_enabled: bool = False
+	graph_index_condensation: bool = False
+
+	# Instrumentation
+	server_timing_enabled: bool = True
+	slow_query_threshold: float | None = 1.0
+
+	# Reachability closure
+	reachability_closure_enabled: bool = False
+
+	# Reachability cache
+	reachability_cache_enabled: bool = False
+	reachability_cache_size: int = 10_000
+	reachability_cache_ttl: float | None = 300.0
+
+	# Write coalescing
+	write_coalescing_enabled: bool = False
+	write_coalescing_window: float = 0.002
+	write_coalescing_max_batch_size: int = 100
 
 	@property
 	def database_url(self) -> str:
@@ -24,6 +75,15 @@ class Settings(BaseSettings):
 			f'{self.db_name}'
 		)
 
+	@property
+	def async_database_url(self) -> str:
+		return (
+			f'mysql+aiomysql://{self.db_user}:'
+			f'{self.db_password}@'
+			f'{self.db_host}:{self.db_port}/'
+			f'{self.db_name}'
+		)
+
 	model_config = SettingsConfigDict(env_prefix='APP_', case_sensitive=False)
 
 
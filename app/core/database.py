@@ -1,27 +1,221 @@
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy import create_engine, text
+from contextlib import asynccontextmanager
+from pathlib import Path
+from threading import Lock
+
+from typing_extensions import AsyncIterator, Callable, Iterator, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy import Engine, create_engine, inspect, text
 
 from app.core.config import settings
+from app.core.instrumentation import instrument_engine
+from app.core.metrics import register_collector
+from app.core.pool import InstrumentedQueuePool, InstrumentedAsyncAdaptedQueuePool, pool_metrics
+
+T = TypeVar('T')
+
+DbSession = Session | AsyncSession
+
+
+# Tables of the schema and the files of their DDL, in the order they are created.
+SCHEMA = {'graphs': 'create_graphs_table.sql',
+		  'nodes': 'create_nodes_table.sql',
+		  'edges': 'create_edges_table.sql',
+		  'reachability': 'create_reachability_table.sql'}
+DDL_DIRECTORY = Path(__file__).resolve().parent.parent / 'ddl'
+
+# Key of the hooks collected by ``after_commit`` in the info of a session.
+AFTER_COMMIT_HOOKS = 'after_commit_hooks'
+
+_lock = Lock()
+_engine: Engine | None = None
+_async_engine: AsyncEngine | None = None
+_schema_ready = False
+
+
+def ensure_schema() -> None:
+	"""
+	Creates the tables of the schema that do not exist yet. The check runs once per process, processes forked after
+	it, like the workers of a preloaded application, inherit its result.
+	"""
+
+	global _schema_ready
+
+	engine = get_engine()
+
+	with _lock:
+		if _schema_ready:
+			return
+
+		missing = [table for table in SCHEMA if not inspect(engine).has_table(table)]
+
+		if missing:
+			with engine.begin() as connection:
+				for table in missing:
+					connection.execute(text((DDL_DIRECTORY / SCHEMA[table]).read_text()))
+
+		_schema_ready = True
+
+
+def get_engine() -> Engine:
+	"""
+	Returns the engine of the configured database, created on first use so importing the application does not
+	connect to the database.
+	"""
+
+	global _engine
+
+	with _lock:
+		if _engine is None:
+			_engine = create_engine(settings.database_url, poolclass=InstrumentedQueuePool, **pool_options())
+			instrument_engine(_engine)
+
+		return _engine
+
+
+def get_async_engine() -> AsyncEngine:
+	"""
+	Returns the async engine of the configured database, created on first use.
+	"""
+
+	global _async_engine
+
+	with _lock:
+		if _async_engine is None:
+			_async_engine = create_async_engine(settings.async_database_url,
+												poolclass=InstrumentedAsyncAdaptedQueuePool,
+												**pool_options())
+			instrument_engine(_async_engine.sync_engine)
+
+		return _async_engine
+
+
+def dispose_engines() -> None:
+	"""
+	Closes the connections of the engines and drops them, the next session creates new ones. A process must dispose
+	its engines before it forks, so no connection is shared with its children.
+	"""
 
+	global _engine, _async_engine
 
-def create_tables():
-	db = SessionLocal()
+	with _lock:
+		if _engine is not None:
+			_engine.dispose()
+		if _async_engine is not None:
+			_async_engine.sync_engine.dispose()
 
-	with open('app/ddl/create_nodes_table.sql') as f:
-		db.execute(text(f.read()))
-	with open('app/ddl/create_edges_table.sql') as f:
-		db.execute(text(f.read()))
+		_engine = _async_engine = None
 
-	db.close()
 
+def create_session() -> Session:
+	return Session(bind=get_engine(), autoflush=False)
 
-def get_db() -> Session:
-	db = SessionLocal()
+
+def create_async_session() -> AsyncSession:
+	return AsyncSession(bind=get_async_engine(), autoflush=False)
+
+
+@asynccontextmanager
+async def open_db() -> AsyncIterator[DbSession]:
+	"""
+	Opens a session for the configured mode, an ``AsyncSession`` in async mode and a regular ``Session`` otherwise.
+	"""
+
+	if settings.async_mode:
+		async with create_async_session() as db:
+			yield db
+		return
+
+	db = create_session()
 	try:
 		yield db
 	finally:
-		db.close()
+		await run_in_threadpool(db.close)
+
+
+async def get_db() -> AsyncIterator[DbSession]:
+	async with open_db() as db:
+		yield db
+
+
+async def run_db(db: DbSession, func: Callable[..., T], *args, **kwargs) -> T:
+	"""
+	Runs a synchronous service or repository function with the session as its first argument without blocking the
+	event loop.
+
+	In async mode the function runs on the async driver through ``AsyncSession.run_sync``, which awaits every
+	database round-trip instead of holding a thread. Otherwise, it runs in the threadpool like a sync route would.
+	:param db: Session returned by ``get_db`` or ``open_db``
+	:param func: Function taking a ``Session`` as its first argument
+	:return: Return value of the function
+	"""
+
+	if isinstance(db, AsyncSession):
+		return await db.run_sync(func, *args, **kwargs)
+
+	return await run_in_threadpool(func, db, *args, **kwargs)
+
+
+def after_commit(db: Session, hook: Callable[[], None]) -> None:
+	"""
+	Runs a hook once the changes of the session are durable, e.g. to update in-memory state derived from them. The
+	hook runs right away after a regular commit. Sessions whose commit only releases a savepoint of a larger
+	transaction, like the writes of the write coalescer, collect the hooks in ``db.info[AFTER_COMMIT_HOOKS]`` until
+	that transaction commits.
+	:param db: Session that just committed
+	:param hook: Function to run
+	"""
+
+	if (hooks := db.info.get(AFTER_COMMIT_HOOKS)) is not None:
+		hooks.append(hook)
+	else:
+		hook()
+
+
+def _next(db: Session, iterator: Iterator[T], default: object) -> T | object:
+	return next(iterator, default)
+
+
+async def stream_db(func: Callable[..., Iterator[T]], *args, **kwargs) -> AsyncIterator[T]:
+	"""
+	Drives a synchronous generator function taking a session as its first argument from the event loop, each item is
+	produced through ``run_db``. The generator gets its own session which stays open until it is exhausted, since
+	streaming responses outlive the session of the request.
+	:param func: Generator function taking a ``Session`` as its first argument
+	:return: Async iterator over the generated items
+	"""
+
+	exhausted = object()
+
+	async with open_db() as db:
+		iterator = await run_db(db, func, *args, **kwargs)
+
+		try:
+			while (item := await run_db(db, _next, iterator, exhausted)) is not exhausted:
+				yield item
+		finally:
+			iterator.close()
+
+
+def pool_options() -> dict:
+	return {
+		'pool_size': settings.db_pool_size,
+		'max_overflow': settings.db_max_overflow,
+		'pool_recycle': settings.db_pool_recycle,
+		'pool_pre_ping': settings.db_pool_pre_ping,
+		'pool_timeout': settings.db_pool_timeout,
+	}
+
+
+@register_collector
+def collect_pool_metrics():
+	pools = {}
+
+	if _engine is not None:
+		pools['sync'] = _engine.pool
+	if _async_engine is not None:
+		pools['async'] = _async_engine.sync_engine.pool
 
-engine = create_engine(settings.database_url)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
-create_tables()
+	return pool_metrics(pools)
@@ -6,3 +6,13 @@ class NodeNotFoundError(Exception):
 class EdgeNotFoundError(Exception):
 	def __init__(self, ids):
 		super().__init__(f'Edge(s) with ID(s): {ids} not found.')
+
+
+class InvalidSnapshotError(Exception):
+	def __init__(self, reason):
+		super().__init__(f'Invalid graph snapshot: {reason}')
+
+
+class ConcurrentModificationError(Exception):
+	def __init__(self, reason):
+		super().__init__(f'Concurrent modification of the graph: {reason}')
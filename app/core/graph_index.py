@@ -0,0 +1,460 @@
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from heapq import merge
+from threading import Lock
+
+from typing_extensions import Iterable, Iterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.node import Node
+from app.models.edge import Edge
+from app.core.condensation import Condensation
+from app.core.traversal import Traversal, breadth_first, shortest_path
+
+# Minimum number of overlay entries (added or removed edges) before the CSR arrays are rebuilt.
+COMPACTION_THRESHOLD = 4096
+
+# Number of times a load is retried when the graph is mutated while it is being read.
+LOAD_ATTEMPTS = 3
+
+
+class _Adjacency:
+	"""
+	Adjacency of one edge direction in compressed sparse row (CSR) form.
+
+	Edges are stored as flat ``array`` columns sorted by (source, edge ID), so the neighbours of a node are a
+	contiguous slice found with a binary search. Mutations after the build are kept in a small overlay of added
+	edges and removed edge IDs until the owning index compacts.
+	"""
+
+	def __init__(self, edges: list[tuple[int, int, int]]):
+		"""
+		:param edges: (edge ID, source, target) tuples sorted by source and edge ID
+		"""
+
+		self.sources = array('I')
+		self.offsets = array('Q', [0])
+		self.targets = array('I')
+		self.edge_ids = array('I')
+
+		for edge_id, source, target in edges:
+			if not self.sources or self.sources[-1] != source:
+				if self.sources:
+					self.offsets.append(len(self.targets))
+				self.sources.append(source)
+
+			self.targets.append(target)
+			self.edge_ids.append(edge_id)
+
+		if self.sources:
+			self.offsets.append(len(self.targets))
+
+		self.removed: set[int] = set()
+		self.added: dict[int, list[tuple[int, int]]] = {}
+
+	def span(self, node: int) -> range:
+		i = bisect_left(self.sources, node)
+
+		if i == len(self.sources) or self.sources[i] != node:
+			return range(0)
+
+		return range(self.offsets[i], self.offsets[i + 1])
+
+	def _base(self, node: int) -> Iterator[tuple[int, int]]:
+		for position in self.span(node):
+			edge_id = self.edge_ids[position]
+
+			if edge_id not in self.removed:
+				yield edge_id, self.targets[position]
+
+	def neighbours(self, node: int) -> Iterator[tuple[int, int]]:
+		"""
+		Yields (edge ID, neighbour) pairs of the node ordered by edge ID.
+		"""
+
+		added = self.added.get(node)
+
+		if not added:
+			return self._base(node)
+
+		return merge(self._base(node), added)
+
+	def source_of(self, position: int) -> int:
+		return self.sources[bisect_right(self.offsets, position) - 1]
+
+	def add(self, edge_id: int, source: int, target: int) -> None:
+		insort(self.added.setdefault(source, []), (edge_id, target))
+
+	def discard_added(self, edge_id: int, source: int, target: int) -> None:
+		added = self.added[source]
+		added.remove((edge_id, target))
+
+		if not added:
+			del self.added[source]
+
+
+class GraphIndex:
+	"""
+	Process-local, in-memory copy of a graph used to answer reachability queries without the database.
+
+	The index is built once from the nodes and edges of its graph and kept up to date by the repositories after
+	every committed mutation. Both edge directions are stored as CSR adjacencies, traversals visit neighbours in
+	edge ID order so results match the ordering of the recursive CTE.
+
+	Optionally the index also maintains the condensation of the graph into its strongly connected components, unbounded
+	reachability is then answered from the component DAG instead of a traversal of every edge.
+	"""
+
+	def __init__(self, condensation: bool = False, graph_id: int | None = None):
+		"""
+		:param condensation: Whether to maintain the strongly connected components of the graph
+		:param graph_id: ID of the graph to load, None to load the nodes and edges of all graphs
+		"""
+
+		self._graph_id = graph_id
+		self._lock = Lock()
+		self._loaded = False
+		self._generation = 0
+		self._condensation = Condensation(self._successors, self._predecessors) if condensation else None
+		self._build([], [])
+
+	@property
+	def loaded(self) -> bool:
+		return self._loaded
+
+	def _build(self, node_ids: Iterable[int], edges: Iterable[tuple[int, int, int]], condense: bool = True) -> None:
+		edges = list(edges)
+
+		self._nodes: set[int] = set(node_ids)
+		self._out = _Adjacency(sorted(edges, key=lambda e: (e[1], e[0])))
+		self._in = _Adjacency(sorted(((edge_id, to_id, from_id) for edge_id, from_id, to_id in edges),
+									 key=lambda e: (e[1], e[0])))
+
+		# Edge IDs in ascending order together with their position in the outgoing CSR, used to look up the
+		# endpoints of an edge that is deleted or swapped.
+		order = sorted(range(len(self._out.edge_ids)), key=self._out.edge_ids.__getitem__)
+		self._edge_ids = array('I', (self._out.edge_ids[p] for p in order))
+		self._edge_positions = array('Q', order)
+
+		# Edges added (or re-added after a swap) since the last build: edge ID -> (from node ID, to node ID)
+		self._added_edges: dict[int, tuple[int, int]] = {}
+
+		# Compaction only changes the layout of the adjacencies, the components stay valid.
+		if self._condensation is not None and condense:
+			self._condensation.build(self._nodes)
+
+	def _successors(self, node_id: int) -> Iterator[int]:
+		return (neighbour for _, neighbour in self._out.neighbours(node_id) if neighbour in self._nodes)
+
+	def _predecessors(self, node_id: int) -> Iterator[int]:
+		return (neighbour for _, neighbour in self._in.neighbours(node_id) if neighbour in self._nodes)
+
+	def _condensed(self, from_id: int, to_id: int) -> bool:
+		# Edges are only part of the condensation while both of their nodes exist.
+		return self._condensation is not None and from_id in self._nodes and to_id in self._nodes
+
+	def _edges(self) -> Iterator[tuple[int, int, int]]:
+		for node in self._out.sources:
+			for edge_id, target in self._out.neighbours(node):
+				yield edge_id, node, target
+
+		for node, added in self._out.added.items():
+			if self._out.span(node):
+				continue
+
+			for edge_id, target in added:
+				yield edge_id, node, target
+
+	def _endpoints(self, edge_id: int) -> tuple[int, int] | None:
+		if edge_id in self._added_edges:
+			return self._added_edges[edge_id]
+
+		i = bisect_left(self._edge_ids, edge_id)
+
+		if i == len(self._edge_ids) or self._edge_ids[i] != edge_id or edge_id in self._out.removed:
+			return None
+
+		position = self._edge_positions[i]
+
+		return self._out.source_of(position), self._out.targets[position]
+
+	def _add_edge(self, edge_id: int, from_id: int, to_id: int) -> None:
+		self._added_edges[edge_id] = (from_id, to_id)
+		self._out.add(edge_id, from_id, to_id)
+		self._in.add(edge_id, to_id, from_id)
+
+		if self._condensed(from_id, to_id):
+			self._condensation.add_edge(from_id, to_id)
+
+	def _remove_edge(self, edge_id: int) -> None:
+		endpoints = self._endpoints(edge_id)
+
+		if endpoints is None:
+			return
+
+		from_id, to_id = endpoints
+
+		if edge_id in self._added_edges:
+			del self._added_edges[edge_id]
+			self._out.discard_added(edge_id, from_id, to_id)
+			self._in.discard_added(edge_id, to_id, from_id)
+		else:
+			self._out.removed.add(edge_id)
+			self._in.removed.add(edge_id)
+
+		if self._condensed(from_id, to_id):
+			self._condensation.remove_edge(from_id, to_id)
+
+	def _mutated(self) -> None:
+		self._generation += 1
+
+		if not self._loaded:
+			# Nothing to maintain yet, the next load reads the committed state from the database.
+			self._build([], [])
+			return
+
+		pending = len(self._added_edges) + len(self._out.removed)
+
+		if pending > max(COMPACTION_THRESHOLD, len(self._out.edge_ids) // 4):
+			self._build(self._nodes, list(self._edges()), condense=False)
+
+	def load(self, db: Session) -> bool:
+		"""
+		(Re)builds the index from the database. If the graph is mutated while it is being read, the read is retried.
+		Every attempt reads in a session of its own, so it sees the changes committed since the previous attempt
+		instead of the snapshot of the caller's transaction. If the graph is still mutated during the last attempt,
+		the index stays unloaded, so it never misses a committed change.
+		:param db: Database session, only its engine is used
+		:return: Whether the index was loaded
+		"""
+
+		nodes = select(Node.id)
+		edges = select(Edge.id, Edge.from_node_id, Edge.to_node_id).order_by(Edge.from_node_id, Edge.id)
+
+		if self._graph_id is not None:
+			nodes = nodes.where(Node.graph_id == self._graph_id)
+			edges = edges.where(Edge.graph_id == self._graph_id)
+
+		for _ in range(LOAD_ATTEMPTS):
+			generation = self._generation
+
+			with Session(bind=db.get_bind(), autoflush=False) as load_db:
+				node_ids = load_db.scalars(nodes).all()
+				edge_rows = load_db.execute(edges).tuples().all()
+
+			with self._lock:
+				if generation == self._generation:
+					self._build(node_ids, edge_rows)
+					self._loaded = True
+					return True
+
+		return False
+
+	def ensure_loaded(self, db: Session) -> bool:
+		"""
+		Loads the index unless it is loaded already.
+		:return: Whether the index is loaded, queries fall back to the database otherwise
+		"""
+
+		return self._loaded or self.load(db)
+
+	def clear(self) -> None:
+		with self._lock:
+			self._build([], [])
+			self._generation += 1
+
+	def invalidate(self) -> None:
+		"""
+		Drops the index contents, the next query rebuilds it from the database.
+		"""
+
+		with self._lock:
+			self._loaded = False
+			self._generation += 1
+			self._build([], [])
+
+	def has_node(self, node_id: int) -> bool:
+		return node_id in self._nodes
+
+	def add_nodes(self, node_ids: Iterable[int]) -> None:
+		with self._lock:
+			for node_id in node_ids:
+				if node_id in self._nodes:
+					continue
+
+				self._nodes.add(node_id)
+
+				if self._condensation is not None:
+					self._condensation.add_node(node_id)
+
+			self._mutated()
+
+	def remove_nodes(self, node_ids: Iterable[int]) -> None:
+		"""
+		Removes the nodes together with every incoming and outgoing edge, mirroring ``ON DELETE CASCADE``.
+		"""
+
+		with self._lock:
+			for node_id in node_ids:
+				incident = ([edge_id for edge_id, _ in self._out.neighbours(node_id)] +
+							[edge_id for edge_id, _ in self._in.neighbours(node_id)])
+
+				for edge_id in incident:
+					self._remove_edge(edge_id)
+
+				if node_id in self._nodes:
+					self._nodes.remove(node_id)
+
+					if self._condensation is not None:
+						self._condensation.remove_node(node_id)
+
+			self._mutated()
+
+	def add_edges(self, edges: Iterable[tuple[int, int, int]]) -> None:
+		"""
+		:param edges: (edge ID, from node ID, to node ID) tuples
+		"""
+
+		with self._lock:
+			for edge_id, from_id, to_id in edges:
+				self._add_edge(edge_id, from_id, to_id)
+
+			self._mutated()
+
+	def replace_edges(self, edges: Iterable[tuple[int, int, int]]) -> None:
+		"""
+		Overwrites the endpoints of existing edges, e.g. after their direction is swapped.
+		:param edges: (edge ID, from node ID, to node ID) tuples
+		"""
+
+		with self._lock:
+			for edge_id, from_id, to_id in edges:
+				if self._endpoints(edge_id) == (from_id, to_id):
+					continue
+
+				self._remove_edge(edge_id)
+				self._add_edge(edge_id, from_id, to_id)
+
+			self._mutated()
+
+	def remove_edges(self, edge_ids: Iterable[int]) -> None:
+		with self._lock:
+			for edge_id in edge_ids:
+				self._remove_edge(edge_id)
+
+			self._mutated()
+
+	def _expand(self, frontier: list[int]) -> Iterator[Iterator[int]]:
+		for node_id in frontier:
+			yield (neighbour for _, neighbour in self._out.neighbours(node_id))
+
+	def _expand_backward(self, frontier: list[int]) -> Iterator[Iterator[int]]:
+		for node_id in frontier:
+			yield (neighbour for _, neighbour in self._in.neighbours(node_id))
+
+	def reachable(self,
+				  start_node_id: int,
+				  max_depth: int | None = None,
+				  limit: int | None = None,
+				  deadline: float | None = None) -> Traversal:
+		"""
+		Traverses the nodes reachable from the start node (inclusive) breadth-first, visiting the outgoing edges of
+		each node in edge ID order. See ``traversal.breadth_first`` for the bounds.
+
+		If the condensation is maintained, unbounded traversals are answered from the component DAG instead, see
+		``Condensation.reachable`` for the order of the nodes. Depths are only returned by breadth-first traversals.
+		:param start_node_id: ID of the node to start traversal from
+		:return: Traversal result, empty if the start node does not exist
+		"""
+
+		with self._lock:
+			if start_node_id not in self._nodes:
+				return Traversal()
+
+			if self._condensation is not None and max_depth is None and limit is None and deadline is None:
+				return Traversal(self._condensation.reachable(start_node_id))
+
+			return breadth_first(start_node_id, self._expand, max_depth, limit, deadline)
+
+	def ancestors(self,
+				  start_node_id: int,
+				  max_depth: int | None = None,
+				  limit: int | None = None,
+				  deadline: float | None = None) -> Traversal:
+		"""
+		Traverses the nodes the start node is reachable from (inclusive) breadth-first, visiting the incoming edges of
+		each node in edge ID order. See ``traversal.breadth_first`` for the bounds.
+		:param start_node_id: ID of the node to start traversal from
+		:return: Traversal result, empty if the start node does not exist
+		"""
+
+		with self._lock:
+			if start_node_id not in self._nodes:
+				return Traversal()
+
+			return breadth_first(start_node_id, self._expand_backward, max_depth, limit, deadline)
+
+	def shortest_path(self, source_node_id: int, target_node_id: int) -> list[int] | None:
+		"""
+		Finds a shortest directed path between two existing nodes, see ``traversal.shortest_path``.
+		:return: Node IDs of the path, or None if the target is not reachable from the source
+		"""
+
+		with self._lock:
+			return shortest_path(source_node_id, target_node_id, self._expand, self._expand_backward)
+
+
+class GraphIndexes:
+	"""
+	The indexes of the graphs of all namespaces, each created by the first query of its graph and loaded from the
+	database on demand. Retired graphs are discarded, their nodes and edges never change again.
+	"""
+
+	def __init__(self, condensation: bool = False):
+		"""
+		:param condensation: Whether the indexes maintain the strongly connected components of their graph
+		"""
+
+		self._condensation = condensation
+		self._lock = Lock()
+		self._indexes: dict[int, GraphIndex] = {}
+
+	def get(self, graph_id: int) -> GraphIndex:
+		"""
+		Returns the index of the graph, an empty unloaded index if the graph has none yet.
+		"""
+
+		with self._lock:
+			if (index := self._indexes.get(graph_id)) is None:
+				index = self._indexes[graph_id] = GraphIndex(self._condensation, graph_id)
+
+			return index
+
+	def load(self, db: Session, graph_ids: Iterable[int]) -> None:
+		"""
+		Loads the indexes of the given graphs from the database.
+		"""
+
+		for graph_id in graph_ids:
+			self.get(graph_id).load(db)
+
+	def discard(self, graph_id: int) -> None:
+		with self._lock:
+			self._indexes.pop(graph_id, None)
+
+	def invalidate(self) -> None:
+		"""
+		Drops all indexes, the next query of each graph rebuilds its index from the database.
+		"""
+
+		with self._lock:
+			for index in self._indexes.values():
+				index.invalidate()
+
+			self._indexes.clear()
+
+
+graph_indexes = GraphIndexes(condensation=settings.graph_index_condensation)
@@ -0,0 +1,174 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from threading import Lock
+from time import perf_counter
+
+from typing_extensions import Iterator
+
+from sqlalchemy import Engine, event
+
+from app.core.config import settings
+from app.core.metrics import Metric, register_collector
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of characters of a statement in the slow query log.
+SLOW_QUERY_STATEMENT_LENGTH = 1000
+
+
+@dataclass
+class RequestStats:
+	"""
+	Database and serialization work of a single request.
+	"""
+
+	queries: int = 0
+	db_seconds: float = 0.0
+	rows: int = 0
+	serialization_seconds: float = 0.0
+
+
+@dataclass
+class _RouteStats:
+	requests: int = 0
+	seconds: float = 0.0
+	queries: int = 0
+	db_seconds: float = 0.0
+	rows: int = 0
+	serialization_seconds: float = 0.0
+
+
+@dataclass
+class RequestMetrics:
+	"""
+	Cumulative statistics of all requests, by route template and status code.
+	"""
+
+	slow_queries: int = 0
+	_routes: dict[tuple[str, str, int], _RouteStats] = field(default_factory=dict)
+	_lock: Lock = field(default_factory=Lock, repr=False, compare=False)
+
+	def record_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+		with self._lock:
+			route_stats = self._routes.setdefault((method, route, status), _RouteStats())
+			route_stats.requests += 1
+			route_stats.seconds += seconds
+			route_stats.queries += stats.queries
+			route_stats.db_seconds += stats.db_seconds
+			route_stats.rows += stats.rows
+			route_stats.serialization_seconds += stats.serialization_seconds
+
+	def record_slow_query(self) -> None:
+		with self._lock:
+			self.slow_queries += 1
+
+	def routes(self) -> list[tuple[dict[str, str], _RouteStats]]:
+		with self._lock:
+			return [({'method': method, 'route': route, 'status': str(status)}, _RouteStats(**vars(route_stats)))
+					for (method, route, status), route_stats in self._routes.items()]
+
+
+request_metrics = RequestMetrics()
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar('request_stats', default=None)
+
+
+@contextmanager
+def track_request() -> Iterator[RequestStats]:
+	"""
+	Collects the statistics of the work done in the current context, including the threads and greenlets the
+	database work is handed to, since they run in a copy of the context sharing the same statistics object.
+	"""
+
+	stats = RequestStats()
+	token = _request_stats.set(stats)
+
+	try:
+		yield stats
+	finally:
+		_request_stats.reset(token)
+
+
+@contextmanager
+def track_serialization() -> Iterator[None]:
+	"""
+	Adds the time spent in the block to the serialization time of the current request.
+	"""
+
+	start = perf_counter()
+
+	try:
+		yield
+	finally:
+		if (stats := _request_stats.get()) is not None:
+			stats.serialization_seconds += perf_counter() - start
+
+
+def _before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+	connection.info.setdefault('query_start', []).append(perf_counter())
+
+
+def _after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+	seconds = perf_counter() - connection.info['query_start'].pop()
+
+	if (stats := _request_stats.get()) is not None:
+		stats.queries += 1
+		stats.db_seconds += seconds
+		# Buffered drivers report the rows of a SELECT, otherwise this is the number of affected rows.
+		stats.rows += max(cursor.rowcount, 0)
+
+	if settings.slow_query_threshold is not None and seconds >= settings.slow_query_threshold:
+		request_metrics.record_slow_query()
+		logger.warning('Slow query (%.3f s): %s', seconds, statement[:SLOW_QUERY_STATEMENT_LENGTH])
+
+
+def _handle_error(context):
+	# Failed statements do not reach after_cursor_execute.
+	if context.connection is not None and context.connection.info.get('query_start'):
+		context.connection.info['query_start'].pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+	"""
+	Records the number, duration and rows of the queries of every request on the engine, and logs queries slower
+	than ``settings.slow_query_threshold``. For async engines, pass their ``sync_engine``.
+	"""
+
+	event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+	event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+	event.listen(engine, 'handle_error', _handle_error)
+
+
+def server_timing(stats: RequestStats, seconds: float) -> str:
+	"""
+	Formats the statistics of a request as a ``Server-Timing`` header value, durations are in milliseconds.
+	"""
+
+	return (f'db;dur={stats.db_seconds * 1000:.3f};desc="queries={stats.queries} rows={stats.rows}", '
+			f'serialize;dur={stats.serialization_seconds * 1000:.3f}, '
+			f'total;dur={seconds * 1000:.3f}')
+
+
+@register_collector
+def collect_request_metrics() -> list[Metric]:
+	routes = request_metrics.routes()
+
+	def samples(attribute: str) -> list[tuple[dict[str, str], float]]:
+		return [(labels, getattr(route_stats, attribute)) for labels, route_stats in routes]
+
+	return [
+		Metric('graph_api_requests_total', 'counter', 'Handled requests.', samples('requests')),
+		Metric('graph_api_request_seconds_total', 'counter', 'Time spent handling requests until the response starts.',
+			   samples('seconds')),
+		Metric('graph_api_db_queries_total', 'counter', 'Database queries executed by requests.', samples('queries')),
+		Metric('graph_api_db_seconds_total', 'counter', 'Time spent executing database queries of requests.',
+			   samples('db_seconds')),
+		Metric('graph_api_db_rows_total', 'counter', 'Rows returned or affected by database queries of requests.',
+			   samples('rows')),
+		Metric('graph_api_serialization_seconds_total', 'counter', 'Time spent serializing response bodies.',
+			   samples('serialization_seconds')),
+		Metric('graph_api_slow_queries_total', 'counter', 'Database queries slower than the slow query threshold.',
+			   [({}, request_metrics.slow_queries)]),
+	]
@@ -0,0 +1,53 @@
+from typing_extensions import Callable, Iterable, NamedTuple
+
+
+class Metric(NamedTuple):
+	name: str
+	kind: str
+	help: str
+	samples: list[tuple[dict[str, str], float]]
+
+
+MetricCollector = Callable[[], Iterable[Metric]]
+
+_collectors: list[MetricCollector] = []
+
+
+def register_collector(collector: MetricCollector) -> MetricCollector:
+	"""
+	Registers a function that is called on every scrape and returns the current values of its metrics.
+	"""
+
+	_collectors.append(collector)
+	return collector
+
+
+def _escape(value: str) -> str:
+	return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+	if not labels:
+		return ''
+
+	return '{' + ','.join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + '}'
+
+
+def _format_value(value: float) -> str:
+	return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_metrics() -> str:
+	"""
+	Renders all registered metrics in the Prometheus text exposition format.
+	"""
+
+	lines = []
+
+	for collector in _collectors:
+		for metric in collector():
+			lines.append(f'# HELP {metric.name} {metric.help}')
+			lines.append(f'# TYPE {metric.name} {metric.kind}')
+			lines.extend(f'{metric.name}{_format_labels(labels)} {_format_value(value)}' for labels, value in metric.samples)
+
+	return '\n'.join(lines) + '\n'
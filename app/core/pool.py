@@ -0,0 +1,127 @@
+from dataclasses import dataclass, field
+from threading import Lock
+from time import perf_counter
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+from app.core.metrics import Metric
+
+
+@dataclass
+class PoolStats:
+	"""
+	Cumulative checkout statistics of a connection pool.
+	"""
+
+	checkouts: int = 0
+	checkout_seconds: float = 0.0
+	waits: int = 0
+	wait_seconds: float = 0.0
+	overflows: int = 0
+	timeouts: int = 0
+	_lock: Lock = field(default_factory=Lock, repr=False, compare=False)
+
+	def record_checkout(self, seconds: float, waited: bool) -> None:
+		with self._lock:
+			self.checkouts += 1
+			self.checkout_seconds += seconds
+
+			if waited:
+				self.waits += 1
+				self.wait_seconds += seconds
+
+	def record_overflow(self) -> None:
+		with self._lock:
+			self.overflows += 1
+
+	def record_timeout(self) -> None:
+		with self._lock:
+			self.timeouts += 1
+
+
+class _InstrumentedPoolMixin:
+	"""
+	Records checkout latency, waits for a free connection, overflow connections and checkout timeouts of a
+	``QueuePool``.
+	"""
+
+	stats: PoolStats
+
+	def _must_wait(self) -> bool:
+		# Mirrors QueuePool._do_get, a checkout blocks when no idle connection is left and the overflow is exhausted.
+		return self._pool.empty() and -1 < self._max_overflow <= self._overflow
+
+	def connect(self):
+		waited = self._must_wait()
+		start = perf_counter()
+
+		try:
+			return super().connect()
+		except exc.TimeoutError:
+			self.stats.record_timeout()
+			raise
+		finally:
+			self.stats.record_checkout(perf_counter() - start, waited)
+
+	def _inc_overflow(self) -> bool:
+		created = super()._inc_overflow()
+
+		if created and self._overflow > 0:
+			self.stats.record_overflow()
+
+		return created
+
+	def recreate(self):
+		# Keeps the statistics when the engine replaces its pool, e.g. after Engine.dispose().
+		pool = super().recreate()
+		pool.stats = self.stats
+
+		return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.stats = PoolStats()
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.stats = PoolStats()
+
+
+def pool_metrics(pools: dict[str, QueuePool]) -> list[Metric]:
+	"""
+	Builds the pool metrics of the given pools, labelled by the dictionary keys.
+	:param pools: Pools to report, e.g. {'sync': engine.pool}
+	:return: List of metrics
+	"""
+
+	gauges = {
+		'graph_api_db_pool_size': ('Configured number of persistent connections.', lambda p: p.size()),
+		'graph_api_db_pool_checked_out': ('Connections currently checked out.', lambda p: p.checkedout()),
+		'graph_api_db_pool_checked_in': ('Idle connections in the pool.', lambda p: p.checkedin()),
+		'graph_api_db_pool_overflow': ('Current overflow, negative while the pool is not full.',
+									   lambda p: p.overflow()),
+	}
+	counters = {
+		'graph_api_db_pool_checkouts_total': ('Connection checkouts.', lambda s: s.checkouts),
+		'graph_api_db_pool_checkout_seconds_total': ('Time spent checking out connections.',
+													 lambda s: s.checkout_seconds),
+		'graph_api_db_pool_waits_total': ('Checkouts that waited for a connection to be returned.',
+										  lambda s: s.waits),
+		'graph_api_db_pool_wait_seconds_total': ('Time spent in checkouts that waited.', lambda s: s.wait_seconds),
+		'graph_api_db_pool_overflow_events_total': ('Overflow connections opened beyond the pool size.',
+													lambda s: s.overflows),
+		'graph_api_db_pool_timeouts_total': ('Checkouts that timed out.', lambda s: s.timeouts),
+	}
+
+	metrics = [Metric(name, 'gauge', description, [({'engine': label}, value(pool)) for label, pool in pools.items()])
+			   for name, (description, value) in gauges.items()]
+	metrics += [Metric(name, 'counter', description,
+					   [({'engine': label}, value(pool.stats)) for label, pool in pools.items()])
+				for name, (description, value) in counters.items()]
+
+	return metrics
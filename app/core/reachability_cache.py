@@ -0,0 +1,242 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from threading import Lock
+from time import monotonic
+
+from typing_extensions import Iterable, Protocol, Sequence
+
+from app.core.config import settings
+from app.core.metrics import Metric, register_collector
+
+
+class CacheBackend(Protocol):
+	"""
+	Storage of cached reachability results, keyed by the graph and the start node ID. Results of a graph are never
+	returned for another graph, even for a node ID of the other graph.
+
+	Besides the results, a backend keeps the graph version and the reverse dependencies of every entry (the nodes
+	contained in a result), so an invalidation drops exactly the results that contain a mutated node. Replicas share
+	cached results by using the same backend.
+	"""
+
+	def __len__(self) -> int: ...
+
+	@property
+	def evictions(self) -> int:
+		"""
+		Number of entries dropped because the backend was full or the entry expired.
+		"""
+
+	def version(self) -> int:
+		"""
+		Returns the graph version, which changes on every invalidation.
+		"""
+
+	def get(self, graph_id: int, node_id: int) -> Sequence[int] | None:
+		"""
+		Returns the cached reachable node IDs of the start node in the graph, or None if there is no valid entry.
+		"""
+
+	def put(self, graph_id: int, node_id: int, reachable_ids: Sequence[int], version: int) -> None:
+		"""
+		Stores the reachable node IDs of the start node in the graph, unless the graph version changed since
+		`version` was read.
+		"""
+
+	def invalidate(self, node_ids: Iterable[int]) -> int:
+		"""
+		Advances the graph version and drops every entry whose result contains one of the nodes.
+		:return: Number of dropped entries
+		"""
+
+	def clear(self) -> None:
+		"""
+		Advances the graph version and drops every entry.
+		"""
+
+
+class InMemoryBackend:
+	"""
+	Process-local LRU backend with an optional time to live. A single instance can be shared by several caches, which
+	stands in for a backend shared by several replicas, e.g. in tests.
+	"""
+
+	def __init__(self, max_size: int, ttl: float | None = None):
+		"""
+		:param max_size: Maximum number of entries before the least recently used entry is evicted
+		:param ttl: Seconds after which an entry expires, None to keep entries until they are evicted
+		"""
+
+		self._max_size = max_size
+		self._ttl = ttl
+		self._lock = Lock()
+		self._version = 0
+		self._evictions = 0
+		# (Graph ID, start node ID) -> (expiry, reachable node IDs), ordered from least to most recently used
+		self._entries: OrderedDict[tuple[int, int], tuple[float | None, tuple[int, ...]]] = OrderedDict()
+		# Node ID -> keys of the entries containing the node
+		self._dependents: dict[int, set[tuple[int, int]]] = {}
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+	@property
+	def evictions(self) -> int:
+		return self._evictions
+
+	def version(self) -> int:
+		return self._version
+
+	def _discard(self, key: tuple[int, int]) -> None:
+		entry = self._entries.pop(key, None)
+
+		if entry is None:
+			return
+
+		for reachable_id in entry[1]:
+			dependents = self._dependents[reachable_id]
+			dependents.discard(key)
+
+			if not dependents:
+				del self._dependents[reachable_id]
+
+	def get(self, graph_id: int, node_id: int) -> Sequence[int] | None:
+		key = (graph_id, node_id)
+
+		with self._lock:
+			entry = self._entries.get(key)
+
+			if entry is None:
+				return None
+
+			expires, reachable_ids = entry
+
+			if expires is not None and expires <= monotonic():
+				self._discard(key)
+				self._evictions += 1
+				return None
+
+			self._entries.move_to_end(key)
+
+			return reachable_ids
+
+	def put(self, graph_id: int, node_id: int, reachable_ids: Sequence[int], version: int) -> None:
+		key = (graph_id, node_id)
+
+		with self._lock:
+			if version != self._version:
+				return
+
+			self._discard(key)
+			self._entries[key] = (monotonic() + self._ttl if self._ttl is not None else None, tuple(reachable_ids))
+
+			for reachable_id in reachable_ids:
+				self._dependents.setdefault(reachable_id, set()).add(key)
+
+			while len(self._entries) > self._max_size:
+				self._discard(next(iter(self._entries)))
+				self._evictions += 1
+
+	def invalidate(self, node_ids: Iterable[int]) -> int:
+		with self._lock:
+			self._version += 1
+
+			stale = set()
+
+			for node_id in node_ids:
+				stale.update(self._dependents.get(node_id, ()))
+
+			for key in stale:
+				self._discard(key)
+
+			return len(stale)
+
+	def clear(self) -> None:
+		with self._lock:
+			self._version += 1
+			self._entries.clear()
+			self._dependents.clear()
+
+
+@dataclass
+class CacheStats:
+	"""
+	Cumulative statistics of a reachability cache.
+	"""
+
+	hits: int = 0
+	misses: int = 0
+	invalidations: int = 0
+	_lock: Lock = field(default_factory=Lock, repr=False, compare=False)
+
+	def record_lookup(self, hit: bool) -> None:
+		with self._lock:
+			if hit:
+				self.hits += 1
+			else:
+				self.misses += 1
+
+	def record_invalidations(self, count: int) -> None:
+		with self._lock:
+			self.invalidations += count
+
+
+class ReachabilityCache:
+	"""
+	Cache of unbounded reachability results in front of a pluggable backend.
+
+	Readers take the graph version before computing a result and only store it if no write invalidated the cache in
+	the meantime, so a result computed from a superseded graph is never cached. Writers invalidate after commit:
+
+	- adding, deleting or swapping an edge affects the results containing its source node (and its target node for
+	  a swap, which becomes the new source);
+	- deleting a node affects the results containing the node.
+
+	Clearing or replacing the graph of a namespace needs no invalidation, the new graph has a new ID, and the entries
+	of the retired graph are evicted like any other unused entry.
+	"""
+
+	def __init__(self, backend: CacheBackend):
+		self.backend = backend
+		self.stats = CacheStats()
+
+	def version(self) -> int:
+		return self.backend.version()
+
+	def get(self, graph_id: int, node_id: int) -> Sequence[int] | None:
+		reachable_ids = self.backend.get(graph_id, node_id)
+		self.stats.record_lookup(reachable_ids is not None)
+
+		return reachable_ids
+
+	def put(self, graph_id: int, node_id: int, reachable_ids: Sequence[int], version: int) -> None:
+		self.backend.put(graph_id, node_id, reachable_ids, version)
+
+	def invalidate(self, node_ids: Iterable[int]) -> None:
+		self.stats.record_invalidations(self.backend.invalidate(node_ids))
+
+	def clear(self) -> None:
+		self.backend.clear()
+
+
+reachability_cache = ReachabilityCache(InMemoryBackend(settings.reachability_cache_size,
+													   settings.reachability_cache_ttl))
+
+
+@register_collector
+def collect_cache_metrics() -> list[Metric]:
+	stats = reachability_cache.stats
+
+	return [
+		Metric('graph_api_reachability_cache_entries', 'gauge', 'Cached reachability results.',
+			   [({}, len(reachability_cache.backend))]),
+		Metric('graph_api_reachability_cache_hits_total', 'counter', 'Reachability lookups answered from the cache.',
+			   [({}, stats.hits)]),
+		Metric('graph_api_reachability_cache_misses_total', 'counter', 'Reachability lookups not found in the cache.',
+			   [({}, stats.misses)]),
+		Metric('graph_api_reachability_cache_evictions_total', 'counter',
+			   'Cached results dropped because the cache was full or the result expired.',
+			   [({}, reachability_cache.backend.evictions)]),
+		Metric('graph_api_reachability_cache_invalidations_total', 'counter',
+			   'Cached results dropped because the graph changed.', [({}, stats.invalidations)]),
+	]
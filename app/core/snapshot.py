@@ -0,0 +1,168 @@
+"""
+Compact binary snapshot format of a graph.
+
+A snapshot is a fixed 32 byte header followed by four columns of little-endian unsigned 32-bit integers:
+
+===========  ================  ==================================================
+Offset       Size              Content
+===========  ================  ==================================================
+0            8                 Magic ``GRPHSNAP``
+8            2                 Format version
+10           2                 Flags, bit 0 marks a zlib compressed body
+12           4                 Reserved
+16           8                 Number of nodes ``n``
+24           8                 Number of edges ``m``
+32           4 * n             Node IDs, delta-encoded
+32 + 4n      4 * m             Edge IDs, delta-encoded
+32 + 4n+4m   4 * m             From node IDs
+32 + 4n+8m   4 * m             To node IDs
+===========  ================  ==================================================
+
+IDs are sorted ascending before they are delta-encoded, the first delta is the first ID itself. Edge endpoints are
+stored in edge ID order. Every column of an uncompressed snapshot is 4 byte aligned, so a memory-mapped file is read
+without copying its columns.
+"""
+
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+from dataclasses import dataclass
+from itertools import accumulate
+
+from typing_extensions import Iterable, Sequence
+
+MAGIC = b'GRPHSNAP'
+FORMAT_VERSION = 1
+FLAG_COMPRESSED = 0x1
+
+_HEADER = struct.Struct('<8sHH4xQQ')
+# Size of the items of every column, the size of the array type code 'I' on all supported platforms
+_ITEM_SIZE = 4
+
+
+@dataclass
+class Snapshot:
+	"""
+	Columns of a decoded snapshot. Columns of uncompressed snapshots are views of the underlying buffer.
+	"""
+
+	node_id_deltas: Sequence[int]
+	edge_id_deltas: Sequence[int]
+	from_node_ids: Sequence[int]
+	to_node_ids: Sequence[int]
+
+	@property
+	def node_count(self) -> int:
+		return len(self.node_id_deltas)
+
+	@property
+	def edge_count(self) -> int:
+		return len(self.edge_id_deltas)
+
+	def node_ids(self) -> list[int]:
+		return list(accumulate(self.node_id_deltas))
+
+	def edge_ids(self) -> list[int]:
+		return list(accumulate(self.edge_id_deltas))
+
+
+def _column(values: Iterable[int]) -> array:
+	column = array('I', values)
+
+	if sys.byteorder != 'little':
+		column.byteswap()
+
+	return column
+
+
+def _deltas(ids: Sequence[int]) -> array:
+	return _column(current - previous for previous, current in zip([0, *ids], ids))
+
+
+def write_snapshot(node_ids: Sequence[int], edges: Sequence[tuple[int, int, int]], compress: bool = False) -> bytes:
+	"""
+	Encodes a graph as a snapshot.
+	:param node_ids: Node IDs in ascending order
+	:param edges: (edge ID, from node ID, to node ID) tuples in ascending edge ID order
+	:param compress: Whether to compress the columns with zlib
+	:return: Snapshot bytes
+	"""
+
+	body = b''.join(column.tobytes() for column in (_deltas(node_ids),
+													_deltas([edge[0] for edge in edges]),
+													_column(edge[1] for edge in edges),
+													_column(edge[2] for edge in edges)))
+
+	if compress:
+		body = zlib.compress(body)
+
+	header = _HEADER.pack(MAGIC, FORMAT_VERSION, FLAG_COMPRESSED if compress else 0, len(node_ids), len(edges))
+
+	return header + body
+
+
+def read_snapshot(buffer: bytes | bytearray | memoryview | mmap.mmap) -> Snapshot:
+	"""
+	Decodes a snapshot. The columns of an uncompressed snapshot reference the buffer instead of copying it.
+	:raises ValueError: If the buffer is not a valid snapshot
+	"""
+
+	view = memoryview(buffer)
+
+	if len(view) < _HEADER.size:
+		raise ValueError('Snapshot is shorter than its header.')
+
+	magic, version, flags, node_count, edge_count = _HEADER.unpack_from(view)
+
+	if magic != MAGIC:
+		raise ValueError('Not a graph snapshot.')
+	if version != FORMAT_VERSION:
+		raise ValueError(f'Unsupported snapshot version {version}.')
+
+	body = view[_HEADER.size:]
+	body_size = (node_count + 3 * edge_count) * _ITEM_SIZE
+
+	if flags & FLAG_COMPRESSED:
+		# The output is capped just above the expected size, so a malformed body cannot exhaust the memory.
+		decompressor = zlib.decompressobj()
+
+		try:
+			body = memoryview(decompressor.decompress(body, body_size + 1))
+		except zlib.error as error:
+			raise ValueError(f'Snapshot body cannot be decompressed: {error}.') from None
+
+		if not decompressor.eof or decompressor.unconsumed_tail or decompressor.unused_data:
+			raise ValueError('Snapshot body is truncated or followed by trailing data.')
+
+	if len(body) != body_size:
+		raise ValueError('Snapshot size does not match its node and edge counts.')
+
+	if sys.byteorder == 'little':
+		columns = body.cast('I')
+	else:
+		columns = array('I', body.tobytes())
+		columns.byteswap()
+
+	snapshot = Snapshot(node_id_deltas=columns[:node_count],
+						edge_id_deltas=columns[node_count:node_count + edge_count],
+						from_node_ids=columns[node_count + edge_count:node_count + 2 * edge_count],
+						to_node_ids=columns[node_count + 2 * edge_count:])
+
+	for deltas in (snapshot.node_id_deltas, snapshot.edge_id_deltas):
+		if any(delta == 0 for delta in deltas):
+			raise ValueError('Snapshot IDs are not strictly ascending.')
+
+	return snapshot
+
+
+def open_snapshot(path: str) -> Snapshot:
+	"""
+	Memory-maps a snapshot file and decodes it, the columns of an uncompressed snapshot are read lazily from the
+	mapping. The mapping stays open as long as the snapshot is referenced.
+	:raises ValueError: If the file is not a valid snapshot
+	"""
+
+	with open(path, 'rb') as file:
+		return read_snapshot(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
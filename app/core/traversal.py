@@ -0,0 +1,164 @@
+from dataclasses import dataclass, field
+from time import monotonic
+
+from typing_extensions import Callable, Iterable
+
+# Number of visited nodes between two deadline checks within a level.
+DEADLINE_CHECK_INTERVAL = 1024
+
+
+@dataclass
+class Traversal:
+	"""
+	Result of a breadth-first traversal.
+	"""
+
+	node_ids: list[int] = field(default_factory=list)
+	depths: list[int] = field(default_factory=list)
+	truncated: bool = False
+
+
+def breadth_first(start_node_id: int,
+				  expand: Callable[[list[int]], Iterable[Iterable[int]]],
+				  max_depth: int | None = None,
+				  limit: int | None = None,
+				  deadline: float | None = None) -> Traversal:
+	"""
+	Traverses the graph level by level from the start node (inclusive) and returns the visited nodes in breadth-first
+	order, visiting the neighbours of each node in the order they are returned.
+
+	The bounds are enforced while traversing: no level deeper than `max_depth` is expanded, the traversal stops as
+	soon as `limit` nodes are visited or the `deadline` passes. The result is marked as truncated if any reachable
+	node was left out.
+
+	:param start_node_id: ID of the node to start traversal from
+	:param expand: Returns the neighbour IDs of each node of a level, in the order of the level
+	:param max_depth: Maximum number of hops from the start node
+	:param limit: Maximum number of nodes to visit
+	:param deadline: ``time.monotonic()`` value after which the traversal stops
+	:return: Visited node IDs with their hop distance from the start node
+	"""
+
+	result = Traversal([start_node_id], [0])
+	visited = {start_node_id}
+	frontier = [start_node_id]
+	depth = 0
+
+	while frontier:
+		if deadline is not None and monotonic() > deadline:
+			result.truncated = True
+			break
+
+		depth += 1
+		next_frontier = []
+
+		for neighbours in expand(frontier):
+			for neighbour in neighbours:
+				if neighbour in visited:
+					continue
+
+				# Nodes beyond the bounds are only looked at to report the truncation, never expanded.
+				if (max_depth is not None and depth > max_depth) or (limit is not None and len(visited) >= limit):
+					result.truncated = True
+					return result
+
+				visited.add(neighbour)
+				next_frontier.append(neighbour)
+				result.node_ids.append(neighbour)
+				result.depths.append(depth)
+
+				if (deadline is not None and len(visited) % DEADLINE_CHECK_INTERVAL == 0
+						and monotonic() > deadline):
+					result.truncated = True
+					return result
+
+		frontier = next_frontier
+
+	return result
+
+
+class _Search:
+	"""
+	One side of a bidirectional breadth-first search.
+	"""
+
+	def __init__(self, node_id: int, expand: Callable[[list[int]], Iterable[Iterable[int]]]):
+		self.expand = expand
+		self.frontier = [node_id]
+		# Node ID -> the node it was discovered from and its distance from the side's start node.
+		self.parents: dict[int, int | None] = {node_id: None}
+		self.depths = {node_id: 0}
+
+	def expand_level(self, other: '_Search') -> int | None:
+		"""
+		Expands the frontier by one level and returns the discovered node closest to the start of the other side, if
+		any of them was already discovered by it.
+		"""
+
+		next_frontier = []
+		meeting_node_id = None
+
+		for node_id, neighbours in zip(self.frontier, self.expand(self.frontier)):
+			for neighbour in neighbours:
+				if neighbour in self.parents:
+					continue
+
+				self.parents[neighbour] = node_id
+				self.depths[neighbour] = self.depths[node_id] + 1
+				next_frontier.append(neighbour)
+
+				if neighbour in other.depths and (meeting_node_id is None or
+												  other.depths[neighbour] < other.depths[meeting_node_id]):
+					meeting_node_id = neighbour
+
+		self.frontier = next_frontier
+
+		return meeting_node_id
+
+	def path_to(self, node_id: int) -> list[int]:
+		"""
+		Returns the path from the node back to the start node of this side.
+		"""
+
+		path = []
+
+		while node_id is not None:
+			path.append(node_id)
+			node_id = self.parents[node_id]
+
+		return path
+
+
+def shortest_path(source_node_id: int,
+				  target_node_id: int,
+				  expand_forward: Callable[[list[int]], Iterable[Iterable[int]]],
+				  expand_backward: Callable[[list[int]], Iterable[Iterable[int]]]) -> list[int] | None:
+	"""
+	Finds a shortest directed path between two nodes with a bidirectional breadth-first search. The smaller of the two
+	frontiers is expanded one level at a time, following outgoing edges from the source and incoming edges into the
+	target, until the frontiers meet.
+
+	:param source_node_id: ID of the first node of the path
+	:param target_node_id: ID of the last node of the path
+	:param expand_forward: Returns the successor IDs of each node of a level, in the order of the level
+	:param expand_backward: Returns the predecessor IDs of each node of a level, in the order of the level
+	:return: Node IDs of the path from the source to the target, or None if the target is not reachable
+	"""
+
+	if source_node_id == target_node_id:
+		return [source_node_id]
+
+	forward = _Search(source_node_id, expand_forward)
+	backward = _Search(target_node_id, expand_backward)
+
+	while forward.frontier and backward.frontier:
+		search, other = (forward, backward) if len(forward.frontier) <= len(backward.frontier) else (backward, forward)
+
+		# All nodes discovered in one level are equally far from the expanded side, so the first level in which the
+		# frontiers meet contains a shortest path, through the meeting node closest to the other side.
+		meeting_node_id = search.expand_level(other)
+
+		if meeting_node_id is not None:
+			return forward.path_to(meeting_node_id)[::-1] + backward.path_to(meeting_node_id)[1:]
+
+	return None
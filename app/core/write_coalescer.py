@@ -0,0 +1,238 @@
+"""
+Group commit of concurrent single-item mutations.
+
+Every mutation commits its own transaction, so a burst of small concurrent writes is bound by the time the database
+takes to make each commit durable. The write coalescer queues the mutations that arrive within a short window and
+applies them one after another in a single transaction, so the whole batch pays for one commit.
+
+Every mutation of a batch runs in a session of its own that joins the transaction of the batch with a savepoint. The
+``commit`` and ``rollback`` of the unchanged service and repository functions then only release or roll back that
+savepoint, so a mutation that fails, e.g. with a ``NodeNotFoundError``, leaves no trace and the other mutations of the
+batch are unaffected. Each caller receives its own result or its own exception. The in-memory state derived from
+the mutations (see ``after_commit``) is only updated once the batch is committed.
+
+If the batch fails as a whole before its commit, e.g. on a deadlock or a lost connection, it is rolled back and its
+mutations are retried one by one in transactions of their own, exactly as without the coalescer. A failed commit is
+never retried, since it may have succeeded nonetheless: every caller of the batch receives the error of the commit,
+as it would for a commit of its own.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+
+from typing_extensions import Any, Callable, TypeVar
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import AFTER_COMMIT_HOOKS, DbSession, open_db, run_db
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class _CommitError(Exception):
+	"""
+	Raised by ``apply_writes`` if the commit of the batch failed, wrapping the error of the commit and carrying the
+	outcomes of the mutations.
+	"""
+
+	def __init__(self, error: Exception, outcomes: list[Any]):
+		super().__init__(error)
+		self.error = error
+		self.outcomes = outcomes
+
+
+@dataclass
+class _Write:
+	func: Callable[..., Any]
+	args: tuple
+	future: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+def apply_writes(db: Session, writes: list[_Write]) -> tuple[list[Any], list[Callable[[], None]]]:
+	"""
+	Applies the mutations in order in a single transaction of the session, each in a savepoint of its own.
+	:param db: Session of the batch
+	:param writes: Mutations to apply
+	:return: Result or exception of every mutation, and the hooks collected by ``after_commit`` of the mutations that
+	succeeded, which are due now that the batch is committed
+	:raises SQLAlchemyError: If the batch failed as a whole before its commit and nothing was committed
+	:raises _CommitError: If the commit failed, whether it took effect is unknown
+	"""
+
+	connection = db.connection()
+	outcomes, hooks = [], []
+
+	for write in writes:
+		with Session(bind=connection, autoflush=False, join_transaction_mode='create_savepoint') as write_db:
+			write_db.info[AFTER_COMMIT_HOOKS] = write_hooks = []
+
+			try:
+				outcomes.append(write.func(write_db, *write.args))
+				write_db.commit()
+			except SQLAlchemyError:
+				raise
+			except Exception as e:
+				write_db.rollback()
+				outcomes.append(e)
+				continue
+
+		hooks.extend(write_hooks)
+
+	try:
+		db.commit()
+	except Exception as e:
+		raise _CommitError(e, outcomes) from e
+
+	return outcomes, hooks
+
+
+class WriteCoalescer:
+	"""
+	Queue of the mutations waiting for the next group commit of the event loop. A single batch is applied at a time,
+	mutations arriving meanwhile are collected for the next one.
+	"""
+
+	def __init__(self, window: float, max_batch_size: int):
+		"""
+		:param window: Seconds to wait for further mutations before a batch is applied
+		:param max_batch_size: Maximum number of mutations per batch
+		"""
+
+		self._window = window
+		self._max_batch_size = max_batch_size
+		self._pending: list[_Write] = []
+		self._batch: list[_Write] = []
+		self._flusher: asyncio.Task | None = None
+
+	async def submit(self, func: Callable[..., T], *args) -> T:
+		"""
+		Queues a mutation and waits until its batch is committed.
+		:param func: Service function taking a ``Session`` as its first argument
+		:return: Return value of the function
+		:raises Exception: The exception raised by the function
+		"""
+
+		write = _Write(func, args)
+		self._pending.append(write)
+
+		if self._flusher is None:
+			self._flusher = asyncio.create_task(self._flush())
+			self._flusher.add_done_callback(self._flushed)
+
+		return await write.future
+
+	async def _flush(self) -> None:
+		while True:
+			if len(self._pending) < self._max_batch_size:
+				await asyncio.sleep(self._window)
+
+			self._batch = self._pending[:self._max_batch_size]
+			del self._pending[:self._max_batch_size]
+
+			outcomes = await self._apply(self._batch)
+
+			# Decided before the callers are resumed, so a mutation queued afterwards starts a new flusher.
+			if not self._pending:
+				self._flusher = None
+
+			for write, outcome in zip(self._batch, outcomes):
+				# The caller is gone if its request was cancelled meanwhile.
+				if write.future.done():
+					continue
+
+				if isinstance(outcome, Exception):
+					write.future.set_exception(outcome)
+				else:
+					write.future.set_result(outcome)
+
+			self._batch = []
+
+			if self._flusher is None:
+				return
+
+	def _flushed(self, flusher: asyncio.Task) -> None:
+		# Also called if the flusher was cancelled, even before it started, e.g. when the event loop shuts down, or
+		# failed unexpectedly. The queued mutations must not wait for a flusher that is gone.
+		if self._flusher is flusher:
+			self._flusher = None
+
+		if not flusher.cancelled() and flusher.exception() is None:
+			return
+
+		writes = self._batch + self._pending
+		self._batch = []
+		self._pending.clear()
+
+		if not flusher.cancelled():
+			logger.error('Write coalescer failed, failing %d queued writes', len(writes), exc_info=flusher.exception())
+
+		for write in writes:
+			if write.future.done():
+				continue
+
+			if flusher.cancelled():
+				write.future.cancel()
+			else:
+				write.future.set_exception(flusher.exception())
+
+	@staticmethod
+	async def _apply(batch: list[_Write]) -> list[Any]:
+		outcomes = hooks = None
+
+		try:
+			async with open_db() as db:
+				outcomes, hooks = await run_db(db, apply_writes, batch)
+		except _CommitError as e:
+			logger.error('Group commit of %d writes failed: %s', len(batch), e.error)
+			# Mutations that failed on their own keep their own error, the others share the error of the commit.
+			return [outcome if isinstance(outcome, Exception) else e.error for outcome in e.outcomes]
+		except Exception:
+			# Closing the session of a committed batch may fail as well, its mutations must not be applied again.
+			if outcomes is None:
+				logger.warning('Batch of %d writes failed, retrying them one by one', len(batch), exc_info=True)
+				return await WriteCoalescer._apply_one_by_one(batch)
+
+			logger.exception('Closing the session of a committed batch failed')
+
+		for hook in hooks:
+			try:
+				hook()
+			except Exception:
+				# The batch is committed, a failing hook must neither fail its callers nor the other hooks.
+				logger.exception('After-commit hook of a coalesced write failed')
+
+		return outcomes
+
+	@staticmethod
+	async def _apply_one_by_one(batch: list[_Write]) -> list[Any]:
+		# Nothing of the batch was committed.
+		outcomes = []
+
+		for write in batch:
+			try:
+				async with open_db() as db:
+					outcomes.append(await run_db(db, write.func, *write.args))
+			except Exception as e:
+				outcomes.append(e)
+
+		return outcomes
+
+
+write_coalescer = WriteCoalescer(settings.write_coalescing_window, settings.write_coalescing_max_batch_size)
+
+
+async def run_write(db: DbSession, func: Callable[..., T], *args) -> T:
+	"""
+	Runs a single-item mutation like ``run_db``, through the write coalescer if it is enabled. The session of the
+	request is then left unused, the coalescer opens the sessions of its batches.
+	"""
+
+	if settings.write_coalescing_enabled:
+		return await write_coalescer.submit(func, *args)
+
+	return await run_db(db, func, *args)
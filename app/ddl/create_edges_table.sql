@@ -1,20 +1,22 @@
 CREATE TABLE IF NOT EXISTS edges (
     id INT UNSIGNED NOT NULL AUTO_INCREMENT,
+    graph_id     INT UNSIGNED NOT NULL,
     from_node_id INT UNSIGNED NOT NULL,
     to_node_id   INT UNSIGNED NOT NULL,
 
     PRIMARY KEY (id),
 
-    KEY idx_edges_from_node (from_node_id),
-    KEY idx_edges_to_node   (to_node_id),
+    KEY idx_edges_from_node (from_node_id, graph_id),
+    KEY idx_edges_to_node   (to_node_id, graph_id),
+    KEY idx_edges_graph     (graph_id, id),
 
     CONSTRAINT fk_edges_from
-        FOREIGN KEY (from_node_id)
-        REFERENCES nodes(id)
+        FOREIGN KEY (from_node_id, graph_id)
+        REFERENCES nodes(id, graph_id)
         ON DELETE CASCADE,
 
     CONSTRAINT fk_edges_to
-        FOREIGN KEY (to_node_id)
-        REFERENCES nodes(id)
+        FOREIGN KEY (to_node_id, graph_id)
+        REFERENCES nodes(id, graph_id)
         ON DELETE CASCADE
 ) ENGINE=InnoDB;
\ No newline at end of file
@@ -0,0 +1,9 @@
+CREATE TABLE IF NOT EXISTS graphs (
+    id        INT UNSIGNED    NOT NULL AUTO_INCREMENT,
+    namespace VARCHAR(64)     NULL,
+    version   BIGINT UNSIGNED NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (id),
+
+    UNIQUE KEY uq_graphs_namespace (namespace)
+) ENGINE=InnoDB;
\ No newline at end of file
@@ -1,4 +1,13 @@
 CREATE TABLE IF NOT EXISTS nodes (
-    id INT UNSIGNED NOT NULL AUTO_INCREMENT,
-    PRIMARY KEY (id)
+    id       INT UNSIGNED NOT NULL AUTO_INCREMENT,
+    graph_id INT UNSIGNED NOT NULL,
+
+    PRIMARY KEY (id),
+
+    UNIQUE KEY uq_nodes_id_graph (id, graph_id),
+    KEY idx_nodes_graph (graph_id, id),
+
+    CONSTRAINT fk_nodes_graph
+        FOREIGN KEY (graph_id)
+        REFERENCES graphs(id)
 ) ENGINE=InnoDB;
\ No newline at end of file
@@ -0,0 +1,18 @@
+CREATE TABLE IF NOT EXISTS reachability (
+    src INT UNSIGNED NOT NULL,
+    dst INT UNSIGNED NOT NULL,
+
+    PRIMARY KEY (src, dst),
+
+    KEY idx_reachability_dst (dst, src),
+
+    CONSTRAINT fk_reachability_src
+        FOREIGN KEY (src)
+        REFERENCES nodes(id)
+        ON DELETE CASCADE,
+
+    CONSTRAINT fk_reachability_dst
+        FOREIGN KEY (dst)
+        REFERENCES nodes(id)
+        ON DELETE CASCADE
+) ENGINE=InnoDB;
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""
+Gunicorn configuration of the multi-worker serving mode.
+
+Usage: ``gunicorn app.main:server -c app/gunicorn_conf.py``
+
+The application is imported once by the master process and the workers are forked from it with the imported modules
+already in memory, so starting or replacing a worker does not import the application again. The master creates
+missing tables before it forks, the workers inherit the result of the schema check and skip it. The number of workers
+is taken from ``WEB_CONCURRENCY`` and defaults to the number of CPUs.
+
+The graph index and the in-memory reachability cache only observe the writes of their own process, so the master
+refuses to start several workers while either is enabled.
+"""
+
+import os
+
+from app.core.database import dispose_engines, ensure_schema
+from app.core.config import settings
+
+bind = f'0.0.0.0:{os.environ.get("PORT", 8000)}'
+workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+worker_class = 'uvicorn_worker.UvicornWorker'
+preload_app = True
+
+
+def on_starting(server):
+	if server.cfg.workers > 1 and (settings.graph_index_enabled or settings.reachability_cache_enabled):
+		raise RuntimeError('The graph index and the reachability cache are process-local and would serve stale data '
+						   'with several workers. Set WEB_CONCURRENCY=1 or disable them.')
+
+	if settings.schema_setup_enabled:
+		ensure_schema()
+		# The workers must not share the connections of the master.
+		dispose_engines()
@@ -1,18 +1,45 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 
-from app.api.handlers import node_not_found_handler, edge_not_found_handler
+from app.api.handlers import (node_not_found_handler, edge_not_found_handler, invalid_snapshot_handler,
+							  concurrent_modification_handler)
 from app.core import exceptions
+from app.api.middleware import InstrumentationMiddleware
+from app.api.responses import TimedJSONResponse
 from app.api.router import api_router
 from app.core.config import settings
+from app.core.database import ensure_schema, open_db, run_db
+from app.services import graph_service
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+	if settings.schema_setup_enabled:
+		await run_in_threadpool(ensure_schema)
+
+	if settings.graph_index_enabled:
+		async with open_db() as db:
+			await run_db(db, graph_service.load_graph_indexes)
+
+	yield
+
 
 docs_url = '/docs' if settings.debug_mode else None
 redoc_url = '/redoc' if settings.debug_mode else None
 server = FastAPI(title=settings.name,
 				 debug=settings.debug_mode,
 				 docs_url=docs_url,
-				 redoc_url=redoc_url)
+				 redoc_url=redoc_url,
+				 default_response_class=TimedJSONResponse,
+				 lifespan=lifespan)
+
+server.add_middleware(InstrumentationMiddleware)
 
 server.add_exception_handler(exceptions.NodeNotFoundError, node_not_found_handler)
 server.add_exception_handler(exceptions.EdgeNotFoundError, edge_not_found_handler)
+server.add_exception_handler(exceptions.InvalidSnapshotError, invalid_snapshot_handler)
+server.add_exception_handler(exceptions.ConcurrentModificationError, concurrent_modification_handler)
 
 server.include_router(api_router)
@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, ForeignKey
+from sqlalchemy import Integer, ForeignKeyConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.models.base import Base
@@ -6,7 +6,16 @@ from app.models.base import Base
 
 class Edge(Base):
 	__tablename__ = 'edges'
+	# The foreign keys include the graph, so both nodes of an edge belong to the graph of the edge.
+	__table_args__ = (ForeignKeyConstraint(['from_node_id', 'graph_id'], ['nodes.id', 'nodes.graph_id'],
+										   ondelete='CASCADE'),
+					  ForeignKeyConstraint(['to_node_id', 'graph_id'], ['nodes.id', 'nodes.graph_id'],
+										   ondelete='CASCADE'),
+					  Index('idx_edges_from_node', 'from_node_id', 'graph_id'),
+					  Index('idx_edges_to_node', 'to_node_id', 'graph_id'),
+					  Index('idx_edges_graph', 'graph_id', 'id'))
 
 	id: Mapped[int] = mapped_column(Integer, primary_key=True)
-	from_node_id: Mapped[int] = mapped_column(Integer, ForeignKey('nodes.id', ondelete='CASCADE'))
-	to_node_id: Mapped[int] = mapped_column(Integer, ForeignKey('nodes.id', ondelete='CASCADE'))
+	graph_id: Mapped[int] = mapped_column(Integer)
+	from_node_id: Mapped[int] = mapped_column(Integer)
+	to_node_id: Mapped[int] = mapped_column(Integer)
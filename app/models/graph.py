@@ -0,0 +1,16 @@
+from sqlalchemy import BigInteger, Integer, ScalarSelect, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class Graph(Base):
+	__tablename__ = 'graphs'
+
+	id: Mapped[int] = mapped_column(Integer, primary_key=True)
+	namespace: Mapped[str | None] = mapped_column(String(64), unique=True)
+	version: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+# ID of a graph in the statements scoped to it, either the ID itself or a subquery selecting it.
+GraphId = int | ScalarSelect[int]
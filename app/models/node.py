@@ -1,4 +1,4 @@
-from sqlalchemy import Integer
+from sqlalchemy import Integer, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.models.base import Base
@@ -6,5 +6,8 @@ from app.models.base import Base
 
 class Node(Base):
 	__tablename__ = 'nodes'
+	__table_args__ = (UniqueConstraint('id', 'graph_id', name='uq_nodes_id_graph'),
+					  Index('idx_nodes_graph', 'graph_id', 'id'))
 
 	id: Mapped[int] = mapped_column(Integer, primary_key=True)
+	graph_id: Mapped[int] = mapped_column(Integer, ForeignKey('graphs.id'))
@@ -0,0 +1,12 @@
+from sqlalchemy import Integer, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class Reachability(Base):
+	__tablename__ = 'reachability'
+	__table_args__ = (Index('idx_reachability_dst', 'dst', 'src'),)
+
+	src: Mapped[int] = mapped_column(Integer, ForeignKey('nodes.id', ondelete='CASCADE'), primary_key=True)
+	dst: Mapped[int] = mapped_column(Integer, ForeignKey('nodes.id', ondelete='CASCADE'), primary_key=True)
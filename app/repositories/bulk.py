@@ -0,0 +1,99 @@
+from itertools import islice
+from weakref import WeakKeyDictionary
+
+from typing_extensions import Iterable, Sequence
+
+from sqlalchemy import Engine, Insert, insert, text
+from sqlalchemy.orm import Session
+
+from app.models.base import Base
+
+# Maximum number of rows rendered into a single multi-row INSERT statement.
+INSERT_CHUNK_SIZE = 1000
+
+_auto_increment_steps: WeakKeyDictionary[Engine, int] = WeakKeyDictionary()
+
+
+def _auto_increment_step(db: Session) -> int:
+	engine = db.get_bind().engine
+
+	if engine not in _auto_increment_steps:
+		_auto_increment_steps[engine] = db.scalar(text('SELECT @@auto_increment_increment'))
+
+	return _auto_increment_steps[engine]
+
+
+def insert_ignore(model: type[Base]) -> Insert:
+	"""
+	Returns an INSERT into the table of the model that skips rows violating a unique key instead of failing.
+	"""
+
+	return (insert(model)
+			.prefix_with('IGNORE', dialect='mysql')
+			.prefix_with('OR IGNORE', dialect='sqlite'))
+
+
+def insert_rows(db: Session, model: type[Base], rows: Sequence[dict]) -> list[int]:
+	"""
+	Inserts rows with multi-row INSERT statements and returns their generated IDs in insertion order, without
+	reading the rows back. Does not commit.
+
+	Backends supporting ``INSERT ... RETURNING`` return the IDs directly. MySQL reports the first ID of a multi-row
+	insert through ``LAST_INSERT_ID()`` and InnoDB assigns the rows of a simple insert a contiguous range, so the
+	remaining IDs are derived from it.
+
+	:param db: Database session
+	:param model: ORM model of the table to insert into
+	:param rows: Column values of each row
+	:return: List of the IDs of the inserted rows
+	"""
+
+	if not rows:
+		return []
+
+	if db.get_bind().dialect.insert_returning:
+		return list(db.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), rows))
+
+	step = _auto_increment_step(db)
+	ids = []
+
+	for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+		chunk = rows[start:start + INSERT_CHUNK_SIZE]
+		first_id = db.execute(insert(model).values(chunk)).lastrowid
+
+		ids.extend(range(first_id, first_id + len(chunk) * step, step))
+
+	return ids
+
+
+def insert_stream(db: Session, model: type[Base], names: Sequence[str], rows: Iterable[Sequence[int]]) -> int:
+	"""
+	Inserts rows with explicit values while consuming them, so only one chunk of rows is held in memory. Chunks are
+	sent through the driver's ``executemany``, which PyMySQL rewrites into multi-row INSERT statements. Does not
+	commit.
+	:param db: Database session
+	:param model: ORM model of the table to insert into
+	:param names: Column names of the values of each row
+	:param rows: Values of each row, in the order of `names`
+	:return: Number of inserted rows
+	"""
+
+	rows = iter(rows)
+	count = 0
+
+	while chunk := [dict(zip(names, row)) for row in islice(rows, INSERT_CHUNK_SIZE)]:
+		db.execute(insert(model.__table__), chunk)
+		count += len(chunk)
+
+	return count
+
+
+def insert_columns(db: Session, model: type[Base], columns: dict[str, Sequence[int]]) -> None:
+	"""
+	Inserts rows with explicit values given as equally long columns, see ``insert_stream``. Does not commit.
+	:param db: Database session
+	:param model: ORM model of the table to insert into
+	:param columns: Values of each row keyed by column name
+	"""
+
+	insert_stream(db, model, list(columns), zip(*columns.values()))
@@ -0,0 +1,152 @@
+"""
+Maintenance of the ``reachability`` table, the materialized transitive closure of the graph.
+
+The table holds a ``(src, dst)`` row for every node ``dst`` reachable from node ``src``, including a row ``(n, n)``
+for every node, so the reachable nodes of a node are a range scan over the primary key and are empty if and only if
+the node does not exist. The table is kept transitively closed within the transaction of every mutation:
+
+- A created edge ``u -> v`` connects every ancestor of ``u`` to every descendant of ``v``, a single
+  ``INSERT ... SELECT`` joining the closure with itself.
+- A deleted or reversed edge ``u -> v`` can only shrink the reachable sets of the ancestors of ``u``. Their rows are
+  deleted and recomputed from the edges with a recursive CTE, every other row stays valid.
+"""
+
+from typing_extensions import Iterable, Sequence
+
+from sqlalchemy import CTE, delete, func, insert, select
+from sqlalchemy.orm import Session, aliased
+
+from app.models.edge import Edge
+from app.models.graph import GraphId
+from app.models.node import Node
+from app.models.reachability import Reachability
+from app.repositories.bulk import insert_ignore
+
+# Maximum number of node IDs in the IN clause of a single closure query.
+CLOSURE_CHUNK_SIZE = 1000
+
+
+def _chunks(node_ids: Sequence[int]) -> Iterable[Sequence[int]]:
+	for start in range(0, len(node_ids), CLOSURE_CHUNK_SIZE):
+		yield node_ids[start:start + CLOSURE_CHUNK_SIZE]
+
+
+def _closure(source_ids: Sequence[int]) -> CTE:
+	# Recursive CTE of the (source, reachable node) pairs of the existing source nodes.
+	closure = (select(Node.id.label('src'), Node.id.label('dst'))
+			   .where(Node.id.in_(source_ids))
+			   .cte('closure', recursive=True))
+
+	return closure.union(select(closure.c.src, Edge.to_node_id)
+						 .select_from(closure)
+						 .join(Edge, Edge.from_node_id == closure.c.dst))
+
+
+def get_reachable_node_ids(db: Session,
+						   graph_id: GraphId,
+						   node_ids: list[int],
+						   reverse: bool = False) -> dict[int, list[int]]:
+	"""
+	Returns the IDs of all nodes reachable from the given nodes in ascending order, with one range scan per node.
+	Edges never leave a graph, so only the start nodes are checked to belong to the graph.
+	:param reverse: Whether to return the nodes the given nodes are reachable from instead, scanning
+	``idx_reachability_dst``
+	:return: Reachable node IDs keyed by start node ID, only for the start nodes that exist in the graph
+	"""
+
+	start, other = (Reachability.dst, Reachability.src) if reverse else (Reachability.src, Reachability.dst)
+	reachable: dict[int, list[int]] = {}
+
+	for chunk in _chunks(node_ids):
+		rows = db.execute(select(start, other)
+						  .join(Node, Node.id == start)
+						  .where(Node.graph_id == graph_id, start.in_(chunk))
+						  .order_by(start, other))
+
+		for start_node_id, node_id in rows:
+			reachable.setdefault(start_node_id, []).append(node_id)
+
+	return reachable
+
+
+def get_ancestors(db: Session, node_ids: Sequence[int]) -> list[int]:
+	"""
+	Returns the IDs of all nodes the given nodes are reachable from, including the given nodes themselves.
+	"""
+
+	ancestors: set[int] = set()
+
+	for chunk in _chunks(node_ids):
+		ancestors.update(db.scalars(select(Reachability.src).where(Reachability.dst.in_(chunk))))
+
+	return sorted(ancestors)
+
+
+def add_nodes(db: Session, node_ids: Sequence[int]) -> None:
+	"""
+	Adds the closure rows of new nodes without edges. Does not commit.
+	"""
+
+	if node_ids:
+		db.execute(insert(Reachability), [{'src': node_id, 'dst': node_id} for node_id in node_ids])
+
+
+def add_edges(db: Session, edges: Iterable[tuple[int, int]]) -> None:
+	"""
+	Adds the closure rows of new edges, one statement per edge. Does not commit.
+	:param edges: (from node ID, to node ID) pairs, which are already inserted
+	"""
+
+	ancestors, descendants = aliased(Reachability), aliased(Reachability)
+
+	for from_node_id, to_node_id in edges:
+		db.execute(insert_ignore(Reachability).from_select(['src', 'dst'],
+														   select(ancestors.src, descendants.dst)
+														   .join(descendants, descendants.src == to_node_id)
+														   .where(ancestors.dst == from_node_id)))
+
+
+def recompute(db: Session, source_ids: Sequence[int]) -> None:
+	"""
+	Replaces the closure rows of the given source nodes by their reachable sets over the current edges. Does not
+	commit.
+	"""
+
+	for chunk in _chunks(source_ids):
+		closure = _closure(chunk)
+
+		db.execute(delete(Reachability).where(Reachability.src.in_(chunk)))
+		db.execute(insert(Reachability).from_select(['src', 'dst'], select(closure.c.src, closure.c.dst)))
+
+
+def rebuild(db: Session) -> int:
+	"""
+	Recomputes the whole closure from the edges. Does not commit.
+	:return: Number of closure rows
+	"""
+
+	db.execute(delete(Reachability))
+	recompute(db, db.scalars(select(Node.id).order_by(Node.id)).all())
+
+	return db.scalar(select(func.count()).select_from(Reachability))
+
+
+def check(db: Session) -> tuple[int, int]:
+	"""
+	Compares the closure with the reachable sets computed from the edges, node by node in chunks.
+	:return: Number of missing and of extraneous closure rows
+	"""
+
+	missing = extraneous = 0
+
+	for chunk in _chunks(db.scalars(select(Node.id).order_by(Node.id)).all()):
+		closure = _closure(chunk)
+
+		expected = set(db.execute(select(closure.c.src, closure.c.dst)).tuples())
+		actual = set(db.execute(select(Reachability.src, Reachability.dst)
+								.where(Reachability.src.in_(chunk))).tuples())
+
+		missing += len(expected - actual)
+		extraneous += len(actual - expected)
+
+	return missing, extraneous
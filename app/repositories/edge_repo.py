@@ -1,52 +1,153 @@
 from typing_extensions import Sequence
 
-from sqlalchemy import select, delete
-from sqlalchemy.orm import Session
+from sqlalchemy import select, delete, update, exc
+from sqlalchemy.orm import Session, aliased
 
 from app.models.edge import Edge
+from app.models.graph import GraphId
+from app.repositories import closure_repo
+from app.repositories.bulk import insert_rows
+from app.repositories.version_repo import bump_graph_version
+from app.core.config import settings
+from app.core.database import after_commit
+from app.core.graph_index import graph_indexes
 
 
-def get_edge(db: Session, edge_id: int) -> Edge | None:
-	return db.scalars(select(Edge).where(Edge.id == edge_id)).first()
+def get_edge(db: Session, graph_id: GraphId, edge_id: int) -> Edge | None:
+	return db.scalars(select(Edge).where(Edge.id == edge_id, Edge.graph_id == graph_id)).first()
 
 
-def get_edges(db: Session, edge_ids: list[int]) -> Sequence[Edge]:
-	return db.scalars(select(Edge).where(Edge.id.in_(edge_ids))).all()
+def get_edges(db: Session, graph_id: GraphId, edge_ids: list[int], lock: bool = False) -> Sequence[Edge]:
+	"""
+	:param lock: Whether to lock the rows until the end of the transaction (``SELECT ... FOR UPDATE``)
+	"""
 
+	statement = select(Edge).where(Edge.id.in_(edge_ids), Edge.graph_id == graph_id)
 
-def get_all_edges(db: Session) -> Sequence[Edge]:
-	return db.scalars(select(Edge)).all()
+	return db.scalars(statement.with_for_update() if lock else statement).all()
 
 
-def create_edges(db: Session, edges: list[tuple[int, int]]) -> Sequence[Edge]:
-	db_edges = [Edge(from_node_id=from_id, to_node_id=to_id) for from_id, to_id in edges]
+def get_all_edges(db: Session, graph_id: GraphId) -> Sequence[Edge]:
+	return db.scalars(select(Edge).where(Edge.graph_id == graph_id)).all()
 
-	db.add_all(db_edges)
+
+def get_all_edge_rows(db: Session, graph_id: GraphId) -> Sequence[tuple[int, int, int]]:
+	"""
+	Returns (ID, from node ID, to node ID) rows of all edges of the graph without loading them as ORM objects.
+	"""
+
+	return db.execute(select(Edge.id, Edge.from_node_id, Edge.to_node_id)
+					  .where(Edge.graph_id == graph_id)
+					  .order_by(Edge.id)).tuples().all()
+
+
+def get_edges_page(db: Session, graph_id: GraphId, after_id: int, limit: int) -> Sequence[tuple[int, int, int]]:
+	"""
+	Returns up to `limit` (ID, from node ID, to node ID) rows of edges of the graph with an ID greater than
+	`after_id` in ascending order (keyset pagination over ``idx_edges_graph``).
+	"""
+
+	return db.execute(select(Edge.id, Edge.from_node_id, Edge.to_node_id)
+					  .where(Edge.graph_id == graph_id, Edge.id > after_id)
+					  .order_by(Edge.id)
+					  .limit(limit)).tuples().all()
+
+
+def create_edges(db: Session, graph_id: int, edges: list[tuple[int, int]]) -> Sequence[Edge] | None:
+	"""
+	Inserts the edges, the foreign keys check that their nodes exist in the graph.
+	:return: Created edges, or None if any referenced node does not exist in the graph and nothing was inserted
+	"""
+
+	try:
+		edge_ids = insert_rows(db, Edge, [{'graph_id': graph_id, 'from_node_id': from_id, 'to_node_id': to_id}
+										  for from_id, to_id in edges])
+	except exc.IntegrityError:
+		db.rollback()
+		return None
+
+	if settings.reachability_closure_enabled:
+		closure_repo.add_edges(db, edges)
+
+	bump_graph_version(db, graph_id)
 	db.commit()
 
-	for edge in db_edges:
-		db.refresh(edge)
+	db_edges = [Edge(id=edge_id, graph_id=graph_id, from_node_id=from_id, to_node_id=to_id)
+				for edge_id, (from_id, to_id) in zip(edge_ids, edges)]
+
+	if settings.graph_index_enabled:
+		after_commit(db, lambda: graph_indexes.get(graph_id).add_edges((edge.id, edge.from_node_id, edge.to_node_id)
+																		 for edge in db_edges))
 
 	return db_edges
 
 
-def swap_edge_directions(db: Session, edges: list[int]) -> Sequence[Edge]:
-	edges = get_edges(db, edges)
+def swap_edge_directions(db: Session, graph_id: int, edges: Sequence[Edge]) -> Sequence[Edge]:
+	"""
+	Swaps the direction of edges loaded in this session with a single UPDATE statement, self-loops are left
+	untouched. The edges should be locked (see ``get_edges``), so their loaded endpoints are the ones swapped.
 
-	for edge in edges:
-		if edge.from_node_id == edge.to_node_id:
-			continue
+	Standard SQL evaluates every assignment of an UPDATE against the old row, so the endpoints are simply assigned to
+	each other. MySQL applies single-table assignments from left to right instead, so the old source is read from a
+	self-join of the table.
 
-		edge.from_node_id, edge.to_node_id = edge.to_node_id, edge.from_node_id
+	:param db: Database session
+	:param graph_id: ID of the graph of the edges
+	:param edges: Edges to swap
+	:return: Swapped edges, built from the loaded edges instead of reading them back
+	"""
 
+	edge_ids = [edge.id for edge in edges]
+	swapped_edges = [Edge(id=edge.id, graph_id=graph_id, from_node_id=edge.to_node_id, to_node_id=edge.from_node_id)
+					 for edge in edges]
+
+	if db.get_bind().dialect.name == 'mysql':
+		original = aliased(Edge)
+		statement = (update(Edge)
+					 .where(Edge.id == original.id)
+					 .values({Edge.from_node_id: Edge.to_node_id, Edge.to_node_id: original.from_node_id}))
+	else:
+		statement = update(Edge).values({Edge.from_node_id: Edge.to_node_id, Edge.to_node_id: Edge.from_node_id})
+
+	db.execute(statement.where(Edge.id.in_(edge_ids), Edge.from_node_id != Edge.to_node_id)
+			   .execution_options(synchronize_session=False))
+
+	if settings.reachability_closure_enabled:
+		# Only the ancestors of the old sources can reach less, the new edges are then added like created edges.
+		closure_repo.recompute(db, closure_repo.get_ancestors(db, sorted({edge.from_node_id for edge in edges})))
+		closure_repo.add_edges(db, [(edge.from_node_id, edge.to_node_id) for edge in swapped_edges])
+
+	bump_graph_version(db, graph_id)
 	db.commit()
 
-	for edge in edges:
-		db.refresh(edge)
+	if settings.graph_index_enabled:
+		after_commit(db, lambda: graph_indexes.get(graph_id).replace_edges((edge.id, edge.from_node_id, edge.to_node_id)
+																			 for edge in swapped_edges))
+
+	return swapped_edges
 
-	return edges
 
+def delete_edges(db: Session, graph_id: int, edge_ids: list[int]) -> bool:
+	"""
+	Deletes the edges if all of them exist in the graph, otherwise nothing is deleted.
+	:return: Whether the edges were deleted
+	"""
 
-def delete_edges(db: Session, edge_ids: list[int]) -> None:
-	db.execute(delete(Edge).where(Edge.id.in_(edge_ids)))
+	if settings.reachability_closure_enabled:
+		source_ids = sorted(set(db.scalars(select(Edge.from_node_id).where(Edge.id.in_(edge_ids)))))
+
+	if db.execute(delete(Edge).where(Edge.id.in_(edge_ids), Edge.graph_id == graph_id)).rowcount != len(edge_ids):
+		db.rollback()
+		return False
+
+	if settings.reachability_closure_enabled:
+		# Only the ancestors of the sources of the deleted edges can reach less.
+		closure_repo.recompute(db, closure_repo.get_ancestors(db, source_ids))
+
+	bump_graph_version(db, graph_id)
 	db.commit()
+
+	if settings.graph_index_enabled:
+		after_commit(db, lambda: graph_indexes.get(graph_id).remove_edges(edge_ids))
+
+	return True
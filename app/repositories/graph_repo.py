@@ -0,0 +1,194 @@
+"""
+Graphs and the namespaces they live in.
+
+Every namespace has one current graph, a row of the ``graphs`` table whose ID all nodes and edges of the graph carry.
+Clearing or replacing the graph of a namespace retires its row, which no longer names the namespace, and creates a
+new empty graph in its place, so the old nodes and edges disappear from every query in constant time instead of
+being deleted row by row while the tables are locked for every namespace. Retired graphs are deleted afterwards by
+``purge_graph`` in short transactions.
+
+Reads do not look the graph up on their own: their statements select the ID of the current graph of the namespace
+with the ``current_graph_id`` subquery. Only the process-local graph index is keyed by the ID itself, and since it
+relies on observing every write of its process anyway, the IDs of the namespaces are then cached alongside it.
+"""
+
+from typing_extensions import Iterable, Sequence
+
+from sqlalchemy import ScalarSelect, delete, select, update
+from sqlalchemy.orm import Session
+
+from app.models.graph import Graph, GraphId
+from app.models.node import Node
+from app.models.edge import Edge
+from app.repositories import closure_repo
+from app.repositories.bulk import insert_ignore, insert_rows, insert_stream
+from app.core.config import settings
+from app.core.graph_index import graph_indexes
+
+# ID of no graph, queries scoped to it read an empty graph.
+NO_GRAPH_ID = 0
+
+# Current graph IDs by namespace, only read while the graph index is enabled. Retiring a graph replaces its entry.
+_graph_ids: dict[str, int] = {}
+
+
+def current_graph_id(namespace: str) -> ScalarSelect[int]:
+	"""
+	Returns a subquery selecting the ID of the current graph of the namespace, so a statement scoped to the graph
+	looks it up itself instead of a separate round-trip. Selects NULL, and thereby no rows, if the namespace has no
+	graph yet.
+	"""
+
+	return select(Graph.id).where(Graph.namespace == namespace).scalar_subquery()
+
+
+def get_graph_id(db: Session, namespace: str) -> int:
+	"""
+	Returns the ID of the current graph of the namespace, or ``NO_GRAPH_ID`` if the namespace has no graph yet. The
+	ID is cached while the graph index is enabled.
+	"""
+
+	if settings.graph_index_enabled and (graph_id := _graph_ids.get(namespace)) is not None:
+		return graph_id
+
+	graph_id = db.scalar(select(Graph.id).where(Graph.namespace == namespace)) or NO_GRAPH_ID
+
+	if settings.graph_index_enabled and graph_id != NO_GRAPH_ID:
+		_graph_ids[namespace] = graph_id
+
+	return graph_id
+
+
+def get_read_graph_id(db: Session, namespace: str) -> GraphId:
+	"""
+	Returns the ID of the current graph of the namespace for the queries of a read. The graph index and the
+	reachability cache are keyed by the ID itself, other reads select it with ``current_graph_id``.
+	"""
+
+	if settings.graph_index_enabled or settings.reachability_cache_enabled:
+		return get_graph_id(db, namespace)
+
+	return current_graph_id(namespace)
+
+
+def get_graph_ids(db: Session) -> Sequence[int]:
+	"""
+	Returns the IDs of the current graphs of all namespaces.
+	"""
+
+	return db.scalars(select(Graph.id).where(Graph.namespace.is_not(None)).order_by(Graph.id)).all()
+
+
+def get_retired_graph_ids(db: Session) -> Sequence[int]:
+	return db.scalars(select(Graph.id).where(Graph.namespace.is_(None)).order_by(Graph.id)).all()
+
+
+def _lock(db: Session, namespace: str) -> int | None:
+	return db.scalar(select(Graph.id).where(Graph.namespace == namespace).with_for_update())
+
+
+def lock_graph(db: Session, namespace: str) -> int:
+	"""
+	Returns the ID of the current graph of the namespace, creating an empty graph if the namespace has none, and locks
+	it until the end of the transaction. Mutations lock the graph before they write, so they never write into a
+	retired graph. Does not commit.
+
+	The lock is exclusive, so the mutations of a namespace are serialized with each other, not only with clearing or
+	replacing the graph. Every mutation bumps the version of the graph row, which locks it exclusively until the
+	commit anyway (see ``version_repo.bump_graph_version``). A shared lock would not let them run concurrently, two
+	mutations holding it would deadlock on upgrading it for the bump.
+	"""
+
+	graph_id = _lock(db, namespace)
+
+	if graph_id is None:
+		# Concurrent first writes into a namespace create a single graph.
+		db.execute(insert_ignore(Graph).values(namespace=namespace, version=0))
+		graph_id = _lock(db, namespace)
+
+	return graph_id
+
+
+def _retire(db: Session, namespace: str) -> tuple[int, int]:
+	# The new graph continues the version of the retired one, so the entity tags of a namespace never repeat.
+	retired_id = lock_graph(db, namespace)
+	version = db.scalar(select(Graph.version).where(Graph.id == retired_id))
+
+	db.execute(update(Graph).where(Graph.id == retired_id).values(namespace=None))
+	graph_id = insert_rows(db, Graph, [{'namespace': namespace, 'version': version + 1}])[0]
+
+	return retired_id, graph_id
+
+
+def clear_graph(db: Session, namespace: str) -> int:
+	"""
+	Replaces the graph of the namespace with an empty graph, without touching its nodes and edges.
+	:return: ID of the retired graph
+	"""
+
+	retired_id, graph_id = _retire(db, namespace)
+	db.commit()
+
+	_graph_ids[namespace] = graph_id
+
+	if settings.graph_index_enabled:
+		graph_indexes.discard(retired_id)
+
+	return retired_id
+
+
+def create_graph(db: Session, namespace: str, node_count: int, edges: Iterable[tuple[int, int]]) -> int:
+	"""
+	Replaces the graph of the namespace in one transaction with a new graph of new nodes and the edges between them.
+	The edges are inserted in chunks while they are consumed, so they do not have to fit in memory.
+	:param db: Database session
+	:param namespace: Namespace of the graph
+	:param node_count: Number of nodes to create
+	:param edges: (from, to) pairs of 0-based positions of the created nodes
+	:return: ID of the new graph
+	"""
+
+	retired_id, graph_id = _retire(db, namespace)
+	node_ids = insert_rows(db, Node, [{'id': None, 'graph_id': graph_id}] * node_count)
+	insert_stream(db, Edge, ('graph_id', 'from_node_id', 'to_node_id'),
+				  ((graph_id, node_ids[from_index], node_ids[to_index]) for from_index, to_index in edges))
+
+	if settings.reachability_closure_enabled:
+		closure_repo.recompute(db, node_ids)
+
+	db.commit()
+
+	_graph_ids[namespace] = graph_id
+
+	if settings.graph_index_enabled:
+		# The index of the new graph is loaded from the database by its first query.
+		graph_indexes.discard(retired_id)
+
+	return graph_id
+
+
+def purge_graph(db: Session, graph_id: int, chunk_size: int) -> int:
+	"""
+	Deletes a retired graph, its edges and then its nodes in chunks of one transaction each, so no lock is held for
+	long. The closure rows of the nodes are deleted by the foreign keys. Commits.
+	:param db: Database session
+	:param graph_id: ID of the retired graph
+	:param chunk_size: Maximum number of edges or nodes deleted per transaction
+	:return: Number of deleted nodes
+	"""
+
+	while edge_ids := db.scalars(select(Edge.id).where(Edge.graph_id == graph_id).limit(chunk_size)).all():
+		db.execute(delete(Edge).where(Edge.id.in_(edge_ids)))
+		db.commit()
+
+	deleted = 0
+
+	while node_ids := db.scalars(select(Node.id).where(Node.graph_id == graph_id).limit(chunk_size)).all():
+		db.execute(delete(Node).where(Node.id.in_(node_ids)))
+		db.commit()
+		deleted += len(node_ids)
+
+	db.execute(delete(Graph).where(Graph.id == graph_id, Graph.namespace.is_(None)))
+	db.commit()
+
+	return deleted
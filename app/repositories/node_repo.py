@@ -1,75 +1,303 @@
 from typing_extensions import Sequence
 
-from sqlalchemy import text, select, delete
-from sqlalchemy.orm import Session
+from sqlalchemy import select, delete
+from sqlalchemy.orm import InstrumentedAttribute, Session
 
+from app.models.graph import GraphId
 from app.models.node import Node
+from app.models.edge import Edge
+from app.repositories import closure_repo
+from app.repositories.bulk import insert_rows
+from app.repositories.version_repo import bump_graph_version
+from app.core.config import settings
+from app.core.database import after_commit
+from app.core.graph_index import GraphIndex, graph_indexes
+from app.core.traversal import Traversal, breadth_first, shortest_path
 
 
-def get_node(db: Session, node_id: int) -> Node | None:
-	return db.scalars(select(Node).where(Node.id == node_id)).first()
+# Maximum number of node IDs in the IN clause of a single traversal query.
+TRAVERSAL_CHUNK_SIZE = 5000
 
 
-def get_nodes(db: Session, node_ids: list[int]) -> Sequence[Node]:
-	return db.scalars(select(Node).where(Node.id.in_(node_ids))).all()
+def get_node(db: Session, graph_id: GraphId, node_id: int) -> Node | None:
+	return db.scalars(select(Node).where(Node.id == node_id, Node.graph_id == graph_id)).first()
 
 
-def get_all_nodes(db: Session) -> Sequence[Node]:
-	return db.scalars(select(Node)).all()
+def get_nodes(db: Session, graph_id: GraphId, node_ids: list[int]) -> Sequence[Node]:
+	return db.scalars(select(Node).where(Node.id.in_(node_ids), Node.graph_id == graph_id)).all()
 
 
-def get_reachable_nodes(db: Session, start_node_id: int) -> Sequence[Node]:
+def get_all_nodes(db: Session, graph_id: GraphId) -> Sequence[Node]:
+	return db.scalars(select(Node).where(Node.graph_id == graph_id)).all()
+
+
+def get_all_node_ids(db: Session, graph_id: GraphId) -> Sequence[int]:
+	return db.scalars(select(Node.id).where(Node.graph_id == graph_id).order_by(Node.id)).all()
+
+
+def get_node_ids_page(db: Session, graph_id: GraphId, after_id: int, limit: int) -> Sequence[int]:
+	"""
+	Returns up to `limit` node IDs of the graph greater than `after_id` in ascending order (keyset pagination over
+	``idx_nodes_graph``).
+	"""
+
+	return db.scalars(select(Node.id)
+					  .where(Node.graph_id == graph_id, Node.id > after_id)
+					  .order_by(Node.id)
+					  .limit(limit)).all()
+
+
+def _loaded_index(db: Session, graph_id: GraphId) -> GraphIndex | None:
+	# The index of the graph if it is enabled and could be loaded, queries read the database otherwise. Reads pass the
+	# ID itself while the index is enabled, see ``graph_repo.get_read_graph_id``.
+	if not settings.graph_index_enabled:
+		return None
+
+	graph_index = graph_indexes.get(graph_id)
+
+	return graph_index if graph_index.ensure_loaded(db) else None
+
+
+def get_reachable_nodes(db: Session, graph_id: GraphId, start_node_id: int, reverse: bool = False) -> Sequence[Node]:
 	"""
-	Returns all nodes reachable from the given start node by following outgoing edges.
-	The start node itself is included in the result.
+	Returns all nodes reachable from the given start node by following outgoing edges, or with `reverse` all nodes
+	the start node is reachable from by following incoming edges.
+	The start node itself is included in the result, so the result is empty if and only if the start node does not
+	exist in the graph. Edges never leave a graph, so only the start node is checked to belong to it.
 
-	Uses a single recursive CTE query to traverse the directed graph at the database level.
+	Uses a single recursive CTE query to traverse the directed graph at the database level, a breadth-first search
+	over the in-memory graph index when it is enabled, or a range scan of the reachability closure when it is
+	enabled. The closure returns the nodes in ID order instead of breadth-first order.
 
 	:param db: Database session
+	:param graph_id: ID of the graph of the start node
 	:param start_node_id: ID of the node to start traversal from
+	:param reverse: Whether to follow incoming instead of outgoing edges
 	:return: Sequence of reachable Node objects
 	"""
 
-	# Base case includes the starting node itself, recursive step follows outgoing edges to discover all reachable
-	# nodes not in the CTE.
-	reachable_cte = text("""
-                         WITH RECURSIVE reachable AS (
-                             SELECT id
-                             FROM nodes
-                             WHERE id = :start_node_id
+	if (graph_index := _loaded_index(db, graph_id)) is not None:
+		traversal = graph_index.ancestors(start_node_id) if reverse else graph_index.reachable(start_node_id)
+		return [Node(id=node_id) for node_id in traversal.node_ids]
+
+	if settings.reachability_closure_enabled:
+		reachable = closure_repo.get_reachable_node_ids(db, graph_id, [start_node_id], reverse)
+		return [Node(id=node_id) for node_id in reachable.get(start_node_id, [])]
+
+	# Base case includes the starting node itself, recursive step follows outgoing (or incoming) edges to discover
+	# all reachable nodes not in the CTE.
+	key, neighbour = _edge_columns(reverse)
+	reachable = (select(Node.id)
+				 .where(Node.id == start_node_id, Node.graph_id == graph_id)
+				 .cte('reachable', recursive=True))
+	reachable = reachable.union(select(neighbour).join(reachable, key == reachable.c.id))
+
+	return [Node(id=node_id) for node_id in db.scalars(select(reachable.c.id))]
+
+
+def _edge_columns(reverse: bool) -> tuple[InstrumentedAttribute[int], InstrumentedAttribute[int]]:
+	# Columns of the edges table to join a traversal on and to follow.
+	if reverse:
+		return Edge.to_node_id, Edge.from_node_id
+
+	return Edge.from_node_id, Edge.to_node_id
+
 
-                             UNION
+def _get_neighbours(db: Session, node_ids: list[int], outgoing: bool) -> list[list[int]]:
+	key, neighbour = _edge_columns(reverse=not outgoing)
+	neighbours: dict[int, list[int]] = {}
 
-                             SELECT e.to_node_id
-                             FROM edges e
-                                      JOIN reachable r ON e.from_node_id = r.id
-                         )
-                         SELECT id
-                         FROM reachable;
-						 """)
+	for start in range(0, len(node_ids), TRAVERSAL_CHUNK_SIZE):
+		rows = db.execute(select(key, neighbour)
+						  .where(key.in_(node_ids[start:start + TRAVERSAL_CHUNK_SIZE]))
+						  .order_by(key, Edge.id))
 
-	result = db.scalars(select(Node).from_statement(reachable_cte), {'start_node_id': start_node_id}).all()
+		for node_id, neighbour_id in rows:
+			neighbours.setdefault(node_id, []).append(neighbour_id)
+
+	return [neighbours.get(node_id, []) for node_id in node_ids]
+
+
+def get_successors(db: Session, node_ids: list[int]) -> list[list[int]]:
+	"""
+	Returns the targets of the outgoing edges of each of the given nodes, ordered by edge ID.
+	"""
+
+	return _get_neighbours(db, node_ids, outgoing=True)
+
+
+def get_predecessors(db: Session, node_ids: list[int]) -> list[list[int]]:
+	"""
+	Returns the sources of the incoming edges of each of the given nodes, ordered by edge ID.
+	"""
+
+	return _get_neighbours(db, node_ids, outgoing=False)
+
+
+def get_reachable_node_ids_bounded(db: Session,
+								   graph_id: GraphId,
+								   start_node_id: int,
+								   max_depth: int | None = None,
+								   limit: int | None = None,
+								   deadline: float | None = None,
+								   reverse: bool = False) -> Traversal:
+	"""
+	Traverses the nodes reachable from the given start node breadth-first, in the same order as
+	``get_reachable_nodes``, while enforcing the bounds of ``traversal.breadth_first``.
+
+	Every level is expanded with one query using ``idx_edges_from_node``, or ``idx_edges_to_node`` when following
+	incoming edges, so the traversal stops after as many queries as levels it visits. The first query also checks
+	that the start node exists in the graph.
+
+	:param db: Database session
+	:param graph_id: ID of the graph of the start node
+	:param start_node_id: ID of the node to start traversal from
+	:param max_depth: Maximum number of hops from the start node
+	:param limit: Maximum number of nodes to return
+	:param deadline: ``time.monotonic()`` value after which the traversal stops
+	:param reverse: Whether to follow incoming instead of outgoing edges
+	:return: Traversal result, empty if the start node does not exist in the graph
+	"""
 
-	return result
+	if (graph_index := _loaded_index(db, graph_id)) is not None:
+		traverse = graph_index.ancestors if reverse else graph_index.reachable
+		return traverse(start_node_id, max_depth, limit, deadline)
 
+	key, neighbour = _edge_columns(reverse)
+	start = db.execute(select(Node.id, neighbour)
+					   .outerjoin(Edge, key == Node.id)
+					   .where(Node.id == start_node_id, Node.graph_id == graph_id)
+					   .order_by(Edge.id)).all()
 
-def create_nodes(db: Session, count: int) -> Sequence[Node]:
-	db_nodes = [Node() for _ in range(count)]
+	if not start:
+		return Traversal()
 
-	db.add_all(db_nodes)
+	start_neighbours = [neighbour_id for _, neighbour_id in start if neighbour_id is not None]
+
+	def expand(frontier: list[int]) -> list[list[int]]:
+		# Only the first level consists of the start node, its neighbours were fetched with the existence check.
+		if frontier == [start_node_id]:
+			return [start_neighbours]
+
+		return _get_neighbours(db, frontier, outgoing=not reverse)
+
+	return breadth_first(start_node_id, expand, max_depth, limit, deadline)
+
+
+def get_shortest_path(db: Session, graph_id: GraphId, source_node_id: int, target_node_id: int) -> list[int] | None:
+	"""
+	Finds a shortest directed path between two existing nodes with a bidirectional breadth-first search, expanding
+	one level per query over ``idx_edges_from_node`` from the source and ``idx_edges_to_node`` into the target.
+	The search stops as soon as both frontiers meet, so the number of queries depends on the path length.
+
+	:param db: Database session
+	:param graph_id: ID of the graph of the nodes
+	:param source_node_id: ID of the first node of the path
+	:param target_node_id: ID of the last node of the path
+	:return: Node IDs of the path, or None if the target is not reachable from the source or the source does not
+	exist in the graph
+	"""
+
+	if (graph_index := _loaded_index(db, graph_id)) is not None:
+		return graph_index.shortest_path(source_node_id, target_node_id)
+
+	# Edges never leave a graph, so every path from a node of the graph stays in the graph.
+	if get_node(db, graph_id, source_node_id) is None:
+		return None
+
+	return shortest_path(source_node_id, target_node_id,
+						 lambda frontier: get_successors(db, frontier),
+						 lambda frontier: get_predecessors(db, frontier))
+
+
+def get_reachable_node_ids_batch(db: Session,
+								 graph_id: GraphId,
+								 start_node_ids: list[int],
+								 reverse: bool = False) -> dict[int, list[int]]:
+	"""
+	Returns the IDs of all nodes reachable from each of the given start nodes, in the same order as
+	``get_reachable_nodes``.
+
+	A single recursive CTE seeded with all start nodes fetches the outgoing edges of the union of their closures, so
+	nodes shared by overlapping closures are only traversed once. The closure of every start node is then computed
+	in memory from the fetched adjacency. Every reachable node is returned with its outgoing edges, if any, so start
+	nodes that do not exist are recognised without a separate query.
+
+	:param db: Database session
+	:param graph_id: ID of the graph of the start nodes
+	:param start_node_ids: IDs of the nodes to start traversal from
+	:param reverse: Whether to follow incoming instead of outgoing edges
+	:return: Reachable node IDs keyed by start node ID, only for the start nodes that exist in the graph
+	"""
+
+	if (graph_index := _loaded_index(db, graph_id)) is not None:
+		traverse = graph_index.ancestors if reverse else graph_index.reachable
+		return {node_id: traverse(node_id).node_ids for node_id in start_node_ids if graph_index.has_node(node_id)}
+
+	if settings.reachability_closure_enabled:
+		return closure_repo.get_reachable_node_ids(db, graph_id, start_node_ids, reverse)
+
+	key, neighbour = _edge_columns(reverse)
+	reachable = (select(Node.id)
+				 .where(Node.id.in_(start_node_ids), Node.graph_id == graph_id)
+				 .cte('reachable', recursive=True))
+	reachable = reachable.union(select(neighbour).join(reachable, key == reachable.c.id))
+	rows = db.execute(select(reachable.c.id, neighbour)
+					  .select_from(reachable)
+					  .outerjoin(Edge, key == reachable.c.id)
+					  .order_by(reachable.c.id, Edge.id))
+
+	adjacency: dict[int, list[int]] = {}
+	for node_id, neighbour_id in rows:
+		neighbours = adjacency.setdefault(node_id, [])
+
+		if neighbour_id is not None:
+			neighbours.append(neighbour_id)
+
+	def expand(frontier: list[int]) -> list[list[int]]:
+		return [adjacency[node_id] for node_id in frontier]
+
+	return {node_id: breadth_first(node_id, expand).node_ids for node_id in start_node_ids if node_id in adjacency}
+
+
+def create_nodes(db: Session, graph_id: int, count: int) -> Sequence[Node]:
+	node_ids = insert_rows(db, Node, [{'id': None, 'graph_id': graph_id}] * count)
+
+	if settings.reachability_closure_enabled:
+		closure_repo.add_nodes(db, node_ids)
+
+	bump_graph_version(db, graph_id)
 	db.commit()
 
-	for node in db_nodes:
-		db.refresh(node)
+	db_nodes = [Node(id=node_id, graph_id=graph_id) for node_id in node_ids]
+
+	if settings.graph_index_enabled:
+		after_commit(db, lambda: graph_indexes.get(graph_id).add_nodes(node.id for node in db_nodes))
 
 	return db_nodes
 
 
-def delete_nodes(db: Session, node_ids: list[int]) -> None:
-	db.execute(delete(Node).where(Node.id.in_(node_ids)))
-	db.commit()
+def delete_nodes(db: Session, graph_id: int, node_ids: list[int]) -> bool:
+	"""
+	Deletes the nodes if all of them exist in the graph, otherwise nothing is deleted.
+	:return: Whether the nodes were deleted
+	"""
 
+	if settings.reachability_closure_enabled:
+		# The closure rows of the deleted nodes are deleted by the foreign keys, their ancestors may reach less.
+		ancestor_ids = sorted(set(closure_repo.get_ancestors(db, node_ids)) - set(node_ids))
 
-def delete_all_nodes(db: Session) -> None:
-	db.execute(delete(Node))
+	if db.execute(delete(Node).where(Node.id.in_(node_ids), Node.graph_id == graph_id)).rowcount != len(node_ids):
+		db.rollback()
+		return False
+
+	if settings.reachability_closure_enabled:
+		closure_repo.recompute(db, ancestor_ids)
+
+	bump_graph_version(db, graph_id)
 	db.commit()
+
+	if settings.graph_index_enabled:
+		after_commit(db, lambda: graph_indexes.get(graph_id).remove_nodes(node_ids))
+
+	return True
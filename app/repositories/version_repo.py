@@ -0,0 +1,33 @@
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models.graph import Graph
+
+
+def get_graph_version(db: Session, namespace: str) -> int:
+	"""
+	Returns the version of the current graph of the namespace, 0 if the namespace has no graph yet.
+	"""
+
+	return db.scalar(select(Graph.version).where(Graph.namespace == namespace)) or 0
+
+
+def bump_graph_version(db: Session, graph_id: int) -> None:
+	"""
+	Increments the graph version within the current transaction, so the new version becomes visible together with
+	the mutation. Does not commit.
+
+	The graph row stays locked until the transaction ends, mutations lock it up front with
+	``graph_repo.lock_graph``.
+	"""
+
+	db.execute(update(Graph).where(Graph.id == graph_id).values(version=Graph.version + 1))
+
+
+def bump_all_graph_versions(db: Session) -> None:
+	"""
+	Increments the versions of all graphs, e.g. after a maintenance task that may change query results. Does not
+	commit.
+	"""
+
+	db.execute(update(Graph).where(Graph.namespace.is_not(None)).values(version=Graph.version + 1))
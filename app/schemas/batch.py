@@ -0,0 +1,10 @@
+from typing_extensions import Annotated, TypeVar
+
+from pydantic import Field
+
+from app.core.config import settings
+
+T = TypeVar('T')
+
+# Request body of bulk endpoints, a non-empty list of at most `max_batch_size` items applied in one transaction.
+Batch = Annotated[list[T], Field(min_length=1, max_length=settings.max_batch_size)]
@@ -14,6 +14,11 @@ class EdgeResponse(EdgeBase):
 	id: PositiveInt
 
 
+class EdgePage(BaseModel):
+	items: list[EdgeResponse]
+	next_cursor: PositiveInt | None
+
+
 class EdgeDeleteRequest(BaseModel):
 	edge_id: PositiveInt
 
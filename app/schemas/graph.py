@@ -1,3 +1,5 @@
+from enum import Enum
+
 from pydantic import BaseModel
 
 from app.schemas.edge import EdgeResponse
@@ -7,3 +9,33 @@ from app.schemas.node import NodeResponse
 class GraphResponse(BaseModel):
 	nodes: list[NodeResponse]
 	edges: list[EdgeResponse]
+
+
+class SnapshotImportResponse(BaseModel):
+	nodes: int
+	edges: int
+
+
+class GraphStreamFormat(str, Enum):
+	JSON = 'json'
+	NDJSON = 'ndjson'
+
+
+class GraphTopology(str, Enum):
+	# Edges between uniformly random nodes, G(n, m).
+	ERDOS_RENYI = 'erdos_renyi'
+	# Edges between nodes sampled with a power-law distribution, so a few hubs have most edges.
+	POWER_LAW = 'power_law'
+	# Edges only lead from a node to a later node, so the graph has no cycles.
+	DAG = 'dag'
+	# A single path through all nodes, the remaining edges lead back to earlier nodes.
+	CHAIN = 'chain'
+	# A cycle through all nodes, the remaining edges are uniformly random, so all nodes form one component.
+	SCC = 'scc'
+
+
+class GeneratedGraphResponse(BaseModel):
+	nodes: int
+	edges: int
+	topology: GraphTopology
+	seed: int
@@ -1,4 +1,6 @@
-from pydantic import BaseModel, PositiveInt
+from pydantic import BaseModel, NonNegativeInt, PositiveInt
+
+from app.schemas.batch import Batch
 
 
 class NodeCreate(BaseModel):
@@ -9,5 +11,29 @@ class NodeResponse(BaseModel):
 	id: PositiveInt
 
 
+class ReachableNodeResponse(NodeResponse):
+	depth: NonNegativeInt | None = None
+
+
+class ReachableNodes(BaseModel):
+	nodes: list[ReachableNodeResponse]
+	truncated: bool
+
+
+class PathResponse(BaseModel):
+	reachable: bool
+	length: NonNegativeInt | None
+	nodes: list[NodeResponse]
+
+
 class NodeDeleteRequest(BaseModel):
 	node_id: PositiveInt
+
+
+class NodePage(BaseModel):
+	items: list[NodeResponse]
+	next_cursor: PositiveInt | None
+
+
+class ReachabilityBatchRequest(BaseModel):
+	node_ids: Batch[PositiveInt]
@@ -0,0 +1,129 @@
+"""
+Generates large synthetic graphs of a given size and topology to reproduce production sized workloads.
+
+Usage: ``python -m app.scripts.generate_graph --nodes N --edges M [--topology TOPOLOGY] [--seed SEED]
+[--namespace NAMESPACE] [--database-url URL]``
+
+Without a database URL, the database configured through the ``APP_DB_*`` settings is used.
+"""
+
+from argparse import ArgumentParser
+from random import Random, randrange
+from time import perf_counter
+
+from typing_extensions import Iterator
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.repositories import graph_repo
+from app.schemas.graph import GeneratedGraphResponse, GraphTopology
+
+# Exponent of the power-law sampling, the share of edges ending at the first k of n nodes is (k / n) ** (1 / 3).
+POWER_LAW_EXPONENT = 3
+
+
+def _erdos_renyi(random: Random, nodes: int, edges: int) -> Iterator[tuple[int, int]]:
+	for _ in range(edges):
+		yield int(random.random() * nodes), int(random.random() * nodes)
+
+
+def _power_law(random: Random, nodes: int, edges: int) -> Iterator[tuple[int, int]]:
+	for _ in range(edges):
+		yield int(random.random() ** POWER_LAW_EXPONENT * nodes), int(random.random() ** POWER_LAW_EXPONENT * nodes)
+
+
+def _dag(random: Random, nodes: int, edges: int) -> Iterator[tuple[int, int]]:
+	for _ in range(edges):
+		first = int(random.random() * (nodes - 1))
+		yield first, first + 1 + int(random.random() * (nodes - first - 1))
+
+
+def _chain(random: Random, nodes: int, edges: int) -> Iterator[tuple[int, int]]:
+	path_edges = min(edges, nodes - 1)
+
+	for node in range(path_edges):
+		yield node, node + 1
+
+	# Edges back to earlier nodes keep the distance of every node from the first node at its position.
+	for _ in range(edges - path_edges):
+		last = int(random.random() * nodes)
+		yield last, int(random.random() * (last + 1))
+
+
+def _scc(random: Random, nodes: int, edges: int) -> Iterator[tuple[int, int]]:
+	cycle_edges = min(edges, nodes)
+
+	for node in range(cycle_edges):
+		yield node, (node + 1) % nodes
+
+	yield from _erdos_renyi(random, nodes, edges - cycle_edges)
+
+
+_GENERATORS = {GraphTopology.ERDOS_RENYI: _erdos_renyi,
+			   GraphTopology.POWER_LAW: _power_law,
+			   GraphTopology.DAG: _dag,
+			   GraphTopology.CHAIN: _chain,
+			   GraphTopology.SCC: _scc}
+
+
+def generate_edges(nodes: int, edges: int, topology: GraphTopology, seed: int) -> Iterator[tuple[int, int]]:
+	"""
+	Lazily generates the edges of a graph, the same arguments always generate the same edges.
+	:param nodes: Number of nodes, at least 2
+	:param edges: Number of edges
+	:param topology: Shape of the graph
+	:param seed: Seed of the random number generator
+	:return: (from, to) pairs of 0-based node positions
+	"""
+
+	return _GENERATORS[topology](Random(seed), nodes, edges)
+
+
+def generate_graph(db: Session,
+				   namespace: str,
+				   nodes: int,
+				   edges: int,
+				   topology: GraphTopology = GraphTopology.ERDOS_RENYI,
+				   seed: int | None = None) -> GeneratedGraphResponse:
+	"""
+	Replace the graph of the namespace with a generated graph. The edges are inserted in batches while they are
+	generated, so they never have to fit in memory.
+	:param seed: Seed of the random number generator, a random seed is chosen and returned if omitted
+	"""
+
+	if seed is None:
+		seed = randrange(2 ** 32)
+
+	graph_repo.create_graph(db, namespace, nodes, generate_edges(nodes, edges, topology, seed))
+
+	return GeneratedGraphResponse(nodes=nodes, edges=edges, topology=topology, seed=seed)
+
+
+def main():
+	parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument('--nodes', type=int, required=True, help='Number of nodes, at least 2')
+	parser.add_argument('--edges', type=int, required=True, help='Number of edges')
+	parser.add_argument('--topology', choices=[topology.value for topology in GraphTopology],
+						default=GraphTopology.ERDOS_RENYI.value, help='Shape of the graph')
+	parser.add_argument('--seed', type=int, help='Seed of the random number generator')
+	parser.add_argument('--namespace', default=settings.default_namespace, help='Namespace of the replaced graph')
+	parser.add_argument('--database-url', default=settings.database_url, help='SQLAlchemy URL of the database')
+	args = parser.parse_args()
+
+	if args.nodes < 2 or args.edges < 0:
+		parser.error('at least 2 nodes and a non-negative number of edges are required')
+
+	session_factory = sessionmaker(bind=create_engine(args.database_url), autoflush=False)
+
+	start = perf_counter()
+	with session_factory() as db:
+		graph = generate_graph(db, args.namespace, args.nodes, args.edges, GraphTopology(args.topology), args.seed)
+
+	print(f'Generated {graph.nodes:,} nodes and {graph.edges:,} edges ({graph.topology.value}, seed {graph.seed}) '
+		  f'in {perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,51 @@
+"""
+Rebuilds or checks the materialized reachability closure (see ``app.repositories.closure_repo``).
+
+Usage: ``python -m app.scripts.reachability_closure {rebuild,check} [--database-url URL]``
+
+Without a database URL, the database configured through the ``APP_DB_*`` settings is used. ``check`` exits with
+status 1 if the closure is inconsistent with the edges.
+"""
+
+import sys
+from argparse import ArgumentParser
+from time import perf_counter
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.repositories import closure_repo
+from app.repositories.version_repo import bump_all_graph_versions
+
+
+def main():
+	parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument('command', choices=['rebuild', 'check'], help='Rebuild the closure or check its consistency')
+	parser.add_argument('--database-url', default=settings.database_url, help='SQLAlchemy URL of the database')
+	args = parser.parse_args()
+
+	session_factory = sessionmaker(bind=create_engine(args.database_url), autoflush=False)
+
+	start = perf_counter()
+	with session_factory() as db:
+		if args.command == 'rebuild':
+			rows = closure_repo.rebuild(db)
+			# Reachability results served from the closure may change, so cached responses are invalidated.
+			bump_all_graph_versions(db)
+			db.commit()
+
+			print(f'Rebuilt the reachability closure with {rows:,} rows in {perf_counter() - start:.1f}s')
+			return
+
+		missing, extraneous = closure_repo.check(db)
+
+	print(f'Checked the reachability closure in {perf_counter() - start:.1f}s: '
+		  f'{missing:,} missing and {extraneous:,} extraneous rows')
+
+	if missing or extraneous:
+		sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
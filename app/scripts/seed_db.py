@@ -1,8 +1,6 @@
-from random import randint
-
 from sqlalchemy.orm import Session
 
-from app.repositories import node_repo, edge_repo
+from app.repositories import node_repo, edge_repo, graph_repo
 from app.schemas.graph import NodeResponse, EdgeResponse, GraphResponse
 
 NODES_TO_CREATE = 25
@@ -28,48 +26,17 @@ EDGES_TO_CREATE = [(0, 1), (0, 2), (0, 4), (0, 5),
 						(22, 21)]
 
 
-def seed_graph(db: Session) -> GraphResponse:
-	"""
-	Create a new graph with a predefined graph state and return it.
-	"""
-
-	node_repo.delete_all_nodes(db)
-
-	created_nodes = node_repo.create_nodes(db, NODES_TO_CREATE)
-
-	node_ids = [node.id for node in created_nodes]
-	min_id = min(node_ids)
-
-	edges_to_create = [(f + min_id, t + min_id) for (f, t) in EDGES_TO_CREATE]
-	created_edges = edge_repo.create_edges(db, edges_to_create)
-
-	return GraphResponse(
-		nodes=[NodeResponse(id=node.id) for node in created_nodes],
-		edges=[EdgeResponse(id=edge.id,
-							from_node_id=edge.from_node_id,
-							to_node_id=edge.to_node_id) for edge in created_edges])
-
-
-def seed_graph_random(db: Session) -> GraphResponse:
+def seed_graph(db: Session, namespace: str) -> GraphResponse:
 	"""
-	Create a new graph with a random graph state and return it.
+	Replace the graph of the namespace with a predefined graph state and return it.
 	"""
 
-	node_repo.delete_all_nodes(db)
-
-	total_nodes = randint(10, 20)
-	created_nodes = node_repo.create_nodes(db, total_nodes)
-
-	node_ids = [node.id for node in created_nodes]
-	min_id = min(node_ids)
-	max_id = max(node_ids)
-
-	total_edges = randint(10, 30)
-	edges_to_create = [(randint(min_id, max_id), randint(min_id, max_id)) for _ in range(total_edges)]
-	created_edges = edge_repo.create_edges(db, edges_to_create)
+	graph_id = graph_repo.create_graph(db, namespace, NODES_TO_CREATE, EDGES_TO_CREATE)
+	node_ids = node_repo.get_all_node_ids(db, graph_id)
+	edges = edge_repo.get_all_edge_rows(db, graph_id)
 
 	return GraphResponse(
-		nodes=[NodeResponse(id=n.id) for n in created_nodes],
-		edges=[EdgeResponse(id=edge.id,
-							from_node_id=edge.from_node_id,
-							to_node_id=edge.to_node_id) for edge in created_edges])
+		nodes=[NodeResponse(id=node_id) for node_id in node_ids],
+		edges=[EdgeResponse(id=edge_id,
+							from_node_id=from_node_id,
+							to_node_id=to_node_id) for edge_id, from_node_id, to_node_id in edges])
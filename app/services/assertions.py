@@ -2,6 +2,7 @@ from typing_extensions import Callable, Iterable, TypeVar, Sequence, Set
 
 from sqlalchemy.orm import Session
 
+from app.models.graph import GraphId
 from app.repositories import node_repo, edge_repo
 from app.core.exceptions import NodeNotFoundError, EdgeNotFoundError
 
@@ -13,63 +14,70 @@ TExc = TypeVar('TExc', bound=Exception)
 
 
 def assert_nodes(db: Session,
+				 graph_id: GraphId,
 				 nodes: Sequence[TReq],
 				 get_id_from_node: Callable[[TReq], TId] = lambda n: n.node_id,
-				 fetch_existing: Callable[[Session, list[TId]], Iterable[TRes]] = node_repo.get_nodes,
+				 fetch_existing: Callable[[Session, GraphId, list[TId]], Iterable[TRes]] = node_repo.get_nodes,
 				 get_id_from_existing: Callable[[TRes], TId] = lambda n: n.id,
-				 node_exception: Callable[[list[TId]], TExc] = lambda ids: NodeNotFoundError(ids)) -> list[TId]:
+				 node_exception: Callable[[list[TId]], TExc] = lambda ids: NodeNotFoundError(ids)) -> list[TRes]:
 	"""
 	Wrapper for node assertions.
 	:param db: Database session
+	:param graph_id: ID of the graph the nodes have to exist in
 	:param nodes: Requested nodes
 	:param get_id_from_node: How to get node ID from node
-	:param fetch_existing: How to fetch existing nodes
+	:param fetch_existing: How to fetch existing nodes of the graph
 	:param get_id_from_existing: How to get node ID from existing nodes
 	:param node_exception: Exception raised when node is not found
-	:return: List of node IDs
+	:return: List of the fetched nodes
 	"""
 
-	return assert_resources(db, nodes, get_id_from_node, fetch_existing, get_id_from_existing, node_exception)
+	return assert_resources(db, nodes, get_id_from_node, lambda db, ids: fetch_existing(db, graph_id, ids),
+							get_id_from_existing, node_exception)
 
 def assert_edges(db: Session,
+				 graph_id: GraphId,
 				 edges: Sequence[TReq],
 				 get_id_from_edge: Callable[[TReq], TId] = lambda e: e.edge_id,
-				 fetch_existing: Callable[[Session, list[TId]], Iterable[TRes]] = edge_repo.get_edges,
+				 fetch_existing: Callable[[Session, GraphId, list[TId]], Iterable[TRes]] = edge_repo.get_edges,
 				 get_id_from_existing: Callable[[TRes], TId] = lambda e: e.id,
-				 edge_exception: Callable[[list[TId]], TExc] = lambda ids: EdgeNotFoundError(ids)) -> list[TId]:
+				 edge_exception: Callable[[list[TId]], TExc] = lambda ids: EdgeNotFoundError(ids)) -> list[TRes]:
 	"""
 	Wrapper for edge assertions.
 	:param db: Database session
+	:param graph_id: ID of the graph the edges have to exist in
 	:param edges: Requested edges
 	:param get_id_from_edge: How to get edge ID from edge
-	:param fetch_existing: How to fetch existing edges
+	:param fetch_existing: How to fetch existing edges of the graph
 	:param get_id_from_existing: How to get node ID from existing edges
 	:param edge_exception: Exception raised when edge is not found
-	:return: List of edge IDs
+	:return: List of the fetched edges
 	"""
 
-	return assert_resources(db, edges, get_id_from_edge, fetch_existing, get_id_from_existing, edge_exception)
+	return assert_resources(db, edges, get_id_from_edge, lambda db, ids: fetch_existing(db, graph_id, ids),
+							get_id_from_existing, edge_exception)
 
 def assert_resources(db: Session,
 					 resources: Sequence[TReq],
 					 get_id_from_resource: Callable[[TReq], TId],
 					 fetch_existing: Callable[[Session, list[TId]], Iterable[TRes]],
 					 get_id_from_existing: Callable[[TRes], TId],
-					 exception_factory: Callable[[list[TId]], TExc]) -> list[TId]:
+					 exception_factory: Callable[[list[TId]], TExc]) -> list[TRes]:
 	"""
 	Asserts that a resource requested exists. If any resource does not exist, raises an appropriate exception.
+	The fetched resources are returned, so callers can use them instead of fetching the resources again.
 	:param db: Database session
 	:param resources: Requested resources
 	:param get_id_from_resource: How to get the ID of the resource
 	:param fetch_existing: How to fetch existing resource
 	:param get_id_from_existing: How to get the ID of the existing resource
 	:param exception_factory: Exception to raise if resources requested does not exist
-	:return: List of the ID of the requested resources
+	:return: List of the fetched resources
 	"""
 
 	requested_ids: Set[TId] = {get_id_from_resource(r) for r in resources}
 
-	existing_resources = fetch_existing(db, list(requested_ids))
+	existing_resources = list(fetch_existing(db, list(requested_ids)))
 	existing_ids: Set[TId] = {get_id_from_existing(r) for r in existing_resources}
 
 	missing = sorted(requested_ids - existing_ids)
@@ -77,4 +85,4 @@ def assert_resources(db: Session,
 	if missing:
 		raise exception_factory(missing)
 
-	return list(requested_ids)
+	return existing_resources
@@ -1,18 +1,23 @@
+from functools import partial
+
 from sqlalchemy.orm import Session
 
 from app.schemas.edge import EdgeResponse, EdgeCreate, EdgeDeleteRequest, EdgeSwapDirectionRequest
-from app.repositories import edge_repo
+from app.repositories import edge_repo, graph_repo
+from app.core.config import settings
+from app.core.database import after_commit
+from app.core.exceptions import ConcurrentModificationError
+from app.core.reachability_cache import reachability_cache
 from app.services.assertions import assert_nodes, assert_edges
 
-def get_edges(db: Session, edge_ids: list[int]) -> list[EdgeResponse]:
+def get_edges(db: Session, namespace: str, edge_ids: list[int]) -> list[EdgeResponse]:
 	"""
-	Retrieve the specified edges from the graph using their IDs.
+	Retrieve the specified edges from the graph of the namespace using their IDs.
 	:raises EdgeNotFoundError: If any requested edge does not exist.
 	"""
 
-	assert_edges(db, edge_ids, get_id_from_edge=lambda edge: edge)
-
-	got_edges = edge_repo.get_edges(db, edge_ids)
+	graph_id = graph_repo.current_graph_id(namespace)
+	got_edges = assert_edges(db, graph_id, edge_ids, get_id_from_edge=lambda edge: edge)
 
 	return [EdgeResponse(id=edge.id,
 						 from_node_id=edge.from_node_id,
@@ -20,48 +25,93 @@ def get_edges(db: Session, edge_ids: list[int]) -> list[EdgeResponse]:
 
 
 
-def create_edges(db: Session, edges: list[EdgeCreate]) -> list[EdgeResponse]:
+def list_edges(db: Session, namespace: str, after_id: int, limit: int) -> dict:
+	"""
+	Return a page of at most `limit` edges with an ID greater than `after_id`, ordered by ID, as the content of an
+	``EdgePage``. The next cursor is the ID of the last edge if more edges follow.
+	"""
+
+	graph_id = graph_repo.current_graph_id(namespace)
+	edges = edge_repo.get_edges_page(db, graph_id, after_id, limit + 1)
+	has_more = len(edges) > limit
+	edges = edges[:limit]
+
+	return {'items': [{'from_node_id': from_node_id, 'to_node_id': to_node_id, 'id': edge_id}
+					  for edge_id, from_node_id, to_node_id in edges],
+			'next_cursor': edges[-1][0] if has_more else None}
+
+
+def create_edges(db: Session, namespace: str, edges: list[EdgeCreate]) -> list[EdgeResponse]:
 	"""
-	Create directed edges between existing node(s). Self-loops and multiple connections between the same
-	pair of nodes are allowed.
+	Create directed edges between existing node(s) of the graph of the namespace. Self-loops and multiple
+	connections between the same pair of nodes are allowed.
 
 	:raises NodeNotFoundError: If any referenced node does not exist.
+	:raises ConcurrentModificationError: If the edges were rejected twice although all their nodes exist.
 	"""
 
+	edge_data = [(edge.from_node_id, edge.to_node_id) for edge in edges]
 	node_ids = list({edge.from_node_id for edge in edges} | {edge.to_node_id for edge in edges})
-	assert_nodes(db, node_ids, get_id_from_node=lambda node: node)
 
-	edge_data = [(edge.from_node_id, edge.to_node_id) for edge in edges]
-	created_edges = edge_repo.create_edges(db, edge_data)
+	for _ in range(2):
+		graph_id = graph_repo.lock_graph(db, namespace)
+		created_edges = edge_repo.create_edges(db, graph_id, edge_data)
+
+		if created_edges is not None:
+			break
+
+		# The foreign keys rejected the edges, the assertion then runs to report the missing nodes. If none is
+		# missing, the nodes were committed meanwhile and the insert is run again.
+		assert_nodes(db, graph_id, node_ids, get_id_from_node=lambda node: node)
+	else:
+		raise ConcurrentModificationError('the edges were rejected although all their nodes exist')
+
+	if settings.reachability_cache_enabled:
+		after_commit(db, lambda: reachability_cache.invalidate({edge.from_node_id for edge in edges}))
 
 	return [EdgeResponse(id=edge.id,
 						 from_node_id=edge.from_node_id,
 						 to_node_id=edge.to_node_id) for edge in created_edges]
 
 
-def swap_edge_directions(db: Session, edges: list[EdgeSwapDirectionRequest]) -> list[EdgeResponse]:
+def swap_edge_directions(db: Session, namespace: str, edges: list[EdgeSwapDirectionRequest]) -> list[EdgeResponse]:
 	"""
     Reverse the direction of the specified edges (X -> Y becomes Y -> X).
 
     :raises EdgeNotFoundError: If any requested edge does not exist.
     """
 
-	edge_ids = assert_edges(db, edges)
+	# The edges stay locked until the swap commits, so the swapped endpoints are derived from the fetched rows.
+	graph_id = graph_repo.lock_graph(db, namespace)
+	existing_edges = assert_edges(db, graph_id, edges, fetch_existing=partial(edge_repo.get_edges, lock=True))
+	swapped_edges = edge_repo.swap_edge_directions(db, graph_id, existing_edges)
 
-	swapped_edges = edge_repo.swap_edge_directions(db, edge_ids)
+	if settings.reachability_cache_enabled:
+		after_commit(db, lambda: reachability_cache.invalidate({edge.from_node_id for edge in swapped_edges} |
+															   {edge.to_node_id for edge in swapped_edges}))
 
 	return [EdgeResponse(id=swapped_edge.id,
 						 from_node_id=swapped_edge.from_node_id,
 						 to_node_id=swapped_edge.to_node_id) for swapped_edge in swapped_edges]
 
 
-def delete_edges(db: Session, edges: list[EdgeDeleteRequest]) -> None:
+def delete_edges(db: Session, namespace: str, edges: list[EdgeDeleteRequest]) -> None:
 	"""
     Delete the specified edges from the graph.
 
     :raises EdgeNotFoundError: If any requested edge does not exist.
     """
 
-	edge_ids = assert_edges(db, edges)
+	edge_ids = list({edge.edge_id for edge in edges})
+	graph_id = graph_repo.lock_graph(db, namespace)
+
+	if settings.reachability_cache_enabled:
+		# The sources of the edges are gone after the delete, results containing them may lose nodes.
+		source_ids = {edge.from_node_id for edge in assert_edges(db, graph_id, edges)}
+
+	# Nothing is deleted if any edge is missing, the assertion then only runs to report the missing edges.
+	if not edge_repo.delete_edges(db, graph_id, edge_ids):
+		assert_edges(db, graph_id, edges)
 
-	edge_repo.delete_edges(db, edge_ids)
+	if settings.reachability_cache_enabled:
+		after_commit(db, lambda: reachability_cache.invalidate(source_ids))
@@ -1,45 +1,201 @@
+from array import array
+from bisect import bisect_left
+
+from typing_extensions import Iterator, Sequence
+
 from sqlalchemy.orm import Session
 
-from app.repositories import node_repo, edge_repo
-from app.schemas.graph import GraphResponse
-from app.schemas.node import NodeResponse
-from app.schemas.edge import EdgeResponse
-from app.scripts import seed_db
+from app.repositories import node_repo, edge_repo, graph_repo, version_repo
+from app.core.config import settings
+from app.core.exceptions import InvalidSnapshotError
+from app.core.graph_index import graph_indexes
+from app.core.snapshot import read_snapshot, write_snapshot
+from app.schemas.graph import (GeneratedGraphResponse, GraphResponse, GraphStreamFormat, GraphTopology,
+							   SnapshotImportResponse)
+from app.scripts import generate_graph, seed_db
+
+
+def get_graph(db: Session, namespace: str) -> dict:
+	"""
+	Return the complete graph of the namespace, including all nodes and edges, as the content of a
+	``GraphResponse``. The content is built from plain rows without constructing a model per node or edge.
+	"""
+
+	graph_id = graph_repo.current_graph_id(namespace)
+	node_ids = node_repo.get_all_node_ids(db, graph_id)
+	edges = edge_repo.get_all_edge_rows(db, graph_id)
+
+	return {'nodes': [{'id': node_id} for node_id in node_ids],
+			'edges': [{'from_node_id': from_node_id, 'to_node_id': to_node_id, 'id': edge_id}
+					  for edge_id, from_node_id, to_node_id in edges]}
 
 
-def get_graph(db: Session) -> GraphResponse:
+def get_graph_version(db: Session, namespace: str) -> int:
 	"""
-	Return the complete graph, including all nodes and edges.
+	Return the graph version of the namespace, which increases with every committed mutation of its graph, including
+	clearing and replacing it.
 	"""
 
-	nodes = node_repo.get_all_nodes(db)
-	edges = edge_repo.get_all_edges(db)
+	return version_repo.get_graph_version(db, namespace)
+
+
+def _node_ids(db: Session, graph_id: int) -> Iterator[Sequence[int]]:
+	last_id = 0
+
+	while page := node_repo.get_node_ids_page(db, graph_id, last_id, settings.export_page_size):
+		yield page
+		last_id = page[-1]
+
+
+def _edges(db: Session, graph_id: int) -> Iterator[Sequence[tuple[int, int, int]]]:
+	last_id = 0
+
+	while page := edge_repo.get_edges_page(db, graph_id, last_id, settings.export_page_size):
+		yield page
+		last_id = page[-1][0]
+
+
+def stream_graph(db: Session, namespace: str, stream_format: GraphStreamFormat) -> Iterator[bytes]:
+	"""
+	Yield the complete graph in chunks of at most one page of nodes or edges, so memory use does not depend on the
+	size of the graph. Pages are read with keyset pagination over the IDs inside a single transaction.
+
+	In JSON format the concatenated chunks are identical to the response of ``get_graph``. In NDJSON format every
+	line is a node or an edge object with an additional ``type`` field.
+	"""
+
+	graph_id = graph_repo.get_graph_id(db, namespace)
+
+	if stream_format == GraphStreamFormat.NDJSON:
+		for page in _node_ids(db, graph_id):
+			yield ''.join('{"type":"node","id":%d}\n' % node_id for node_id in page).encode()
+
+		for page in _edges(db, graph_id):
+			yield ''.join('{"type":"edge","id":%d,"from_node_id":%d,"to_node_id":%d}\n' % tuple(edge)
+						  for edge in page).encode()
+
+		return
+
+	yield b'{"nodes":['
+
+	separator = b''
+	for page in _node_ids(db, graph_id):
+		yield separator + ','.join('{"id":%d}' % node_id for node_id in page).encode()
+		separator = b','
+
+	yield b'],"edges":['
+
+	separator = b''
+	for page in _edges(db, graph_id):
+		yield separator + ','.join('{"from_node_id":%d,"to_node_id":%d,"id":%d}' % (from_node_id, to_node_id, edge_id)
+								   for edge_id, from_node_id, to_node_id in page).encode()
+		separator = b','
+
+	yield b']}'
+
+
+def stream_versioned_graph(db: Session, namespace: str, stream_format: GraphStreamFormat) -> Iterator[int | bytes]:
+	"""
+	Yield the graph version of the namespace followed by the chunks of ``stream_graph``, read in the same
+	transaction, so the version describes exactly the streamed graph.
+	"""
+
+	yield get_graph_version(db, namespace)
+	yield from stream_graph(db, namespace, stream_format)
+
+
+def export_snapshot(db: Session, namespace: str, compress: bool = False) -> bytes:
+	"""
+	Return the complete graph of the namespace encoded in the binary snapshot format of ``app.core.snapshot``. The
+	graph is read page by page with keyset pagination, like ``stream_graph``, without constructing a model per node or
+	edge.
+	"""
+
+	graph_id = graph_repo.get_graph_id(db, namespace)
+	node_ids = [node_id for page in _node_ids(db, graph_id) for node_id in page]
+	edges = [edge for page in _edges(db, graph_id) for edge in page]
+
+	return write_snapshot(node_ids, edges, compress)
+
+
+def _positions(node_ids: Sequence[int], endpoints: Sequence[int]) -> Iterator[int]:
+	# The node IDs of a snapshot are sorted, so the position of every edge endpoint is found by bisection.
+	for node_id in endpoints:
+		position = bisect_left(node_ids, node_id)
+
+		if position == len(node_ids) or node_ids[position] != node_id:
+			raise InvalidSnapshotError('edges must reference nodes of the snapshot.')
+
+		yield position
+
+
+def import_snapshot(db: Session, namespace: str, data: bytes) -> SnapshotImportResponse:
+	"""
+	Replace the graph of the namespace with the graph of a binary snapshot. IDs are unique across all namespaces, so
+	the nodes and edges get new IDs, assigned in the order of their IDs in the snapshot.
+
+	:raises InvalidSnapshotError: If the data is not a valid snapshot or an edge references a node missing from it.
+	"""
+
+	try:
+		snapshot = read_snapshot(data)
+	except ValueError as error:
+		raise InvalidSnapshotError(error) from None
+
+	node_ids = snapshot.node_ids()
+	# Both endpoint columns are checked before the graph is replaced.
+	from_positions = array('I', _positions(node_ids, snapshot.from_node_ids))
+	to_positions = array('I', _positions(node_ids, snapshot.to_node_ids))
+
+	graph_repo.create_graph(db, namespace, snapshot.node_count, zip(from_positions, to_positions))
+
+	return SnapshotImportResponse(nodes=snapshot.node_count, edges=snapshot.edge_count)
+
+
+def seed_graph(db: Session, namespace: str) -> GraphResponse:
+	"""
+	Replace the graph of the namespace with a predefined deterministic graph and return it.
+	"""
+
+	return seed_db.seed_graph(db, namespace)
+
+
+def seed_graph_random(db: Session,
+					  namespace: str,
+					  nodes: int,
+					  edges: int,
+					  topology: GraphTopology,
+					  seed: int | None = None) -> GeneratedGraphResponse:
+	"""
+	Replace the graph of the namespace with a generated graph of the given size and topology and return its
+	parameters. The same parameters and seed always generate the same graph.
+	"""
 
-	return GraphResponse(nodes=[NodeResponse(id=node.id) for node in nodes],
-						 edges=[EdgeResponse(id=edge.id,
-											 from_node_id=edge.from_node_id,
-											 to_node_id=edge.to_node_id) for edge in edges])
+	return generate_graph.generate_graph(db, namespace, nodes, edges, topology, seed)
 
 
-def seed_graph(db: Session) -> GraphResponse:
+def clear_graph(db: Session, namespace: str) -> None:
 	"""
-	Replace the current graph with a predefined deterministic graph and return it.
+	Replace the graph of the namespace with an empty graph. The nodes and edges of the old graph disappear at once and
+	are deleted later by ``purge_retired_graphs``.
 	"""
 
-	return seed_db.seed_graph(db)
+	graph_repo.clear_graph(db, namespace)
 
 
-def seed_graph_random(db: Session) -> GraphResponse:
+def purge_retired_graphs(db: Session) -> int:
 	"""
-	Replace the current graph with a randomly generated graph and return it.
+	Delete the nodes and edges of all graphs that were cleared or replaced, in transactions of at most
+	``settings.purge_chunk_size`` rows, and return the number of deleted nodes.
 	"""
 
-	return seed_db.seed_graph_random(db)
+	return sum(graph_repo.purge_graph(db, graph_id, settings.purge_chunk_size)
+			   for graph_id in graph_repo.get_retired_graph_ids(db))
 
 
-def clear_graph(db: Session) -> None:
+def load_graph_indexes(db: Session) -> None:
 	"""
-	Delete all nodes and edges from the graph.
+	Load the in-memory indexes of the current graphs of all namespaces.
 	"""
 
-	node_repo.delete_all_nodes(db)
+	graph_indexes.load(db, graph_repo.get_graph_ids(db))
@@ -1,58 +1,219 @@
+from time import monotonic
+
 from sqlalchemy.orm import Session
 
-from app.repositories import node_repo
-from app.schemas.node import NodeResponse, NodeCreate, NodeDeleteRequest
+from app.repositories import graph_repo, node_repo
+from app.schemas.node import NodeResponse, NodeCreate, NodeDeleteRequest, PathResponse, ReachableNodes
+from app.core.config import settings
+from app.core.database import after_commit
 from app.core.exceptions import NodeNotFoundError
+from app.core.reachability_cache import reachability_cache
 from app.services.assertions import assert_nodes
 
-def get_nodes(db: Session, node_ids: list[int]) -> list[NodeResponse]:
+def get_nodes(db: Session, namespace: str, node_ids: list[int]) -> list[NodeResponse]:
 	"""
-	Retrieve the specified nodes from the graph using their IDs.
+	Retrieve the specified nodes from the graph of the namespace using their IDs.
 	:raises NodeNotFoundError: If any requested node does not exist.
 	"""
 
-	assert_nodes(db, node_ids, get_id_from_node=lambda node: node)
-
-	got_nodes = node_repo.get_nodes(db=db, node_ids=node_ids)
+	graph_id = graph_repo.current_graph_id(namespace)
+	got_nodes = assert_nodes(db, graph_id, node_ids, get_id_from_node=lambda node: node)
 
 	return [NodeResponse(id=node.id) for node in got_nodes]
 
 
 
-def get_reachable_nodes(db: Session, node_id: int) -> list[NodeResponse]:
+def list_nodes(db: Session, namespace: str, after_id: int, limit: int) -> dict:
+	"""
+	Return a page of at most `limit` nodes with an ID greater than `after_id`, ordered by ID, as the content of a
+	``NodePage``. The next cursor is the ID of the last node if more nodes follow.
+	"""
+
+	graph_id = graph_repo.current_graph_id(namespace)
+	node_ids = node_repo.get_node_ids_page(db, graph_id, after_id, limit + 1)
+	has_more = len(node_ids) > limit
+	node_ids = node_ids[:limit]
+
+	return {'items': [{'id': node_id} for node_id in node_ids],
+			'next_cursor': node_ids[-1] if has_more else None}
+
+
+def get_reachable_nodes(db: Session, namespace: str, node_id: int) -> list[dict]:
+	"""
+	Return all nodes reachable from the given node via directed edges, as the content of ``NodeResponse`` objects.
+	Results are served from the reachability cache if it is enabled.
+
+	:raises NodeNotFoundError: If the node does not exist.
+	"""
+
+	graph_id = graph_repo.get_read_graph_id(db, namespace)
+
+	if settings.reachability_cache_enabled:
+		reachable_ids = reachability_cache.get(graph_id, node_id)
+
+		if reachable_ids is not None:
+			return [{'id': reachable_id} for reachable_id in reachable_ids]
+
+		version = reachability_cache.version()
+
+	reachable_ids = [node.id for node in node_repo.get_reachable_nodes(db, graph_id, node_id)]
+
+	# The start node is part of its own result, so an empty result is the existence check.
+	if not reachable_ids:
+		raise NodeNotFoundError(node_id)
+
+	if settings.reachability_cache_enabled:
+		reachability_cache.put(graph_id, node_id, reachable_ids, version)
+
+	return [{'id': reachable_id} for reachable_id in reachable_ids]
+
+
+def get_reachable_nodes_bounded(db: Session,
+								namespace: str,
+								node_id: int,
+								max_depth: int | None = None,
+								limit: int | None = None,
+								timeout: float | None = None,
+								include_depth: bool = False,
+								reverse: bool = False) -> ReachableNodes:
 	"""
-	Return all nodes reachable from the given node via directed edges.
+	Return the nodes reachable from the given node via directed edges, stopping the traversal at `max_depth` hops,
+	`limit` nodes or after `timeout` seconds. The result is marked as truncated if any reachable node was left out.
+	The nodes are the content of ``ReachableNodeResponse`` objects, with a depth only if `include_depth` is set.
+	With `reverse`, the nodes the given node is reachable from are returned instead.
 
 	:raises NodeNotFoundError: If the node does not exist.
 	"""
 
-	node = node_repo.get_node(db, node_id)
+	deadline = monotonic() + timeout if timeout is not None else None
+	graph_id = graph_repo.get_read_graph_id(db, namespace)
+	traversal = node_repo.get_reachable_node_ids_bounded(db, graph_id, node_id, max_depth, limit, deadline, reverse)
 
-	if not node:
+	if not traversal.node_ids:
 		raise NodeNotFoundError(node_id)
 
-	reachable_nodes = node_repo.get_reachable_nodes(db, node_id)
+	if include_depth:
+		nodes = [{'id': reachable_id, 'depth': depth}
+				 for reachable_id, depth in zip(traversal.node_ids, traversal.depths)]
+	else:
+		nodes = [{'id': reachable_id} for reachable_id in traversal.node_ids]
 
-	return [NodeResponse(id=node.id) for node in reachable_nodes]
+	return ReachableNodes.model_construct(nodes=nodes, truncated=traversal.truncated)
 
 
-def create_nodes(db: Session, nodes: list[NodeCreate]) -> list[NodeResponse]:
+def get_reachable_nodes_batch(db: Session, namespace: str, node_ids: list[int]) -> dict[int, list[dict]]:
 	"""
-	Create one or more new nodes and return their assigned IDs.
+	Return all nodes reachable from each of the given nodes via directed edges, as the content of ``NodeResponse``
+	objects keyed by the source node ID. Only the nodes missing from the reachability cache, if it is enabled, are
+	traversed.
+
+	:raises NodeNotFoundError: If any of the nodes does not exist.
 	"""
 
-	created_nodes = node_repo.create_nodes(db, count=len(nodes))
+	node_ids = list(dict.fromkeys(node_ids))
+	graph_id = graph_repo.get_read_graph_id(db, namespace)
+	cached = {}
+
+	if settings.reachability_cache_enabled:
+		cached = {node_id: reachable_ids for node_id in node_ids
+				  if (reachable_ids := reachability_cache.get(graph_id, node_id)) is not None}
+		version = reachability_cache.version()
+
+	uncached_ids = [node_id for node_id in node_ids if node_id not in cached]
+	computed = node_repo.get_reachable_node_ids_batch(db, graph_id, uncached_ids) if uncached_ids else {}
+
+	if len(computed) != len(uncached_ids):
+		raise NodeNotFoundError(sorted(set(uncached_ids) - computed.keys()))
+
+	if settings.reachability_cache_enabled:
+		for node_id, reachable_ids in computed.items():
+			reachability_cache.put(graph_id, node_id, reachable_ids, version)
+
+	reachable = {node_id: cached[node_id] if node_id in cached else computed[node_id] for node_id in node_ids}
+
+	return {node_id: [{'id': reachable_id} for reachable_id in reachable_ids]
+			for node_id, reachable_ids in reachable.items()}
+
+
+def get_ancestor_nodes(db: Session, namespace: str, node_id: int) -> list[dict]:
+	"""
+	Return all nodes the given node is reachable from via directed edges, including the node itself, as the content
+	of ``NodeResponse`` objects. Ancestors are not cached.
+
+	:raises NodeNotFoundError: If the node does not exist.
+	"""
+
+	graph_id = graph_repo.get_read_graph_id(db, namespace)
+	ancestor_ids = [node.id for node in node_repo.get_reachable_nodes(db, graph_id, node_id, reverse=True)]
+
+	if not ancestor_ids:
+		raise NodeNotFoundError(node_id)
+
+	return [{'id': ancestor_id} for ancestor_id in ancestor_ids]
+
+
+def get_ancestor_nodes_batch(db: Session, namespace: str, node_ids: list[int]) -> dict[int, list[dict]]:
+	"""
+	Return all nodes each of the given nodes is reachable from via directed edges, as the content of
+	``NodeResponse`` objects keyed by the target node ID.
+
+	:raises NodeNotFoundError: If any of the nodes does not exist.
+	"""
+
+	node_ids = list(dict.fromkeys(node_ids))
+	graph_id = graph_repo.get_read_graph_id(db, namespace)
+	ancestors = node_repo.get_reachable_node_ids_batch(db, graph_id, node_ids, reverse=True)
+
+	if len(ancestors) != len(node_ids):
+		raise NodeNotFoundError(sorted(set(node_ids) - ancestors.keys()))
+
+	return {node_id: [{'id': ancestor_id} for ancestor_id in ancestors[node_id]] for node_id in node_ids}
+
+
+def get_path(db: Session, namespace: str, source_node_id: int, target_node_id: int) -> PathResponse:
+	"""
+	Return a shortest directed path from the source node to the target node, if the target is reachable.
+
+	:raises NodeNotFoundError: If any of the nodes does not exist.
+	"""
+
+	graph_id = graph_repo.get_read_graph_id(db, namespace)
+	path = node_repo.get_shortest_path(db, graph_id, source_node_id, target_node_id)
+
+	# A path of at least one edge only consists of existing nodes, otherwise the nodes are checked.
+	if path is None or source_node_id == target_node_id:
+		assert_nodes(db, graph_id, [source_node_id, target_node_id], get_id_from_node=lambda node: node)
+
+	if path is None:
+		return PathResponse(reachable=False, length=None, nodes=[])
+
+	return PathResponse(reachable=True, length=len(path) - 1, nodes=[NodeResponse(id=node_id) for node_id in path])
+
+
+def create_nodes(db: Session, namespace: str, nodes: list[NodeCreate]) -> list[NodeResponse]:
+	"""
+	Create one or more new nodes in the graph of the namespace and return their assigned IDs.
+	"""
+
+	graph_id = graph_repo.lock_graph(db, namespace)
+	created_nodes = node_repo.create_nodes(db, graph_id, count=len(nodes))
 
 	return [NodeResponse(id=node.id) for node in created_nodes]
 
 
-def delete_nodes(db, nodes: list[NodeDeleteRequest]) -> None:
+def delete_nodes(db, namespace: str, nodes: list[NodeDeleteRequest]) -> None:
 	"""
-	Delete the specified nodes from the graph.
+	Delete the specified nodes from the graph of the namespace.
 
 	:raises NodeNotFoundError: If any requested node does not exist.
 	"""
 
-	node_ids = assert_nodes(db, nodes)
+	node_ids = list({node.node_id for node in nodes})
+	graph_id = graph_repo.lock_graph(db, namespace)
+
+	# Nothing is deleted if any node is missing, the assertion then only runs to report the missing nodes.
+	if not node_repo.delete_nodes(db, graph_id, node_ids):
+		assert_nodes(db, graph_id, nodes)
 
-	node_repo.delete_nodes(db, node_ids)
+	if settings.reachability_cache_enabled:
+		after_commit(db, lambda: reachability_cache.invalidate(node_ids))
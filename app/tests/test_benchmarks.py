@@ -0,0 +1,33 @@
+from sqlalchemy.orm import sessionmaker
+
+from app.benchmarks.suite import compare, create_benchmark_engine, run_suite, summarize
+from app.core.config import settings
+from app.models.base import Base
+from app.schemas.graph import GraphTopology
+
+
+def test_summarize_and_compare():
+	result = summarize([0.004, 0.001, 0.002, 0.003], items=40)
+	assert result == {'runs': 4, 'items_per_second': 4000.0, 'p50_ms': 2.0, 'p95_ms': 4.0, 'p99_ms': 4.0}
+
+	slower = {**result, 'p95_ms': 6.0}
+	assert compare({'a': result}, {'a': result, 'b': result}, tolerance=0.25) == []
+	assert compare({'a': slower}, {'a': result}, tolerance=0.25) == ['a: p95_ms 4.000 -> 6.000 (+50%)']
+	assert compare({'a': slower}, {'a': result}, tolerance=0.5) == []
+	assert compare({'a': result}, {'a': {**result, 'p50_ms': 0.0}}, tolerance=0.25) == []
+
+
+def test_run_suite_on_stand_in():
+	index_enabled = settings.graph_index_enabled
+	engine = create_benchmark_engine('sqlite:///:memory:')
+	Base.metadata.create_all(engine)
+
+	results = run_suite(sessionmaker(bind=engine, autoflush=False), [200], [GraphTopology.DAG], repeat=2)
+
+	assert {name.split('/')[-1] for name in results} == {'reachability[database]', 'reachability_bounded[database]',
+														 'index_load', 'reachability[index]',
+														 'reachability_bounded[index]', 'bulk_create', 'bulk_delete',
+														 'bulk_swap', 'export_json', 'export_ndjson',
+														 'export_snapshot'}
+	assert all(result['runs'] == 2 for result in results.values())
+	assert settings.graph_index_enabled == index_enabled
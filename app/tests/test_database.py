@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app import gunicorn_conf
+from app.core import database
+from app.core.config import settings
+
+
+def test_import_does_not_connect(tmp_path):
+	# Imported from another working directory, without a database to connect to.
+	script = 'import app.main; from app.core import database; assert database._engine is None'
+	subprocess.run([sys.executable, '-c', script], cwd=tmp_path, check=True,
+				   env={**os.environ, 'PYTHONPATH': str(database.DDL_DIRECTORY.parent.parent), 'APP_DB_PORT': '1'})
+
+
+def test_ddl_files_exist():
+	assert all((database.DDL_DIRECTORY / ddl).is_file() for ddl in database.SCHEMA.values())
+
+
+def test_ensure_schema_creates_missing_tables_once(tmp_path, monkeypatch):
+	engine = create_engine(f'sqlite:///{tmp_path}/schema.db')
+	(tmp_path / 'a.sql').write_text('CREATE TABLE a (id INTEGER PRIMARY KEY)')
+	(tmp_path / 'b.sql').write_text('CREATE TABLE b (id INTEGER PRIMARY KEY)')
+
+	with engine.begin() as connection:
+		connection.execute(text('CREATE TABLE a (id INTEGER PRIMARY KEY)'))
+
+	monkeypatch.setattr(database, 'SCHEMA', {'a': 'a.sql', 'b': 'b.sql'})
+	monkeypatch.setattr(database, 'DDL_DIRECTORY', tmp_path)
+	monkeypatch.setattr(database, 'get_engine', lambda: engine)
+	monkeypatch.setattr(database, '_schema_ready', False)
+
+	database.ensure_schema()
+	assert inspect(engine).get_table_names() == ['a', 'b']
+
+	with engine.begin() as connection:
+		connection.execute(text('DROP TABLE b'))
+
+	# The result of the check is cached.
+	database.ensure_schema()
+	assert inspect(engine).get_table_names() == ['a']
+
+
+def test_process_local_state_requires_a_single_worker(monkeypatch):
+	monkeypatch.setattr(settings, 'schema_setup_enabled', False)
+	monkeypatch.setattr(settings, 'graph_index_enabled', True)
+
+	with pytest.raises(RuntimeError):
+		gunicorn_conf.on_starting(SimpleNamespace(cfg=SimpleNamespace(workers=2)))
+
+	gunicorn_conf.on_starting(SimpleNamespace(cfg=SimpleNamespace(workers=1)))
@@ -0,0 +1,29 @@
+import pytest
+
+from app.core.condensation import strongly_connected_components
+from app.schemas.graph import GraphTopology
+from app.scripts.generate_graph import generate_edges
+
+
+@pytest.mark.parametrize('topology', list(GraphTopology))
+def test_generated_edges_are_reproducible(topology):
+	edges = list(generate_edges(100, 300, topology, seed=7))
+
+	assert len(edges) == 300
+	assert all(0 <= from_index < 100 and 0 <= to_index < 100 for from_index, to_index in edges)
+	assert list(generate_edges(100, 300, topology, seed=7)) == edges
+	assert list(generate_edges(100, 300, topology, seed=8)) != edges
+
+
+def test_generated_topologies():
+	assert all(from_index < to_index for from_index, to_index in generate_edges(50, 500, GraphTopology.DAG, seed=1))
+
+	chain = list(generate_edges(50, 500, GraphTopology.CHAIN, seed=1))
+	assert chain[:49] == [(node, node + 1) for node in range(49)]
+	assert all(to_index <= from_index for from_index, to_index in chain[49:])
+
+	successors: dict[int, list[int]] = {}
+	for from_index, to_index in generate_edges(50, 100, GraphTopology.SCC, seed=1):
+		successors.setdefault(from_index, []).append(to_index)
+
+	assert len(strongly_connected_components(range(50), lambda node: successors.get(node, []))) == 1
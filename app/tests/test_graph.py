@@ -1,8 +1,18 @@
+import asyncio
+import json
+
 from typing_extensions import Callable
 
 from fastapi.testclient import TestClient
 
 from app.main import server
+from app.core import write_coalescer
+from app.core.config import settings
+from app.core.exceptions import EdgeNotFoundError, NodeNotFoundError
+from app.schemas.edge import EdgeCreate, EdgeDeleteRequest
+from app.schemas.node import NodeCreate
+from app.repositories import edge_repo
+from app.services import edge_service, node_service
 from app.scripts.seed_db import NODES_TO_CREATE, EDGES_TO_CREATE
 
 client = TestClient(server)
@@ -107,3 +117,449 @@ def test_node_connected():
 																	  {'id':16},
 																	  {'id':10},
 																	  {'id':12}]))
+
+
+def test_bulk_nodes():
+	response = client.post('/nodes/bulk', json=[{}, {}, {}])
+	assert response.status_code == 201
+	created_ids = [node['id'] for node in response.json()]
+
+	assert len(created_ids) == 3
+	assert all(node in get_graph_nodes() for node in response.json())
+
+	response = client.request('DELETE', '/nodes/bulk', json=[{'node_id': node_id} for node_id in created_ids])
+	assert response.status_code == 204
+
+	assert not any(node['id'] in created_ids for node in get_graph_nodes())
+
+
+def test_bulk_edges():
+	seed_graph()
+	first_node = get_min_id()
+	last_node = get_max_id()
+
+	response = client.post('/edges/bulk', json=[{'from_node_id': first_node, 'to_node_id': last_node},
+												{'from_node_id': last_node, 'to_node_id': last_node}])
+	assert response.status_code == 201
+	edge_ids = [edge['id'] for edge in response.json()]
+
+	response = client.put('/edges/bulk', json=[{'edge_id': edge_id} for edge_id in edge_ids])
+	assert response.status_code == 200
+	assert sorted((edge['from_node_id'], edge['to_node_id']) for edge in response.json()) == \
+		   [(last_node, first_node), (last_node, last_node)]
+	assert client.get(f'/edges/{edge_ids[0]}').json() == [{'id': edge_ids[0],
+															'from_node_id': last_node,
+															'to_node_id': first_node}]
+
+	# A single missing edge fails the whole batch.
+	response = client.request('DELETE', '/edges/bulk', json=[{'edge_id': edge_ids[0]}, {'edge_id': max(edge_ids) + 1}])
+	assert response.status_code == 404
+	assert len(get_graph_edges()) == len(EDGES_TO_CREATE) + 2
+
+	response = client.request('DELETE', '/edges/bulk', json=[{'edge_id': edge_id} for edge_id in edge_ids])
+	assert response.status_code == 204
+	assert len(get_graph_edges()) == len(EDGES_TO_CREATE)
+
+
+def test_bulk_limits():
+	assert client.post('/nodes/bulk', json=[]).status_code == 422
+
+
+def test_stream_graph():
+	graph = seed_graph()
+
+	response = client.get('/graph', params={'stream': 'json'})
+	assert response.status_code == 200
+	assert response.content == client.get('/graph').content
+	assert response.json() == graph
+
+	etag = response.headers['ETag']
+	assert client.get('/graph', params={'stream': 'json'}, headers={'If-None-Match': etag}).status_code == 304
+
+	response = client.get('/graph', params={'stream': 'ndjson'})
+	assert response.status_code == 200
+	lines = [json.loads(line) for line in response.text.splitlines()]
+	assert [line['id'] for line in lines if line['type'] == 'node'] == [node['id'] for node in graph['nodes']]
+	assert [line['id'] for line in lines if line['type'] == 'edge'] == [edge['id'] for edge in graph['edges']]
+
+
+def test_list_pages():
+	graph = seed_graph()
+
+	for resource, key in (('/nodes', 'nodes'), ('/edges', 'edges')):
+		items, cursor = [], 0
+
+		while cursor is not None:
+			response = client.get(resource, params={'after': cursor, 'limit': 10})
+			assert response.status_code == 200
+			page = response.json()
+
+			assert len(page['items']) <= 10
+			items += page['items']
+			cursor = page['next_cursor']
+
+		assert items == graph[key]
+
+
+def test_node_connected_batch():
+	seed_graph()
+	node_ids = [get_min_id() + i for i in (0, 9, 19)]
+
+	response = client.post('/nodes/connected', json={'node_ids': node_ids})
+	assert response.status_code == 200
+	json_data = response.json()
+
+	assert list(json_data) == [str(node_id) for node_id in node_ids]
+	for node_id in node_ids:
+		assert json_data[str(node_id)] == client.get(f'/nodes/{node_id}/connected').json()
+
+	response = client.post('/nodes/connected', json={'node_ids': [node_ids[0], get_max_id() + 1]})
+	assert response.status_code == 404
+
+
+def test_node_connected_bounded():
+	seed_graph()
+	first_node = get_min_id()
+
+	response = client.get(f'/nodes/{first_node}/connected', params={'max_depth': 1, 'include_depth': True})
+	assert response.status_code == 200
+	assert response.headers['X-Result-Truncated'] == 'true'
+	assert response.json() == [{'id': first_node, 'depth': 0}] + [{'id': first_node + offset, 'depth': 1}
+																   for offset in (1, 2, 4, 5)]
+
+	response = client.get(f'/nodes/{first_node}/connected', params={'limit': 3})
+	assert response.headers['X-Result-Truncated'] == 'true'
+	assert response.json() == [{'id': first_node + offset} for offset in (0, 1, 2)]
+
+	unbounded = client.get(f'/nodes/{first_node}/connected')
+	response = client.get(f'/nodes/{first_node}/connected', params={'limit': 100, 'timeout': 10})
+	assert response.headers['X-Result-Truncated'] == 'false'
+	assert response.json() == unbounded.json()
+
+
+def test_node_ancestors():
+	seed_graph()
+	node_ids = range(get_min_id(), get_max_id() + 1)
+	connected = {node_id: {node['id'] for node in client.get(f'/nodes/{node_id}/connected').json()}
+				 for node_id in node_ids}
+	target = get_min_id() + 11
+	expected = sorted(node_id for node_id in node_ids if target in connected[node_id])
+
+	response = client.get(f'/nodes/{target}/ancestors')
+	assert response.status_code == 200
+	assert response.headers['X-Result-Truncated'] == 'false'
+	assert sorted(node['id'] for node in response.json()) == expected
+
+	response = client.get(f'/nodes/{target}/ancestors', params={'max_depth': 1, 'include_depth': True})
+	assert response.headers['X-Result-Truncated'] == 'true'
+	nodes = response.json()
+	assert nodes[0] == {'id': target, 'depth': 0}
+	assert all(node['depth'] == 1 and target in connected[node['id']] for node in nodes[1:])
+
+	response = client.get(f'/nodes/{target}/ancestors', params={'limit': 100, 'timeout': 10})
+	assert response.headers['X-Result-Truncated'] == 'false'
+	assert sorted(node['id'] for node in response.json()) == expected
+
+	response = client.post('/nodes/ancestors', json={'node_ids': [target, get_min_id()]})
+	assert response.status_code == 200
+	assert sorted(node['id'] for node in response.json()[str(target)]) == expected
+	assert response.json()[str(get_min_id())] == [{'id': get_min_id()}]
+
+	assert client.get(f'/nodes/{get_max_id() + 1}/ancestors').status_code == 404
+	assert client.post('/nodes/ancestors', json={'node_ids': [get_max_id() + 1]}).status_code == 404
+
+
+def test_node_path():
+	seed_graph()
+	first_node = get_min_id()
+
+	response = client.get(f'/nodes/{first_node}/path/{first_node + 11}')
+	assert response.status_code == 200
+	assert response.json() == {'reachable': True,
+							   'length': 6,
+							   'nodes': [{'id': first_node + offset} for offset in (0, 1, 3, 10, 15, 9, 11)]}
+
+	response = client.get(f'/nodes/{first_node + 11}/path/{first_node + 24}')
+	assert response.json() == {'reachable': False, 'length': None, 'nodes': []}
+
+	response = client.get(f'/nodes/{first_node}/path/{get_max_id() + 1}')
+	assert response.status_code == 404
+
+
+def test_node_connected_cached(monkeypatch):
+	monkeypatch.setattr(settings, 'reachability_cache_enabled', True)
+	seed_graph()
+	first_node = get_min_id()
+	last_node = get_max_id()
+
+	expected = client.get(f'/nodes/{first_node}/connected').json()
+	assert client.get(f'/nodes/{first_node}/connected').json() == expected
+
+	response = client.post('/edges', json={'from_node_id': first_node + 1, 'to_node_id': last_node})
+	assert response.status_code == 201
+	assert {'id': last_node} not in expected
+	assert {'id': last_node} in client.get(f'/nodes/{first_node}/connected').json()
+
+	client.request('DELETE', '/edges', json={'edge_id': response.json()[0]['id']})
+	assert client.get(f'/nodes/{first_node}/connected').json() == expected
+
+	client.request('DELETE', '/nodes', json={'node_id': first_node + 1})
+	assert {'id': first_node + 1} not in client.get(f'/nodes/{first_node}/connected').json()
+
+
+def test_conditional_get():
+	seed_graph()
+	first_node = get_min_id()
+
+	response = client.get('/graph')
+	etag = response.headers['ETag']
+	assert client.get('/graph', headers={'If-None-Match': etag}).status_code == 304
+	assert client.get('/graph', params={'stream': 'ndjson'}, headers={'If-None-Match': etag}).status_code == 304
+
+	response = client.get(f'/nodes/{first_node}/connected', headers={'If-None-Match': etag})
+	assert response.status_code == 304
+	assert response.headers['ETag'] == etag
+	assert 'ETag' not in client.get(f'/nodes/{first_node}/connected', params={'timeout': 10}).headers
+
+	client.post('/nodes', json={})
+
+	response = client.get('/graph', headers={'If-None-Match': etag})
+	assert response.status_code == 200
+	assert response.headers['ETag'] != etag
+	assert client.get(f'/nodes/{first_node}/connected', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_missing_resources():
+	seed_graph()
+	first_node = get_min_id()
+	missing_node = get_max_id() + 1
+
+	assert client.get(f'/nodes/{missing_node}').status_code == 404
+	assert client.get(f'/nodes/{missing_node}/connected').status_code == 404
+	assert client.get(f'/nodes/{missing_node}/connected', params={'max_depth': 0}).status_code == 404
+	assert client.get(f'/nodes/{missing_node}/path/{missing_node}').status_code == 404
+	assert client.get('/edges/1000000').status_code == 404
+	assert client.put('/edges', json={'edge_id': 1000000}).status_code == 404
+
+	response = client.post('/edges/bulk', json=[{'from_node_id': first_node, 'to_node_id': first_node},
+												{'from_node_id': first_node, 'to_node_id': missing_node}])
+	assert response.status_code == 404
+	assert str(missing_node) in response.json()['detail']
+	assert len(get_graph_edges()) == len(EDGES_TO_CREATE)
+
+	response = client.request('DELETE', '/nodes/bulk', json=[{'node_id': first_node}, {'node_id': missing_node}])
+	assert response.status_code == 404
+	assert len(get_graph_nodes()) == NODES_TO_CREATE
+
+
+def test_rejected_edges_with_existing_nodes(monkeypatch):
+	seed_graph()
+	edge = {'from_node_id': get_min_id(), 'to_node_id': get_max_id()}
+	create_edges = edge_repo.create_edges
+	rejections = [None]
+
+	# Rejected once although the nodes exist, as if they were committed after the insert.
+	monkeypatch.setattr(edge_repo, 'create_edges',
+						lambda *args: rejections.pop() if rejections else create_edges(*args))
+	assert client.post('/edges/bulk', json=[edge]).status_code == 201
+	assert len(get_graph_edges()) == len(EDGES_TO_CREATE) + 1
+
+	monkeypatch.setattr(edge_repo, 'create_edges', lambda *args: None)
+	assert client.post('/edges/bulk', json=[edge]).status_code == 409
+	assert len(get_graph_edges()) == len(EDGES_TO_CREATE) + 1
+
+
+def test_fast_json_matches_response_models(monkeypatch):
+	seed_graph()
+	first_node = get_min_id()
+	urls = ['/graph', f'/nodes/{first_node}/connected', f'/nodes/{first_node}/connected?max_depth=2&include_depth=true',
+			'/nodes?limit=5', '/edges?limit=5']
+
+	monkeypatch.setattr(settings, 'fast_json_responses', True)
+	fast = [client.get(url) for url in urls]
+
+	monkeypatch.setattr(settings, 'fast_json_responses', False)
+	validated = [client.get(url) for url in urls]
+
+	for fast_response, validated_response in zip(fast, validated):
+		assert fast_response.content == validated_response.content
+		# Only the timings of the requests differ.
+		assert fast_response.headers.keys() == validated_response.headers.keys()
+		assert {**fast_response.headers, 'server-timing': None} == {**validated_response.headers, 'server-timing': None}
+
+
+def _normalized(graph: dict) -> tuple[int, list[tuple[int, int]]]:
+	# Imported graphs get new IDs, nodes and edges are compared by their position in the graph instead.
+	positions = {node['id']: position for position, node in enumerate(graph['nodes'])}
+	return len(positions), [(positions[edge['from_node_id']], positions[edge['to_node_id']]) for edge in graph['edges']]
+
+
+def test_graph_snapshot():
+	graph = _normalized(seed_graph())
+
+	for compress in (False, True):
+		response = client.get('/graph/snapshot', params={'compress': compress})
+		assert response.status_code == 200
+		assert response.headers['Content-Type'] == 'application/octet-stream'
+		snapshot = response.content
+
+		client.delete('/graph/clear')
+
+		response = client.post('/graph/snapshot', content=snapshot)
+		assert response.status_code == 201
+		assert response.json() == {'nodes': NODES_TO_CREATE, 'edges': len(EDGES_TO_CREATE)}
+		assert _normalized(get_graph()) == graph
+
+	assert client.post('/graph/snapshot', content=b'not a snapshot').status_code == 400
+	assert client.post('/graph/snapshot', content=snapshot[:-1]).status_code == 400
+	assert _normalized(get_graph()) == graph
+
+
+def test_seed_graph_random():
+	response = client.post('/graph/seed_random', params={'nodes': 200, 'edges': 1500, 'topology': 'dag', 'seed': 3})
+	assert response.status_code == 201
+	assert response.json() == {'nodes': 200, 'edges': 1500, 'topology': 'dag', 'seed': 3}
+
+	graph = get_graph()
+	assert len(graph['nodes']) == 200
+	assert len(graph['edges']) == 1500
+	assert all(edge['from_node_id'] < edge['to_node_id'] for edge in graph['edges'])
+
+	client.post('/graph/seed_random', params={'nodes': 200, 'edges': 1500, 'topology': 'dag', 'seed': 3})
+	offset = get_min_id() - graph['nodes'][0]['id']
+	assert [(edge['from_node_id'] - offset, edge['to_node_id'] - offset) for edge in get_graph_edges()] == \
+		   [(edge['from_node_id'], edge['to_node_id']) for edge in graph['edges']]
+
+	assert client.post('/graph/seed_random').json()['nodes'] == 20
+	assert client.post('/graph/seed_random', params={'nodes': 1}).status_code == 422
+
+
+def test_request_instrumentation(monkeypatch, caplog):
+	seed_graph()
+	first_node = get_min_id()
+
+	response = client.get(f'/nodes/{first_node}/connected')
+	db_timing, serialize_timing, total_timing = response.headers['Server-Timing'].split(', ')
+	assert db_timing.startswith('db;dur=')
+	assert int(db_timing.split('queries=')[1].split(' ')[0]) > 0
+	assert serialize_timing.startswith('serialize;dur=')
+	assert total_timing.startswith('total;dur=')
+
+	monkeypatch.setattr(settings, 'slow_query_threshold', 0)
+	with caplog.at_level('WARNING', logger='app.core.instrumentation'):
+		client.get(f'/nodes/{first_node}/connected')
+	assert any(record.message.startswith('Slow query') for record in caplog.records)
+
+	metrics = client.get('/metrics').text
+	assert 'graph_api_requests_total{method="GET",route="/nodes/{node_id}/connected",status="200"}' in metrics
+	assert 'graph_api_db_queries_total{method="GET",route="/nodes/{node_id}/connected",status="200"}' in metrics
+	assert 'graph_api_slow_queries_total 0\n' not in metrics
+
+
+def test_node_connected_closure(monkeypatch):
+	monkeypatch.setattr(settings, 'reachability_closure_enabled', True)
+	seed_graph()
+	first_node = get_min_id()
+
+	def connected(node_ids: list[int]) -> dict[int, list[int]]:
+		return {node_id: [node['id'] for node in client.get(f'/nodes/{node_id}/connected').json()]
+				for node_id in node_ids}
+
+	client.post('/edges', json={'from_node_id': first_node + 12, 'to_node_id': first_node + 19})
+	client.request('DELETE', '/nodes', json={'node_id': first_node + 3})
+	node_ids = [node['id'] for node in get_graph_nodes()]
+
+	# The closure returns the nodes in ID order, the graph index takes precedence if it is enabled.
+	from_closure = {node_id: sorted(reachable) for node_id, reachable in connected(node_ids).items()}
+	monkeypatch.setattr(settings, 'reachability_closure_enabled', False)
+	assert from_closure == {node_id: sorted(reachable) for node_id, reachable in connected(node_ids).items()}
+
+
+def test_graph_namespaces():
+	seed_graph()
+	first_node = get_min_id()
+
+	response = client.post('/graphs/other/nodes/bulk', json=[{}, {}])
+	assert response.status_code == 201
+	other_nodes = [node['id'] for node in response.json()]
+	assert client.post('/graphs/other/edges', json={'from_node_id': other_nodes[0],
+													'to_node_id': other_nodes[1]}).status_code == 201
+
+	# Nodes and edges are only visible in their own namespace.
+	assert [node['id'] for node in client.get('/graphs/other/graph').json()['nodes']] == other_nodes
+	assert client.get(f'/graphs/other/nodes/{first_node}/connected').status_code == 404
+	assert client.get(f'/nodes/{other_nodes[0]}/connected').status_code == 404
+	assert client.post('/graphs/other/edges', json={'from_node_id': other_nodes[0],
+													'to_node_id': first_node}).status_code == 404
+	assert [node['id'] for node in client.get(f'/graphs/other/nodes/{other_nodes[0]}/connected').json()] == \
+		   other_nodes
+
+	# The unprefixed routes address the default namespace.
+	assert client.get(f'/graphs/{settings.default_namespace}/graph').json() == get_graph()
+
+	etag = client.get('/graph').headers['ETag']
+	client.delete('/graphs/other/graph/clear')
+	assert client.get('/graphs/other/graph').json() == {'nodes': [], 'edges': []}
+	assert client.get('/graph', headers={'If-None-Match': etag}).status_code == 304
+	assert len(get_graph_nodes()) == NODES_TO_CREATE
+
+	assert client.get('/graphs/not a namespace/graph').status_code == 422
+
+
+
+def test_reads_look_up_the_namespace_in_their_query(monkeypatch):
+	monkeypatch.setattr(settings, 'graph_index_enabled', False)
+	monkeypatch.setattr(settings, 'reachability_cache_enabled', False)
+	seed_graph()
+	first_node = get_min_id()
+
+	for path in (f'/nodes/{first_node}', '/nodes?limit=5', '/edges?limit=5', f'/graphs/missing/nodes/{first_node}'):
+		response = client.get(path)
+		assert 'queries=1 ' in response.headers['Server-Timing']
+
+	assert client.get(f'/graphs/missing/nodes/{first_node}').status_code == 404
+
+def test_write_coalescing(monkeypatch):
+	seed_graph()
+	first_node = get_min_id()
+	last_node = get_max_id()
+	missing_id = 10 ** 9
+	batch_sizes = []
+	apply_writes_in_batch = write_coalescer.apply_writes
+
+	def apply_writes(db, writes):
+		batch_sizes.append(len(writes))
+		return apply_writes_in_batch(db, writes)
+
+	monkeypatch.setattr(write_coalescer, 'apply_writes', apply_writes)
+
+	async def concurrent_writes():
+		namespace = settings.default_namespace
+		submit = write_coalescer.write_coalescer.submit
+
+		return await asyncio.gather(
+			submit(edge_service.create_edges, namespace, [EdgeCreate(from_node_id=first_node, to_node_id=last_node)]),
+			submit(edge_service.create_edges, namespace, [EdgeCreate(from_node_id=first_node, to_node_id=missing_id)]),
+			submit(node_service.create_nodes, namespace, [NodeCreate()]),
+			submit(edge_service.delete_edges, namespace, [EdgeDeleteRequest(edge_id=missing_id)]),
+			return_exceptions=True)
+
+	created_edge, missing_node, created_node, missing_edge = asyncio.run(concurrent_writes())
+
+	# The writes are committed together, the failed ones leave no trace.
+	assert batch_sizes == [4]
+	assert isinstance(missing_node, NodeNotFoundError)
+	assert isinstance(missing_edge, EdgeNotFoundError)
+	assert created_edge[0].id in [edge['id'] for edge in get_graph_edges()]
+	assert len(get_graph_edges()) == len(EDGES_TO_CREATE) + 1
+	assert get_max_id() == created_node[0].id
+
+	monkeypatch.setattr(settings, 'write_coalescing_enabled', True)
+
+	response = client.post('/edges', json={'from_node_id': last_node, 'to_node_id': first_node})
+	assert response.status_code == 201
+	assert client.request('DELETE', '/edges', json={'edge_id': response.json()[0]['id']}).status_code == 204
+	assert client.request('DELETE', '/edges', json={'edge_id': response.json()[0]['id']}).status_code == 404
+	assert client.post('/edges', json={'from_node_id': last_node, 'to_node_id': missing_id}).status_code == 404
+	assert client.post('/nodes', json={}).status_code == 201
+	assert batch_sizes == [4, 1, 1, 1, 1, 1]
@@ -0,0 +1,235 @@
+from random import Random
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.core.graph_index import GraphIndex
+from app.models.base import Base
+from app.models.graph import Graph
+from app.models.node import Node
+from app.scripts.seed_db import NODES_TO_CREATE, EDGES_TO_CREATE
+
+EXPECTED_REACHABLE = [1, 2, 3, 5, 6, 4, 7, 8, 9, 13, 11, 14, 15, 16, 10, 12]
+
+
+def build_index(condensation: bool = False) -> GraphIndex:
+	index = GraphIndex(condensation)
+	index._loaded = True
+
+	index.add_nodes(range(1, NODES_TO_CREATE + 1))
+	index.add_edges((edge_id, f + 1, t + 1) for edge_id, (f, t) in enumerate(EDGES_TO_CREATE, start=1))
+
+	return index
+
+
+def reachable_ids(index: GraphIndex, node_id: int) -> list[int]:
+	return index.reachable(node_id).node_ids
+
+
+def compact(index: GraphIndex) -> None:
+	index._build(index._nodes, list(index._edges()))
+
+
+def test_reachable_matches_cte_order():
+	index = build_index()
+	assert reachable_ids(index, 1) == EXPECTED_REACHABLE
+
+	compact(index)
+	assert reachable_ids(index, 1) == EXPECTED_REACHABLE
+
+
+def test_reachable_missing_node():
+	assert reachable_ids(build_index(), NODES_TO_CREATE + 1) == []
+
+
+def test_add_and_remove_edges():
+	index = build_index()
+	compact(index)
+
+	index.add_edges([(100, 25, 1)])
+	assert reachable_ids(index, 25) == [25] + EXPECTED_REACHABLE
+
+	index.remove_edges([100, 1])
+	assert reachable_ids(index, 25) == [25]
+	assert 2 not in reachable_ids(index, 1)
+
+
+def test_replace_edges_keeps_edge_order():
+	index = build_index()
+	compact(index)
+
+	# Edge 1 (1 -> 2) becomes 2 -> 1 and is visited before the other outgoing edges of node 2.
+	index.replace_edges([(1, 2, 1)])
+	assert reachable_ids(index, 2)[:2] == [2, 1]
+	assert 2 not in reachable_ids(index, 1)
+
+	index.replace_edges([(1, 1, 2)])
+	assert reachable_ids(index, 1) == EXPECTED_REACHABLE
+
+
+def test_remove_nodes_cascades_edges():
+	index = build_index()
+	compact(index)
+
+	index.remove_nodes([2])
+	assert not index.has_node(2)
+	assert 2 not in reachable_ids(index, 1)
+	assert reachable_ids(index, 12) == [12]
+
+
+def test_bounded_reachable():
+	index = build_index()
+
+	result = index.reachable(1, max_depth=1)
+	assert result.node_ids == [1, 2, 3, 5, 6]
+	assert result.depths == [0, 1, 1, 1, 1]
+	assert result.truncated
+
+	result = index.reachable(1, limit=3)
+	assert result.node_ids == [1, 2, 3]
+	assert result.truncated
+
+	result = index.reachable(1, max_depth=6, limit=len(EXPECTED_REACHABLE))
+	assert result.node_ids == EXPECTED_REACHABLE
+	assert result.depths[-1] == 6
+	assert not result.truncated
+
+	result = index.reachable(1, deadline=0)
+	assert result.node_ids == [1]
+	assert result.truncated
+
+
+def test_ancestors_invert_reachability():
+	for condensation in (False, True):
+		index = build_index(condensation)
+		node_ids = range(1, NODES_TO_CREATE + 1)
+		reachable = {node_id: set(reachable_ids(index, node_id)) for node_id in node_ids}
+
+		for node_id in node_ids:
+			expected = {ancestor_id for ancestor_id in node_ids if node_id in reachable[ancestor_id]}
+			assert set(index.ancestors(node_id).node_ids) == expected
+
+	result = build_index().ancestors(12, max_depth=0)
+	assert result.node_ids == [12]
+	assert result.truncated
+	assert build_index().ancestors(NODES_TO_CREATE + 1).node_ids == []
+
+
+def test_shortest_path():
+	index = build_index()
+
+	assert index.shortest_path(1, 12) == [1, 2, 4, 11, 16, 10, 12]
+	assert index.shortest_path(1, 1) == [1]
+	assert index.shortest_path(12, 25) is None
+
+
+def component(index: GraphIndex, node_id: int) -> set[int]:
+	return index._condensation.members(index._condensation.component_of(node_id))
+
+
+def test_condensation_components():
+	index = build_index(condensation=True)
+
+	assert component(index, 2) == {2, 4, 7, 10, 11, 12, 16}
+	assert component(index, 20) == {20, 22, 23}
+	assert component(index, 1) == {1}
+
+	result = index.reachable(1)
+	assert result.node_ids[0] == 1
+	assert sorted(result.node_ids) == sorted(EXPECTED_REACHABLE)
+	assert not result.depths
+
+	# Bounded traversals keep the breadth-first order.
+	assert index.reachable(1, limit=len(EXPECTED_REACHABLE)).node_ids == EXPECTED_REACHABLE
+
+
+def test_condensation_incremental_updates():
+	index = build_index(condensation=True)
+
+	# Edge 18 (12 -> 2) closes the cycle through 2, 4, 11, 16, 10, 12.
+	index.remove_edges([18])
+	assert component(index, 2) == {2}
+	assert component(index, 4) == {4, 10, 11, 16}
+	assert 2 not in index.reachable(4).node_ids
+
+	index.add_edges([(18, 12, 2)])
+	assert component(index, 2) == {2, 4, 7, 10, 11, 12, 16}
+
+	index.add_edges([(100, 25, 1), (101, 16, 25)])
+	assert component(index, 1) == {1, 2, 4, 7, 10, 11, 12, 16, 25}
+
+	index.remove_nodes([25])
+	assert component(index, 1) == {1}
+
+	compact(index)
+	assert component(index, 2) == {2, 4, 7, 10, 11, 12, 16}
+	assert sorted(index.reachable(1).node_ids) == sorted(EXPECTED_REACHABLE)
+
+
+
+def test_condensation_matches_breadth_first_search():
+	for seed in range(50):
+		random = Random(seed)
+		plain, condensed = GraphIndex(), GraphIndex(condensation=True)
+		node_ids = list(range(1, 31))
+		edges: dict[int, tuple[int, int]] = {}
+
+		for index in (plain, condensed):
+			index._loaded = True
+			index.add_nodes(node_ids)
+
+		for edge_id in range(1, 301):
+			operation = random.random()
+
+			if operation < 0.6 or not edges:
+				edges[edge_id] = (random.choice(node_ids), random.choice(node_ids))
+				changes = [('add_edges', [(edge_id, *edges[edge_id])])]
+			elif operation < 0.8:
+				removed_id = random.choice(list(edges))
+				del edges[removed_id]
+				changes = [('remove_edges', [removed_id])]
+			elif operation < 0.95:
+				swapped_id = random.choice(list(edges))
+				edges[swapped_id] = edges[swapped_id][::-1]
+				changes = [('replace_edges', [(swapped_id, *edges[swapped_id])])]
+			else:
+				removed_id = random.choice(node_ids)
+				edges = {key: edge for key, edge in edges.items() if removed_id not in edge}
+				changes = [('remove_nodes', [removed_id]), ('add_nodes', [removed_id])]
+
+			for name, arguments in changes:
+				getattr(plain, name)(arguments)
+				getattr(condensed, name)(arguments)
+
+			start_id = random.choice(node_ids)
+			result = condensed.reachable(start_id).node_ids
+			assert result[0] == start_id
+			assert sorted(result) == sorted(plain.reachable(start_id).node_ids)
+			assert condensed.reachable(start_id, limit=5).node_ids == plain.reachable(start_id, limit=5).node_ids
+
+def test_load_retries_and_gives_up_on_concurrent_mutations():
+	engine = create_engine('sqlite://', poolclass=StaticPool)
+	Base.metadata.create_all(engine)
+
+	with Session(engine) as db:
+		db.execute(insert(Graph).values(id=1, namespace='test'))
+		db.execute(insert(Node).values(id=1, graph_id=1))
+		db.commit()
+
+		index = GraphIndex(graph_id=1)
+		reads = []
+
+		def mutate(*args):
+			# A write of another request commits while the index reads the graph.
+			reads.append(args)
+			index.add_nodes([len(reads) + 1])
+
+		event.listen(engine, 'before_cursor_execute', mutate)
+		assert not index.ensure_loaded(db)
+		assert not index.loaded
+		assert len(reads) > 2
+
+		event.remove(engine, 'before_cursor_execute', mutate)
+		assert index.ensure_loaded(db)
+		assert index.has_node(1)
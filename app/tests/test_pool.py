@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import create_engine, exc
+
+from app.core import metrics
+from app.core.metrics import render_metrics, register_collector
+from app.core.pool import InstrumentedQueuePool, pool_metrics
+
+
+def create_test_engine(tmp_path):
+	return create_engine(f'sqlite:///{tmp_path}/pool.db',
+						 poolclass=InstrumentedQueuePool,
+						 pool_size=1,
+						 max_overflow=1,
+						 pool_timeout=0.05)
+
+
+def test_pool_stats(tmp_path):
+	engine = create_test_engine(tmp_path)
+	stats = engine.pool.stats
+
+	first = engine.connect()
+	second = engine.connect()
+	assert stats.checkouts == 2
+	assert stats.overflows == 1
+
+	with pytest.raises(exc.TimeoutError):
+		engine.connect()
+
+	assert stats.waits == 1
+	assert stats.timeouts == 1
+	assert stats.wait_seconds >= 0.05
+
+	first.close()
+	second.close()
+
+	engine.dispose()
+	assert engine.pool.stats is stats
+
+
+def test_render_pool_metrics(tmp_path, monkeypatch):
+	# The collector of the throwaway engine is registered in a registry of its own, dropped after the test.
+	monkeypatch.setattr(metrics, '_collectors', [])
+	engine = create_test_engine(tmp_path)
+	register_collector(lambda: pool_metrics({'test': engine.pool}))
+
+	with engine.connect():
+		rendered = render_metrics()
+
+	assert '# TYPE graph_api_db_pool_checked_out gauge' in rendered
+	assert 'graph_api_db_pool_checked_out{engine="test"} 1' in rendered
+	assert 'graph_api_db_pool_checkouts_total{engine="test"} 1' in rendered
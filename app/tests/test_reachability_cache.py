@@ -0,0 +1,71 @@
+from app.core.metrics import render_metrics
+from app.core.reachability_cache import InMemoryBackend, ReachabilityCache
+
+GRAPH_ID = 1
+
+
+def test_invalidation_drops_dependent_entries():
+	cache = ReachabilityCache(InMemoryBackend(max_size=10))
+
+	version = cache.version()
+	cache.put(GRAPH_ID, 1, [1, 2, 3], version)
+	cache.put(GRAPH_ID, 4, [4, 5], version)
+	assert cache.get(GRAPH_ID, 1) == (1, 2, 3)
+
+	cache.invalidate([3])
+	assert cache.get(GRAPH_ID, 1) is None
+	assert cache.get(GRAPH_ID, 4) == (4, 5)
+	assert cache.stats.invalidations == 1
+	assert (cache.stats.hits, cache.stats.misses) == (2, 1)
+
+
+def test_stale_results_are_not_stored():
+	cache = ReachabilityCache(InMemoryBackend(max_size=10))
+
+	version = cache.version()
+	cache.invalidate([7])
+	cache.put(GRAPH_ID, 1, [1, 2], version)
+	assert cache.get(GRAPH_ID, 1) is None
+
+
+def test_lru_and_ttl_eviction():
+	backend = InMemoryBackend(max_size=2)
+	cache = ReachabilityCache(backend)
+
+	cache.put(GRAPH_ID, 1, [1], 0)
+	cache.put(GRAPH_ID, 2, [2], 0)
+	cache.get(GRAPH_ID, 1)
+	cache.put(GRAPH_ID, 3, [3], 0)
+	assert cache.get(GRAPH_ID, 2) is None
+	assert cache.get(GRAPH_ID, 1) == (1,)
+	assert backend.evictions == 1
+
+	expired = ReachabilityCache(InMemoryBackend(max_size=2, ttl=0))
+	expired.put(GRAPH_ID, 1, [1], 0)
+	assert expired.get(GRAPH_ID, 1) is None
+	assert expired.backend.evictions == 1
+
+
+def test_shared_backend():
+	backend = InMemoryBackend(max_size=10)
+	first, second = ReachabilityCache(backend), ReachabilityCache(backend)
+
+	first.put(GRAPH_ID, 1, [1, 2], first.version())
+	assert second.get(GRAPH_ID, 1) == (1, 2)
+
+	second.invalidate([2])
+	assert first.get(GRAPH_ID, 1) is None
+
+
+def test_graphs_are_isolated():
+	cache = ReachabilityCache(InMemoryBackend(max_size=10))
+
+	cache.put(GRAPH_ID, 1, [1, 2], cache.version())
+	assert cache.get(GRAPH_ID + 1, 1) is None
+
+	cache.invalidate([2])
+	assert cache.get(GRAPH_ID, 1) is None
+
+
+def test_cache_metrics():
+	assert 'graph_api_reachability_cache_hits_total ' in render_metrics()
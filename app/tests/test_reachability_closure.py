@@ -0,0 +1,61 @@
+from random import Random
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.benchmarks.suite import create_benchmark_engine
+from app.core.config import settings
+from app.models.base import Base
+from app.repositories import closure_repo, edge_repo, graph_repo, node_repo
+from app.schemas.graph import GraphTopology
+from app.scripts.generate_graph import generate_edges
+
+NAMESPACE = 'test'
+
+
+@pytest.fixture
+def db(monkeypatch):
+	monkeypatch.setattr(settings, 'reachability_closure_enabled', True)
+	monkeypatch.setattr(settings, 'graph_index_enabled', False)
+
+	engine = create_benchmark_engine('sqlite:///:memory:')
+	Base.metadata.create_all(engine)
+
+	with sessionmaker(bind=engine, autoflush=False)() as session:
+		yield session
+
+
+@pytest.mark.parametrize('topology', [GraphTopology.ERDOS_RENYI, GraphTopology.DAG, GraphTopology.CHAIN])
+def test_closure_is_maintained_on_write(db, topology):
+	random = Random(1)
+	graph_id = graph_repo.create_graph(db, NAMESPACE, 40, generate_edges(40, 50, topology, seed=1))
+	assert closure_repo.check(db) == (0, 0)
+
+	for _ in range(20):
+		node_ids = list(node_repo.get_all_node_ids(db, graph_id))
+		edge_ids = [edge[0] for edge in edge_repo.get_all_edge_rows(db, graph_id)]
+
+		edge_repo.create_edges(db, graph_id, [(random.choice(node_ids), random.choice(node_ids)) for _ in range(3)])
+		edge_repo.swap_edge_directions(db, graph_id,
+									   edge_repo.get_edges(db, graph_id, random.sample(edge_ids, 3), lock=True))
+		edge_repo.delete_edges(db, graph_id, random.sample(edge_ids, 2))
+		node_repo.delete_nodes(db, graph_id, [random.choice(node_ids)])
+		node_repo.create_nodes(db, graph_id, 1)
+
+		assert closure_repo.check(db) == (0, 0)
+
+
+def test_closure_reads_and_rebuild(db):
+	graph_id = graph_repo.create_graph(db, NAMESPACE, 5, [(0, 1), (1, 2), (2, 0), (3, 4)])
+	first = min(node_repo.get_all_node_ids(db, graph_id))
+
+	assert [node.id for node in node_repo.get_reachable_nodes(db, graph_id, first + 3)] == [first + 3, first + 4]
+	assert node_repo.get_reachable_node_ids_batch(db, graph_id, [first, first + 4, first + 5]) == \
+		   {first: [first, first + 1, first + 2], first + 4: [first + 4]}
+	assert node_repo.get_reachable_nodes(db, graph_id, first + 5) == []
+
+	closure_repo.add_edges(db, [(first + 4, first)])
+	assert closure_repo.check(db) == (0, 6)
+
+	assert closure_repo.rebuild(db) == 5 + 6 + 1
+	assert closure_repo.check(db) == (0, 0)
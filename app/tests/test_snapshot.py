@@ -0,0 +1,36 @@
+import pytest
+
+from app.core.snapshot import open_snapshot, read_snapshot, write_snapshot
+
+NODE_IDS = [3, 4, 7, 100]
+EDGES = [(1, 3, 4), (2, 4, 7), (9, 7, 3), (10, 100, 100)]
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_snapshot_roundtrip(compress):
+	snapshot = read_snapshot(write_snapshot(NODE_IDS, EDGES, compress))
+
+	assert (snapshot.node_count, snapshot.edge_count) == (len(NODE_IDS), len(EDGES))
+	assert snapshot.node_ids() == NODE_IDS
+	assert snapshot.edge_ids() == [edge[0] for edge in EDGES]
+	assert list(snapshot.from_node_ids) == [edge[1] for edge in EDGES]
+	assert list(snapshot.to_node_ids) == [edge[2] for edge in EDGES]
+
+
+def test_memory_mapped_snapshot(tmp_path):
+	path = tmp_path / 'graph.snapshot'
+	path.write_bytes(write_snapshot(NODE_IDS, EDGES))
+
+	snapshot = open_snapshot(str(path))
+
+	assert isinstance(snapshot.from_node_ids, memoryview)
+	assert snapshot.node_ids() == NODE_IDS
+	assert list(snapshot.to_node_ids) == [edge[2] for edge in EDGES]
+
+
+@pytest.mark.parametrize('data', [b'', b'GRPHSNAP', write_snapshot(NODE_IDS, EDGES)[:-4],
+								  write_snapshot(NODE_IDS, EDGES, compress=True)[:-1],
+								  write_snapshot([3, 3], [])])
+def test_invalid_snapshots(data):
+	with pytest.raises(ValueError):
+		read_snapshot(data)
@@ -0,0 +1,114 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.core import write_coalescer
+from app.core.exceptions import NodeNotFoundError
+from app.core.write_coalescer import WriteCoalescer
+
+
+@asynccontextmanager
+async def open_db():
+	yield None
+
+
+async def run_db(db, func, *args):
+	return func(db, *args)
+
+
+@pytest.fixture(autouse=True)
+def without_database(monkeypatch):
+	monkeypatch.setattr(write_coalescer, 'open_db', open_db)
+	monkeypatch.setattr(write_coalescer, 'run_db', run_db)
+
+
+def identity(db, value):
+	return value
+
+
+def submit_all(coalescer: WriteCoalescer, *values) -> list:
+	async def submit():
+		return await asyncio.gather(*(coalescer.submit(identity, value) for value in values), return_exceptions=True)
+
+	return asyncio.run(submit())
+
+
+def test_failing_hooks_do_not_fail_the_batch(monkeypatch):
+	called = []
+
+	def failing_hook():
+		raise RuntimeError('hook failed')
+
+	def apply_writes(db, writes):
+		return [write.func(db, *write.args) for write in writes], [failing_hook, lambda: called.append(True)]
+
+	monkeypatch.setattr(write_coalescer, 'apply_writes', apply_writes)
+	coalescer = WriteCoalescer(0, 10)
+
+	assert submit_all(coalescer, 1, 2) == [1, 2]
+	assert called == [True]
+	assert coalescer._flusher is None
+
+
+def test_failed_commit_is_not_replayed(monkeypatch):
+	error = OperationalError('COMMIT', {}, Exception('connection lost'))
+	replayed = []
+
+	async def apply_one_by_one(batch):
+		replayed.extend(batch)
+
+	def apply_writes(db, writes):
+		raise write_coalescer._CommitError(error, [write.func(db, *write.args) for write in writes])
+
+	monkeypatch.setattr(write_coalescer, 'apply_writes', apply_writes)
+	monkeypatch.setattr(WriteCoalescer, '_apply_one_by_one', staticmethod(apply_one_by_one))
+
+	# The commit may have taken effect, so the writes are not applied again. A write that failed on its own keeps its
+	# own error.
+	missing = NodeNotFoundError(3)
+	assert submit_all(WriteCoalescer(0, 10), 1, missing, 2) == [error, missing, error]
+	assert not replayed
+
+
+def test_failed_batch_is_replayed_one_by_one(monkeypatch):
+	def apply_writes(db, writes):
+		raise OperationalError('INSERT', {}, Exception('deadlock'))
+
+	monkeypatch.setattr(write_coalescer, 'apply_writes', apply_writes)
+
+	assert submit_all(WriteCoalescer(0, 10), 1, 2) == [1, 2]
+
+
+def test_cancelled_flusher_releases_its_writes():
+	coalescer = WriteCoalescer(60, 10)
+
+	async def cancel_flusher():
+		write = asyncio.create_task(coalescer.submit(identity, 1))
+		await asyncio.sleep(0)
+		coalescer._flusher.cancel()
+
+		with pytest.raises(asyncio.CancelledError):
+			await write
+
+		assert coalescer._flusher is None
+		assert not coalescer._pending
+
+	asyncio.run(cancel_flusher())
+
+
+def test_failed_flusher_releases_its_writes(monkeypatch):
+	async def apply(batch):
+		raise RuntimeError('coalescer failed')
+
+	coalescer = WriteCoalescer(0, 10)
+	monkeypatch.setattr(coalescer, '_apply', apply)
+	error, = submit_all(coalescer, 1)
+	assert isinstance(error, RuntimeError)
+	assert coalescer._flusher is None
+
+	# The next write starts a new flusher.
+	monkeypatch.delattr(coalescer, '_apply')
+	monkeypatch.setattr(write_coalescer, 'apply_writes', lambda db, writes: ([write.args[0] for write in writes], []))
+	assert submit_all(coalescer, 2) == [2]